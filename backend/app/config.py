@@ -24,6 +24,26 @@ AZURE_OPENAI_API_KEY = os.getenv("AZURE_OPENAI_API_KEY", "")
 AZURE_OPENAI_DEPLOYMENT_NAME = os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME", "")
 AZURE_OPENAI_API_VERSION = os.getenv("AZURE_OPENAI_API_VERSION", "2023-07-01-preview")
 
+# LLM client: shared connection pool, in-flight completion limit and timeouts (seconds)
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "64"))
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "30.0"))
+LLM_REQUEST_TIMEOUT = float(os.getenv("LLM_REQUEST_TIMEOUT", "60.0"))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5.0"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_POOL_MAX_CONNECTIONS = int(os.getenv("LLM_POOL_MAX_CONNECTIONS", "100"))
+LLM_POOL_MAX_KEEPALIVE = int(os.getenv("LLM_POOL_MAX_KEEPALIVE", "20"))
+LLM_POOL_KEEPALIVE_EXPIRY = float(os.getenv("LLM_POOL_KEEPALIVE_EXPIRY", "30.0"))
+
+# Conversation memory: byte cap across all users, prompt budget per conversation, idle eviction (seconds)
+CONVERSATION_MAX_BYTES = int(os.getenv("CONVERSATION_MAX_BYTES", str(64 * 1024 * 1024)))
+CONVERSATION_TOKEN_BUDGET = int(os.getenv("CONVERSATION_TOKEN_BUDGET", "12000"))
+CONVERSATION_KEEP_TOOL_OUTPUTS = int(os.getenv("CONVERSATION_KEEP_TOOL_OUTPUTS", "2"))
+CONVERSATION_IDLE_TTL = float(os.getenv("CONVERSATION_IDLE_TTL", "3600"))
+
+# Where conversations and chat sessions are kept: "memory" (one process) or "elasticsearch" (shared by workers)
+CONVERSATION_BACKEND = os.getenv("CONVERSATION_BACKEND", "memory").lower()
+CONVERSATION_FLUSH_INTERVAL = float(os.getenv("CONVERSATION_FLUSH_INTERVAL", "2.0"))
+
 # **New Configurable Variables**
 MAX_PODIUMS = int(os.getenv("MAX_PODIUMS", "5"))
 TARGET_PRICE = float(os.getenv("TARGET_PRICE", "100.0"))
@@ -11,14 +11,14 @@ from app.services.elastic_service import (
     connect_elasticsearch,
     create_admin_user
 )
-from app.services.llm_service import set_categories
+from app.services.llm_service import set_categories, close_llm_client, conversation_store
 import logging
 from starlette.middleware.cors import CORSMiddleware
 from app.sockets import sio
 import socketio
 import uvicorn
 import os
-from app.config import CORS_ALLOWED_ORIGINS
+from app.config import CORS_ALLOWED_ORIGINS, CONVERSATION_FLUSH_INTERVAL
 
 # Configure root logger
 logging.basicConfig(
@@ -85,6 +85,9 @@ async def startup_event():
     else:
         logger.warning("No categories found in Elasticsearch. LLM will have limited guidance.")
 
+    # Save changed conversations in the background when they are shared between workers
+    conversation_store.start_flusher(CONVERSATION_FLUSH_INTERVAL)
+
 # Set up CORS middleware for FastAPI app
 app.add_middleware(
     CORSMiddleware,
@@ -120,9 +123,12 @@ app.mount("/socket.io", socketio_app)
 async def shutdown_event():
     from app.services.elastic_service import es  # Import the Elasticsearch client
     logger = logging.getLogger("shutdown")
+    logger.info("Saving conversations...")
+    await conversation_store.close()
     logger.info("Closing Elasticsearch connection...")
     await es.close()
     logger.info("Elasticsearch connection closed.")
+    await close_llm_client()
 
 if __name__ == "__main__":
     port = int(os.getenv("PORT", 8000))  # Default to 8000 if PORT is not set
@@ -6,6 +6,7 @@ from app.services.elastic_service import get_settings, update_settings, generate
 from pydantic import BaseModel
 from typing import List, Dict, Optional
 from app.models import TokenResponse
+from app.services.llm_service import conversation_store
 
 import logging
 
@@ -74,6 +75,15 @@ async def admin_dashboard(current_user: dict = Depends(authenticate_admin)):
     # Implement your admin-specific logic here
     return {"message": f"Welcome to the admin dashboard, {current_user['username']}!"}
 
+@router.get("/conversations/stats")
+async def conversation_stats(authorized: bool = Depends(authenticate_admin)):
+    """
+    Size of the chat conversation store.
+
+    :return: Conversations and bytes held against the cap, eviction and trimming counters, and write-back state.
+    """
+    return conversation_store.stats()
+
 # Define request and response models
 class TokenGenerationRequest(BaseModel):
     count: int = 1  # Number of tokens to generate
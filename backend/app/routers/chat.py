@@ -1,11 +1,13 @@
 # app/routers/chat.py
 
+import asyncio
 import logging
 from app.utils.auth import decode_jwt  # Import only decode_jwt
 
 from app.sockets import sio  # Import sio from sockets.py
 from urllib.parse import parse_qs
-from app.services.llm_service import handle_llm_interaction  # Import the LLM interaction function
+from app.services.llm_service import handle_llm_interaction, conversation_store  # Import the LLM interaction function
+from app.services.conversation_store import SessionRegistry
 
 # Configure logger
 logger = logging.getLogger("chat")
@@ -17,8 +19,11 @@ formatter = logging.Formatter(
 handler.setFormatter(formatter)
 logger.addHandler(handler)
 
-# Define an in-memory mapping of session IDs to user data
-connected_users = {}
+# Mapping of session IDs to user data, kept in the conversation backend
+connected_users = SessionRegistry(conversation_store.backend)
+
+# LLM turns in progress per session ID, cancelled when the client disconnects
+pending_replies = {}
 
 @sio.event
 async def connect(sid, environ):
@@ -38,7 +43,9 @@ async def connect(sid, environ):
             from app.services.elastic_service import get_user_by_username  # Deferred import to prevent circular import
             user = await get_user_by_username(username)
             if user:
-                connected_users[sid] = user
+                await connected_users.set(sid, user)
+                # Another worker may have served this user since we last did
+                conversation_store.invalidate(user['username'])
                 logger.info(f"Socket.IO connection accepted for user: {user['username']}")
                 await sio.emit('message', {'content': 'Welcome to the chat!'}, room=sid)
             else:
@@ -53,20 +60,41 @@ async def connect(sid, environ):
 
 @sio.event
 async def disconnect(sid):
-    user = connected_users.pop(sid, None)
+    user = await connected_users.pop(sid)
+    reply = pending_replies.pop(sid, None)
+    if reply and not reply.done():
+        reply.cancel()
     username = user['username'] if user else 'Unknown'
+    if user:
+        # Save now so a reconnect to another worker sees the latest turns
+        await conversation_store.flush(username)
     logger.info(f"Socket.IO connection disconnected for user: {username}")
 
 @sio.on('message')
 async def handle_message(sid, data):
-    user = connected_users.get(sid)
+    user = await connected_users.get(sid)
     if user:
         username = user['username']
         logger.debug(f"Received message from {username}: {data}")
         user_message = data.get('content', '')
         if user_message:
-            # Forward the message to the LLM service
-            llm_response = await handle_llm_interaction(username, user_message)
+            # In streaming mode, tokens, podiums and tool-call progress are emitted as they happen
+            async def on_event(event, payload):
+                await sio.emit(event, payload, room=sid)
+
+            # Forward the message to the LLM service; the turn is cancelled if the client disconnects
+            reply = asyncio.ensure_future(handle_llm_interaction(
+                username, user_message, on_event=on_event if data.get('stream') else None
+            ))
+            pending_replies[sid] = reply
+            try:
+                llm_response = await reply
+            except asyncio.CancelledError:
+                logger.info(f"LLM reply to {username} cancelled.")
+                return
+            finally:
+                if pending_replies.get(sid) is reply:
+                    del pending_replies[sid]
             # Emit the LLM's response back to the client
             await sio.emit('message', {'content': llm_response}, room=sid)
             logger.debug(f"Sent LLM response to {username}: {llm_response}")
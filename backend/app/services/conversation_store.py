@@ -0,0 +1,530 @@
+# app/services/conversation_store.py
+
+import asyncio
+import json
+import logging
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional
+
+logger = logging.getLogger("conversation_store")
+
+# Rough size of a message's bookkeeping (role, name, JSON framing) beyond its content
+MESSAGE_OVERHEAD_BYTES = 64
+
+# Summaries of compacted tool outputs list at most this many items
+SUMMARY_MAX_ITEMS = 5
+SUMMARY_PREFIX = "[Earlier "
+
+
+# Roles holding tool outputs: "tool" for tool calls, "function" for legacy function calls
+TOOL_ROLES = ("tool", "function")
+
+
+def _tool_calls_size(message: Dict[str, str]) -> int:
+    tool_calls = message.get("tool_calls")
+    return len(json.dumps(tool_calls)) if tool_calls else 0
+
+
+def estimate_tokens(message: Dict[str, str]) -> int:
+    """
+    Approximates a message's prompt tokens at four characters per token.
+    """
+    return (len(message.get("content") or "") + len(message.get("name") or "") + _tool_calls_size(message)) // 4 + 4
+
+
+def message_bytes(message: Dict[str, str]) -> int:
+    return len((message.get("content") or "").encode("utf-8")) + _tool_calls_size(message) + MESSAGE_OVERHEAD_BYTES
+
+
+def summarize_tool_output(message: Dict[str, str]) -> Dict[str, str]:
+    """
+    Replaces a tool output with a one-line summary of the items it returned.
+    """
+    name = message.get("name", "tool")
+    try:
+        podiums = json.loads(message.get("content") or "{}").get("podiums") or []
+    except (json.JSONDecodeError, AttributeError):
+        podiums = []
+    items = ", ".join(
+        f"{p.get('item_name')} (${p.get('item_price')})" for p in podiums[:SUMMARY_MAX_ITEMS]
+    )
+    more = f" and {len(podiums) - SUMMARY_MAX_ITEMS} more" if len(podiums) > SUMMARY_MAX_ITEMS else ""
+    summary = f"{SUMMARY_PREFIX}{name} result, summarized: {len(podiums)} items{': ' + items if items else ''}{more}]"
+    summarized = {"role": message["role"], "name": name, "content": summary}
+    if "tool_call_id" in message:
+        summarized["tool_call_id"] = message["tool_call_id"]
+    return summarized
+
+
+class ConversationBackend(ABC):
+    """
+    Where conversations and chat sessions live beyond one process.
+    """
+
+    # False when the store's cache is the only copy and nothing needs writing back
+    persistent = True
+
+    @abstractmethod
+    async def load_conversation(self, username: str) -> Optional[List[Dict[str, str]]]:
+        ...
+
+    @abstractmethod
+    async def save_conversations(self, conversations: Dict[str, List[Dict[str, str]]]):
+        ...
+
+    @abstractmethod
+    async def delete_conversation(self, username: str):
+        ...
+
+    @abstractmethod
+    async def save_session(self, sid: str, user: dict):
+        ...
+
+    @abstractmethod
+    async def load_session(self, sid: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    async def delete_session(self, sid: str):
+        ...
+
+
+class MemoryConversationBackend(ConversationBackend):
+    """
+    Single-process backend: conversations exist only in the store's cache.
+    """
+
+    persistent = False
+
+    def __init__(self):
+        self.sessions: Dict[str, dict] = {}
+
+    async def load_conversation(self, username: str) -> Optional[List[Dict[str, str]]]:
+        return None
+
+    async def save_conversations(self, conversations: Dict[str, List[Dict[str, str]]]):
+        pass
+
+    async def delete_conversation(self, username: str):
+        pass
+
+    async def save_session(self, sid: str, user: dict):
+        self.sessions[sid] = user
+
+    async def load_session(self, sid: str) -> Optional[dict]:
+        return self.sessions.get(sid)
+
+    async def delete_session(self, sid: str):
+        self.sessions.pop(sid, None)
+
+
+class ElasticsearchConversationBackend(ConversationBackend):
+    """
+    Shared backend for several workers or pods: one document per conversation in
+    `chat_conversations` and one per connected Socket.IO session in `chat_sessions`.
+    """
+
+    def __init__(self, es, conversations_index: str = "chat_conversations", sessions_index: str = "chat_sessions"):
+        self.es = es
+        self.conversations_index = conversations_index
+        self.sessions_index = sessions_index
+
+    async def load_conversation(self, username: str) -> Optional[List[Dict[str, str]]]:
+        response = await self.es.options(ignore_status=404).get(index=self.conversations_index, id=username)
+        if not response.get("found"):
+            return None
+        return response["_source"].get("messages") or None
+
+    async def save_conversations(self, conversations: Dict[str, List[Dict[str, str]]]):
+        operations = []
+        now = datetime.utcnow().isoformat()
+        for username, messages in conversations.items():
+            operations.append({"index": {"_index": self.conversations_index, "_id": username}})
+            operations.append({"username": username, "messages": messages, "updated_at": now})
+        response = await self.es.bulk(operations=operations)
+        if response.get("errors"):
+            failed = [
+                item["index"]["_id"] for item in response["items"] if item["index"].get("error")
+            ]
+            raise RuntimeError(f"Failed to save conversations: {failed}")
+
+    async def delete_conversation(self, username: str):
+        await self.es.options(ignore_status=404).delete(index=self.conversations_index, id=username)
+
+    async def save_session(self, sid: str, user: dict):
+        await self.es.index(
+            index=self.sessions_index,
+            id=sid,
+            document={"username": user.get("username"), "user": user, "connected_at": datetime.utcnow().isoformat()}
+        )
+
+    async def load_session(self, sid: str) -> Optional[dict]:
+        response = await self.es.options(ignore_status=404).get(index=self.sessions_index, id=sid)
+        if not response.get("found"):
+            return None
+        return response["_source"].get("user")
+
+    async def delete_session(self, sid: str):
+        await self.es.options(ignore_status=404).delete(index=self.sessions_index, id=sid)
+
+
+class SessionRegistry:
+    """
+    Socket.IO session ID to user, cached locally and written through to the backend.
+    """
+
+    def __init__(self, backend: ConversationBackend):
+        self.backend = backend
+        self._users: Dict[str, dict] = {}
+
+    async def set(self, sid: str, user: dict):
+        self._users[sid] = user
+        try:
+            await self.backend.save_session(sid, user)
+        except Exception as e:
+            logger.error(f"Failed to save session '{sid}': {e}")
+
+    async def get(self, sid: str) -> Optional[dict]:
+        user = self._users.get(sid)
+        if user is None:
+            try:
+                user = await self.backend.load_session(sid)
+            except Exception as e:
+                logger.error(f"Failed to load session '{sid}': {e}")
+            if user is not None:
+                self._users[sid] = user
+        return user
+
+    async def pop(self, sid: str) -> Optional[dict]:
+        user = self._users.pop(sid, None)
+        try:
+            if user is None:
+                user = await self.backend.load_session(sid)
+            await self.backend.delete_session(sid)
+        except Exception as e:
+            logger.error(f"Failed to delete session '{sid}': {e}")
+        return user
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+
+class Conversation:
+    """
+    One user's message history with its size bookkeeping.
+    """
+
+    def __init__(self, messages: List[Dict[str, str]]):
+        self.messages = messages
+        self.tokens = sum(estimate_tokens(m) for m in messages)
+        self.bytes = sum(message_bytes(m) for m in messages)
+        self.last_used = time.monotonic()
+        self.in_use = 0  # Turns in progress; a conversation in use is never evicted
+
+    def recount(self):
+        self.tokens = sum(estimate_tokens(m) for m in self.messages)
+        self.bytes = sum(message_bytes(m) for m in self.messages)
+
+
+class ConversationStore:
+    """
+    Holds per-user LLM conversations within a token budget each and a byte cap overall.
+
+    Over its token budget, a conversation first has older tool outputs replaced by short
+    summaries, keeping the most recent `keep_tool_outputs` intact, and then loses its
+    oldest turns. The system prompt and the turn in progress are always kept. Over the
+    global byte cap, or idle longer than `idle_ttl` seconds, the least recently used
+    conversations are evicted.
+
+    With a persistent backend this is a write-back cache: conversations are loaded on
+    first use, changed ones are marked dirty and saved in batches by `flush`, and
+    evicted dirty conversations are held until the next flush has saved them.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 64 * 1024 * 1024,
+        token_budget: int = 12000,
+        keep_tool_outputs: int = 2,
+        idle_ttl: float = 3600.0,
+        backend: Optional[ConversationBackend] = None
+    ):
+        self.max_bytes = max_bytes
+        self.token_budget = token_budget
+        self.keep_tool_outputs = keep_tool_outputs
+        self.idle_ttl = idle_ttl
+        self.backend = backend or MemoryConversationBackend()
+        self._conversations: "OrderedDict[str, Conversation]" = OrderedDict()
+        self._dirty = set()
+        self._evicted_dirty: Dict[str, List[Dict[str, str]]] = {}
+        self._flush_lock = asyncio.Lock()
+        self._flusher: Optional[asyncio.Task] = None
+        self.bytes = 0
+        self.loaded = 0
+        self.flushed = 0
+        self.flush_errors = 0
+        self.evicted = 0
+        self.summarized = 0
+        self.trimmed_turns = 0
+
+    def __contains__(self, username: str) -> bool:
+        return username in self._conversations
+
+    def _touch(self, username: str) -> Optional[Conversation]:
+        conversation = self._conversations.get(username)
+        if conversation is not None:
+            conversation.last_used = time.monotonic()
+            self._conversations.move_to_end(username)
+        return conversation
+
+    def get(self, username: str) -> Optional[List[Dict[str, str]]]:
+        """
+        Returns the user's messages, or None if there is no conversation.
+        """
+        conversation = self._touch(username)
+        return conversation.messages if conversation else None
+
+    async def open(self, username: str, system_prompt: str) -> List[Dict[str, str]]:
+        """
+        Returns the user's messages, loading them from the backend or starting a
+        conversation with the system prompt if needed. Each call must be paired with
+        `release` once the turn is over.
+        """
+        conversation = self._touch(username)
+        if conversation is not None:
+            conversation.in_use += 1
+            return conversation.messages
+
+        # Evicted before its changes were saved: take it back, still dirty
+        messages = self._evicted_dirty.pop(username, None)
+        unsaved = messages is not None
+        if messages is None and self.backend.persistent:
+            try:
+                messages = await self.backend.load_conversation(username)
+            except Exception as e:
+                logger.error(f"Failed to load conversation for user '{username}': {e}")
+            # Another turn may have opened it while this one was loading
+            conversation = self._touch(username)
+            if conversation is not None:
+                conversation.in_use += 1
+                return conversation.messages
+
+        if messages:
+            # Always run with the current system prompt
+            messages = [{"role": "system", "content": system_prompt}, *messages[1:]]
+            self.loaded += 1
+            logger.debug(f"Loaded conversation for user '{username}' ({len(messages)} messages).")
+        else:
+            messages = [{"role": "system", "content": system_prompt}]
+            logger.debug(f"Started conversation for user '{username}'.")
+        conversation = Conversation(messages)
+        conversation.in_use += 1
+        self._conversations[username] = conversation
+        self.bytes += conversation.bytes
+        if unsaved:
+            self._dirty.add(username)
+        self._evict(keep=username)
+        return conversation.messages
+
+    def release(self, username: str):
+        """
+        Ends a turn started with `open`, letting the conversation be evicted again.
+        """
+        conversation = self._conversations.get(username)
+        if conversation is not None and conversation.in_use:
+            conversation.in_use -= 1
+
+    def _mark_dirty(self, username: str):
+        if self.backend.persistent:
+            self._dirty.add(username)
+            self._evicted_dirty.pop(username, None)
+
+    def append(self, username: str, message: Dict[str, str]):
+        """
+        Adds a message, then brings the conversation back within its budget and the store within its cap.
+        """
+        conversation = self._touch(username)
+        if conversation is None:
+            raise KeyError(username)
+        conversation.messages.append(message)
+        before = conversation.bytes
+        conversation.tokens += estimate_tokens(message)
+        conversation.bytes += message_bytes(message)
+        if conversation.tokens > self.token_budget:
+            self._compact(conversation)
+        self.bytes += conversation.bytes - before
+        self._mark_dirty(username)
+        self._evict(keep=username)
+
+    def discard_turn(self, username: str):
+        """
+        Removes the latest user message and everything after it, e.g. for a cancelled turn.
+        """
+        conversation = self._conversations.get(username)
+        if conversation is None:
+            return
+        messages = conversation.messages
+        for index in range(len(messages) - 1, 0, -1):
+            if messages[index]["role"] == "user":
+                del messages[index:]
+                break
+        before = conversation.bytes
+        conversation.recount()
+        self.bytes += conversation.bytes - before
+        self._mark_dirty(username)
+
+    def remove(self, username: str):
+        """
+        Drops the cached conversation; unsaved changes are kept for the next flush.
+        """
+        conversation = self._conversations.pop(username, None)
+        if conversation is not None:
+            self.bytes -= conversation.bytes
+            if username in self._dirty:
+                self._dirty.discard(username)
+                self._evicted_dirty[username] = conversation.messages
+
+    def invalidate(self, username: str):
+        """
+        Drops a cached conversation with no unsaved changes, so the next turn reloads it;
+        used when a user connects, in case another worker has served them since.
+        Without a persistent backend the cache is the only copy, so nothing is dropped.
+        """
+        if not self.backend.persistent:
+            return
+        if username in self._dirty or username in self._evicted_dirty:
+            return
+        conversation = self._conversations.get(username)
+        if conversation is not None and not conversation.in_use:
+            del self._conversations[username]
+            self.bytes -= conversation.bytes
+
+    async def flush(self, username: Optional[str] = None):
+        """
+        Saves dirty conversations (or just one user's) to the backend in a single batch.
+        """
+        if not self.backend.persistent:
+            return
+        async with self._flush_lock:
+            if username is not None:
+                names = [username] if username in self._dirty or username in self._evicted_dirty else []
+            else:
+                names = list(self._dirty | set(self._evicted_dirty))
+            if not names:
+                return
+            batch = {}
+            for name in names:
+                conversation = self._conversations.get(name)
+                batch[name] = list(conversation.messages) if conversation else self._evicted_dirty[name]
+                self._dirty.discard(name)
+            try:
+                await self.backend.save_conversations(batch)
+            except Exception as e:
+                self.flush_errors += 1
+                logger.error(f"Failed to save {len(batch)} conversations: {e}")
+                for name, messages in batch.items():
+                    if name in self._conversations:
+                        self._dirty.add(name)
+                    else:
+                        self._evicted_dirty.setdefault(name, messages)
+                return
+            for name, messages in batch.items():
+                if self._evicted_dirty.get(name) is messages:
+                    del self._evicted_dirty[name]
+            self.flushed += len(batch)
+
+    async def _flush_periodically(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            await self.flush()
+
+    def start_flusher(self, interval: float):
+        """
+        Starts saving dirty conversations every `interval` seconds.
+        """
+        if self.backend.persistent and self._flusher is None:
+            self._flusher = asyncio.create_task(self._flush_periodically(interval))
+
+    async def close(self):
+        """
+        Stops the flusher and saves everything still dirty.
+        """
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        await self.flush()
+
+    def _current_turn_start(self, messages: List[Dict[str, str]]) -> int:
+        for index in range(len(messages) - 1, 0, -1):
+            if messages[index]["role"] == "user":
+                return index
+        return len(messages)
+
+    def _compact(self, conversation: Conversation):
+        messages = conversation.messages
+
+        # Summarize tool outputs, oldest first, keeping the most recent ones verbatim
+        tool_indexes = [
+            i for i, m in enumerate(messages)
+            if m["role"] in TOOL_ROLES and not (m.get("content") or "").startswith(SUMMARY_PREFIX)
+        ]
+        for index in tool_indexes[:max(len(tool_indexes) - self.keep_tool_outputs, 0)]:
+            if conversation.tokens <= self.token_budget:
+                break
+            old = messages[index]
+            messages[index] = summarize_tool_output(old)
+            conversation.tokens += estimate_tokens(messages[index]) - estimate_tokens(old)
+            conversation.bytes += message_bytes(messages[index]) - message_bytes(old)
+            self.summarized += 1
+
+        # Drop the oldest whole turns after the system prompt, never the one in progress
+        while conversation.tokens > self.token_budget:
+            current = self._current_turn_start(messages)
+            if current <= 1:
+                break
+            end = 2
+            while end < current and messages[end]["role"] != "user":
+                end += 1
+            dropped = messages[1:end]
+            del messages[1:end]
+            conversation.tokens -= sum(estimate_tokens(m) for m in dropped)
+            conversation.bytes -= sum(message_bytes(m) for m in dropped)
+            self.trimmed_turns += 1
+
+    def _evict(self, keep: Optional[str] = None):
+        now = time.monotonic()
+        for username, conversation in list(self._conversations.items()):
+            idle = now - conversation.last_used > self.idle_ttl
+            if not idle and self.bytes <= self.max_bytes:
+                break
+            if username == keep or conversation.in_use:
+                continue
+            self.remove(username)
+            self.evicted += 1
+            logger.debug(f"Evicted conversation for user '{username}' ({'idle' if idle else 'memory cap'}).")
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Size counters for monitoring.
+        """
+        return {
+            "conversations": len(self._conversations),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "messages": sum(len(c.messages) for c in self._conversations.values()),
+            "evicted": self.evicted,
+            "summarized_tool_outputs": self.summarized,
+            "trimmed_turns": self.trimmed_turns,
+            "backend": type(self.backend).__name__,
+            "loaded": self.loaded,
+            "dirty": len(self._dirty) + len(self._evicted_dirty),
+            "flushed": self.flushed,
+            "flush_errors": self.flush_errors
+        }
@@ -191,6 +191,24 @@ async def initialize_indices():
                     "username": {"type": "keyword"}  # Optional: associate token with username upon registration
                 }
             }
+        },
+        "chat_conversations": {  # Used when CONVERSATION_BACKEND=elasticsearch
+            "mappings": {
+                "properties": {
+                    "username": {"type": "keyword"},
+                    "messages": {"type": "object", "enabled": False},
+                    "updated_at": {"type": "date"}
+                }
+            }
+        },
+        "chat_sessions": {  # Used when CONVERSATION_BACKEND=elasticsearch
+            "mappings": {
+                "properties": {
+                    "username": {"type": "keyword"},
+                    "user": {"type": "object", "enabled": False},
+                    "connected_at": {"type": "date"}
+                }
+            }
         }
     }
 
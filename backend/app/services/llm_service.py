@@ -4,15 +4,35 @@ from app.schemas import AssistantResponse, Podium
 from jsonschema import validate, ValidationError
 import json
 import logging
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Callable, Awaitable
 import openai
+import httpx
 import asyncio
 from app.services.elastic_service import es, get_all_categories
+from app.services.conversation_store import (
+    ConversationStore,
+    MemoryConversationBackend,
+    ElasticsearchConversationBackend
+)
+from app.utils.json_stream import PodiumStreamParser
 from app.config import (
     AZURE_OPENAI_API_KEY,
     AZURE_OPENAI_ENDPOINT,
     AZURE_OPENAI_DEPLOYMENT_NAME,
-    AZURE_OPENAI_API_VERSION
+    AZURE_OPENAI_API_VERSION,
+    LLM_MAX_CONCURRENCY,
+    LLM_QUEUE_TIMEOUT,
+    LLM_REQUEST_TIMEOUT,
+    LLM_CONNECT_TIMEOUT,
+    LLM_MAX_RETRIES,
+    LLM_POOL_MAX_CONNECTIONS,
+    LLM_POOL_MAX_KEEPALIVE,
+    LLM_POOL_KEEPALIVE_EXPIRY,
+    CONVERSATION_MAX_BYTES,
+    CONVERSATION_TOKEN_BUDGET,
+    CONVERSATION_KEEP_TOOL_OUTPUTS,
+    CONVERSATION_IDLE_TTL,
+    CONVERSATION_BACKEND
 )
 from pydantic import ValidationError as PydanticValidationError
 import traceback
@@ -30,8 +50,20 @@ logger.addHandler(handler)
 # Define a global variable to hold categories
 CATEGORIES = []
 
-# Define a global conversation history per user
-conversation_histories: Dict[str, List[Dict[str, str]]] = {}
+# Conversation history per user, bounded per conversation and overall, and shared
+# between workers when CONVERSATION_BACKEND is "elasticsearch"
+if CONVERSATION_BACKEND == "elasticsearch":
+    conversation_backend = ElasticsearchConversationBackend(es)
+else:
+    conversation_backend = MemoryConversationBackend()
+
+conversation_store = ConversationStore(
+    max_bytes=CONVERSATION_MAX_BYTES,
+    token_budget=CONVERSATION_TOKEN_BUDGET,
+    keep_tool_outputs=CONVERSATION_KEEP_TOOL_OUTPUTS,
+    idle_ttl=CONVERSATION_IDLE_TTL,
+    backend=conversation_backend
+)
 
 # Validate environment variables
 required_configs = [
@@ -52,13 +84,42 @@ if not USE_AZURE:
     logger.warning(f"Azure OpenAI not configured. Missing: {', '.join(missing)}. Falling back to non-Azure behavior.")
     client = None
 else:
-    # Initialize AzureOpenAI client
-    client = openai.AzureOpenAI(
+    # Initialize the async AzureOpenAI client on one shared keep-alive connection pool,
+    # so concurrent chat turns reuse connections instead of each holding an executor thread
+    client = openai.AsyncAzureOpenAI(
         api_key=AZURE_OPENAI_API_KEY,
         azure_endpoint=AZURE_OPENAI_ENDPOINT,
-        api_version=AZURE_OPENAI_API_VERSION
+        api_version=AZURE_OPENAI_API_VERSION,
+        max_retries=LLM_MAX_RETRIES,
+        timeout=httpx.Timeout(LLM_REQUEST_TIMEOUT, connect=LLM_CONNECT_TIMEOUT),
+        http_client=openai.DefaultAsyncHttpxClient(
+            limits=httpx.Limits(
+                max_connections=LLM_POOL_MAX_CONNECTIONS,
+                max_keepalive_connections=LLM_POOL_MAX_KEEPALIVE,
+                keepalive_expiry=LLM_POOL_KEEPALIVE_EXPIRY
+            )
+        )
     )
 
+# Receives streaming events as (event name, payload)
+EventCallback = Callable[[str, dict], Awaitable[None]]
+
+# Caps completions in flight across all users; further turns wait up to LLM_QUEUE_TIMEOUT for a slot
+completion_slots = asyncio.Semaphore(max(LLM_MAX_CONCURRENCY, 1))
+
+
+class LLMBusyError(Exception):
+    """Raised when no completion slot frees up within LLM_QUEUE_TIMEOUT."""
+
+
+async def close_llm_client():
+    """
+    Closes the shared LLM client and its connection pool.
+    """
+    if client is not None:
+        await client.close()
+        logger.info("LLM client connection pool closed.")
+
 def set_categories(categories: list):
     """
     Sets the global categories list.
@@ -79,10 +140,17 @@ query_elasticsearch_schema = {
                 "description": "The search query related to grocery items."
             }
         },
-        "required": ["query"]
+        "required": ["query"],
+        "additionalProperties": False
     }
 }
 
+# The same function offered as a strict tool, so the model can request several searches in one turn
+query_elasticsearch_tool = {
+    "type": "function",
+    "function": {**query_elasticsearch_schema, "strict": True}
+}
+
 # Define the JSON schema for the assistant's response
 assistant_response_schema = AssistantResponse.schema()
 
@@ -102,6 +170,7 @@ The real purpose of the game is to see how well the user can craft prompts to in
 
 Instructions:
 - Use the provided 'query_elasticsearch' function to fetch up-to-date information about grocery items when needed.
+  - When you need several searches (for example one per category), request them all at once rather than one at a time.
 - Your responses should follow the specified JSON schema to allow for easy parsing.
 - You will receive instructions from the user on what to do; however, there are some overall rules to follow.
 
@@ -123,102 +192,283 @@ ONLY REPLY WITH THE JSON OBJECT WITHOUT ANY ADDITIONAL TEXT OR MARKDOWN.
 """
     return prompt
 
-async def query_elasticsearch(query: str) -> dict:
+async def create_completion(
+    messages: List[Dict[str, str]],
+    timeout: Optional[float] = None,
+    on_event: Optional[EventCallback] = None
+):
     """
-    Performs a hybrid semantic and lexical search on the 'grocery_items' index based on user input.
+    Requests one structured completion while holding a slot of the in-flight limit.
 
-    :param query: The search query related to grocery items.
-    :return: A dictionary containing search results.
+    With on_event, the completion is streamed: each content token is sent as a
+    'token' event and each podium as a 'podium' event once its JSON object is complete.
+
+    :param messages: The conversation to send to the model.
+    :param timeout: Seconds to wait for this completion; defaults to LLM_REQUEST_TIMEOUT.
+    :param on_event: Optional coroutine receiving streaming events.
+    :return: The parsed chat completion.
     """
     try:
-        response = await es.search(
-            index="grocery_items",
-            body={
-                "retriever": {
-                    "rrf": {
-                        "retrievers": [
-                            {
-                                "standard": {
+        await asyncio.wait_for(completion_slots.acquire(), LLM_QUEUE_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise LLMBusyError(f"No completion slot available within {LLM_QUEUE_TIMEOUT}s")
+    request = dict(
+        model=AZURE_OPENAI_DEPLOYMENT_NAME,
+        messages=messages,
+        tools=[query_elasticsearch_tool],
+        parallel_tool_calls=True,
+        response_format=AssistantResponse,  # Specify the Pydantic model for parsing
+        timeout=timeout if timeout is not None else LLM_REQUEST_TIMEOUT
+    )
+    try:
+        if on_event is None:
+            return await client.beta.chat.completions.parse(**request)  # Use the 'parse' method for Structured Outputs
+
+        parser = PodiumStreamParser()
+        async with client.beta.chat.completions.stream(**request) as stream:
+            async for event in stream:
+                if event.type != "content.delta" or not event.delta:
+                    continue
+                await on_event("token", {"content": event.delta})
+                for podium in parser.feed(event.delta):
+                    try:
+                        await on_event("podium", Podium.parse_obj(podium).dict())
+                    except PydanticValidationError:
+                        logger.debug(f"Skipping malformed streamed podium: {podium}")
+            return await stream.get_final_completion()
+    finally:
+        completion_slots.release()
+
+def hybrid_search_body(query: str) -> dict:
+    """
+    Builds the hybrid semantic and lexical search request for the 'grocery_items' index.
+
+    :param query: The search query related to grocery items.
+    :return: The search request body.
+    """
+    return {
+        "retriever": {
+            "rrf": {
+                "retrievers": [
+                    {
+                        "standard": {
+                            "query": {
+                                "nested": {
+                                    "path": "Product Description_semantic.inference.chunks",
                                     "query": {
-                                        "nested": {
-                                            "path": "Product Description_semantic.inference.chunks",
-                                            "query": {
-                                                "sparse_vector": {
-                                                    "inference_id": "elser-endpoint",
-                                                    "field": "Product Description_semantic.inference.chunks.embeddings",
-                                                    "query": query
-                                                }
-                                            },
-                                            "inner_hits": {
-                                                "size": 2,
-                                                "name": "grocery_items.Product Description_semantic",
-                                                "_source": [
-                                                    "Product Description_semantic.inference.chunks.text"
-                                                ]
-                                            }
+                                        "sparse_vector": {
+                                            "inference_id": "elser-endpoint",
+                                            "field": "Product Description_semantic.inference.chunks.embeddings",
+                                            "query": query
                                         }
+                                    },
+                                    "inner_hits": {
+                                        "size": 2,
+                                        "name": "grocery_items.Product Description_semantic",
+                                        "_source": [
+                                            "Product Description_semantic.inference.chunks.text"
+                                        ]
                                     }
                                 }
-                            },
-                            {
-                                "standard": {
+                            }
+                        }
+                    },
+                    {
+                        "standard": {
+                            "query": {
+                                "nested": {
+                                    "path": "Title_semantic.inference.chunks",
                                     "query": {
-                                        "nested": {
-                                            "path": "Title_semantic.inference.chunks",
-                                            "query": {
-                                                "sparse_vector": {
-                                                    "inference_id": "elser-endpoint",
-                                                    "field": "Title_semantic.inference.chunks.embeddings",
-                                                    "query": query
-                                                }
-                                            },
-                                            "inner_hits": {
-                                                "size": 2,
-                                                "name": "grocery_items.Title_semantic",
-                                                "_source": [
-                                                    "Title_semantic.inference.chunks.text"
-                                                ]
-                                            }
+                                        "sparse_vector": {
+                                            "inference_id": "elser-endpoint",
+                                            "field": "Title_semantic.inference.chunks.embeddings",
+                                            "query": query
                                         }
+                                    },
+                                    "inner_hits": {
+                                        "size": 2,
+                                        "name": "grocery_items.Title_semantic",
+                                        "_source": [
+                                            "Title_semantic.inference.chunks.text"
+                                        ]
                                     }
                                 }
-                            },
-                            {
-                                "standard": {
-                                    "query": {
-                                        "multi_match": {
-                                            "query": query,
-                                            "fields": [
-                                                "Title",
-                                                "Feature",
-                                                "Product Description"
-                                            ]
-                                        }
-                                    }
+                            }
+                        }
+                    },
+                    {
+                        "standard": {
+                            "query": {
+                                "multi_match": {
+                                    "query": query,
+                                    "fields": [
+                                        "Title",
+                                        "Feature",
+                                        "Product Description"
+                                    ]
                                 }
                             }
-                        ],
-                        "rank_window_size": 20
+                        }
                     }
-                },
-                "size": 20,
-                "fields": [
-                    "Product Description",
-                    "Price",
-                    "Sub Category",
-                    "Title"
                 ],
-                "_source": False
+                "rank_window_size": 20
             }
-        )
-        hits = response['hits']['hits']
-        results = [hit['fields'] for hit in hits]
+        },
+        "size": 20,
+        "fields": [
+            "Product Description",
+            "Price",
+            "Sub Category",
+            "Title"
+        ],
+        "_source": False
+    }
+
+def search_hits_to_results(response: dict) -> List[dict]:
+    return [hit['fields'] for hit in response['hits']['hits']]
+
+async def query_elasticsearch(query: str) -> dict:
+    """
+    Performs a hybrid semantic and lexical search on the 'grocery_items' index based on user input.
+
+    :param query: The search query related to grocery items.
+    :return: A dictionary containing search results.
+    """
+    try:
+        response = await es.search(index="grocery_items", body=hybrid_search_body(query))
+        results = search_hits_to_results(response)
         logger.debug(f"Elasticsearch hybrid search results for '{query}': {results}")
         return {"results": results}
     except Exception as e:
         logger.error(f"Error performing hybrid search: {e}")
         return {"error": "Failed to retrieve data from Elasticsearch."}
 
+async def query_elasticsearch_batch(queries: List[str]) -> List[dict]:
+    """
+    Runs several hybrid searches in a single _msearch request; Elasticsearch executes them concurrently.
+
+    :param queries: The search queries, one per tool call.
+    :return: One dictionary per query, in order, shaped like query_elasticsearch's result.
+    """
+    if len(queries) == 1:
+        return [await query_elasticsearch(queries[0])]
+    searches = []
+    for query in queries:
+        searches.append({"index": "grocery_items"})
+        searches.append(hybrid_search_body(query))
+    try:
+        response = await es.msearch(searches=searches)
+    except Exception as e:
+        logger.error(f"Error performing hybrid multi-search: {e}")
+        return [{"error": "Failed to retrieve data from Elasticsearch."} for _ in queries]
+
+    outcomes = []
+    for query, item in zip(queries, response['responses']):
+        if 'error' in item:
+            logger.error(f"Error performing hybrid search for '{query}': {item['error']}")
+            outcomes.append({"error": "Failed to retrieve data from Elasticsearch."})
+        else:
+            results = search_hits_to_results(item)
+            logger.debug(f"Elasticsearch hybrid search results for '{query}': {results}")
+            outcomes.append({"results": results})
+    return outcomes
+
+def search_results_to_response(query: str, function_response: dict) -> AssistantResponse:
+    """
+    Turns search results into the AssistantResponse fed back to the model as the tool output.
+    """
+    # Extract relevant information from the search results
+    podiums: List[Podium] = []
+    if "results" in function_response and isinstance(function_response["results"], list):
+        for idx, item in enumerate(function_response["results"], start=1):
+            title_list = item.get("Title", [])
+            price_list = item.get("Price", [])
+            title = title_list[0] if title_list else "No Title"
+            price_str = price_list[0] if price_list else "$0"
+            try:
+                price = float(price_str.replace('$', '').replace(',', '').strip())
+            except ValueError:
+                price = 0.0
+            podium = Podium(
+                podium=idx,
+                item_name=title,
+                item_price=price,
+                quantity=1,
+                total_price=price * 1
+            )
+            podiums.append(podium)
+    else:
+        logger.warning(f"No results found for query '{query}'.")
+
+    # Construct the AssistantResponse
+    return AssistantResponse(
+        podiums=podiums,
+        overall_total=sum(p.total_price for p in podiums),
+        other_info=None,
+        proposed_solution=True
+    )
+
+async def execute_tool_calls(username: str, tool_calls: list, on_event: Optional[EventCallback] = None) -> List[AssistantResponse]:
+    """
+    Executes every tool call of one model turn. All searches, deduplicated by query, go to
+    Elasticsearch in one _msearch request.
+
+    :param username: The username of the user interacting with the assistant.
+    :param tool_calls: The tool calls from the assistant message.
+    :param on_event: Optional coroutine receiving 'tool_call_start' and 'tool_call_end' events.
+    :return: One AssistantResponse per tool call, in order.
+    """
+    responses: List[Optional[AssistantResponse]] = [None] * len(tool_calls)
+    queries: Dict[str, List[int]] = {}
+
+    for index, tool_call in enumerate(tool_calls):
+        function_name = tool_call.function.name
+        try:
+            function_args = json.loads(tool_call.function.arguments or "{}")
+        except json.JSONDecodeError:
+            function_args = {}
+
+        logger.debug(f"Tool call detected: {function_name} with arguments {function_args}")
+        if on_event:
+            await on_event("tool_call_start", {"id": tool_call.id, "name": function_name, "arguments": function_args})
+
+        if function_name == "query_elasticsearch":
+            query = function_args.get("query")
+            if query:
+                queries.setdefault(query, []).append(index)
+            else:
+                logger.error(f"No query provided in function call by user '{username}'.")
+                responses[index] = AssistantResponse(
+                    podiums=[],
+                    overall_total=0.0,
+                    other_info="No query provided to search for grocery items.",
+                    proposed_solution=False
+                )
+        else:
+            logger.error(f"Unknown function call: {function_name} for user '{username}'.")
+            responses[index] = AssistantResponse(
+                podiums=[],
+                overall_total=0.0,
+                other_info="I'm sorry, I encountered an unexpected error.",
+                proposed_solution=False
+            )
+
+    if queries:
+        results = await query_elasticsearch_batch(list(queries))
+        for (query, indexes), function_response in zip(queries.items(), results):
+            assistant_response = search_results_to_response(query, function_response)
+            for index in indexes:
+                responses[index] = assistant_response
+
+    if on_event:
+        for tool_call, assistant_response in zip(tool_calls, responses):
+            await on_event("tool_call_end", {
+                "id": tool_call.id,
+                "name": tool_call.function.name,
+                "result_count": len(assistant_response.podiums)
+            })
+    return responses
+
 def parse_single_json(json_string: str) -> Optional[dict]:
     """
     Parses a string containing one or more JSON objects and returns the first valid JSON object.
@@ -252,13 +502,24 @@ def validate_response(response: dict) -> bool:
         logger.error(f"Response validation error: {ve.message}")
         return False
 
-async def handle_llm_interaction(username: str, user_message: str) -> str:
+async def handle_llm_interaction(
+    username: str,
+    user_message: str,
+    timeout: Optional[float] = None,
+    on_event: Optional[EventCallback] = None
+) -> str:
     """
     Handles the interaction with the Language Learning Model (LLM) to generate assistant responses,
     allowing multiple function calls within a single interaction.
 
+    If the calling task is cancelled, the turn is dropped from the conversation history.
+    With on_event, completions are streamed ('token' and 'podium' events) and each function
+    call is bracketed by 'tool_call_start' and 'tool_call_end' events.
+
     :param username: The username of the user interacting with the assistant.
     :param user_message: The message sent by the user.
+    :param timeout: Seconds to wait for each completion; defaults to LLM_REQUEST_TIMEOUT.
+    :param on_event: Optional coroutine receiving streaming events.
     :return: The assistant's final response as a string.
     """
 
@@ -286,14 +547,12 @@ async def handle_llm_interaction(username: str, user_message: str) -> str:
                 "proposed_solution": False
             })
 
-    try:
-        # Initialize conversation history for the user if not present
-        if username not in conversation_histories:
-            conversation_histories[username] = [{"role": "system", "content": get_prompt_template()}]
-            logger.debug(f"Initialized conversation history for user '{username}'.")
+    # Initialize conversation history for the user if not present; it stays loaded until the turn ends
+    messages = await conversation_store.open(username, get_prompt_template())
 
+    try:
         # Append user message to conversation history
-        conversation_histories[username].append({"role": "user", "content": user_message})
+        conversation_store.append(username, {"role": "user", "content": user_message})
 
         max_iterations = 10  # Increased iterations to 10
         iteration = 0
@@ -305,13 +564,7 @@ async def handle_llm_interaction(username: str, user_message: str) -> str:
             logger.debug(f"LLM interaction iteration {iteration} for user '{username}'.")
 
             # Send the full conversation history to the LLM
-            completion = await asyncio.to_thread(
-                client.beta.chat.completions.parse,  # Use the 'parse' method for Structured Outputs
-                model=AZURE_OPENAI_DEPLOYMENT_NAME,
-                messages=conversation_histories[username],
-                functions=[query_elasticsearch_schema],
-                response_format=AssistantResponse  # Specify the Pydantic model for parsing
-            )
+            completion = await create_completion(messages, timeout=timeout, on_event=on_event)
 
             message = completion.choices[0].message
 
@@ -322,83 +575,43 @@ async def handle_llm_interaction(username: str, user_message: str) -> str:
                 # Store the assistant response
                 last_assistant_response = message.parsed.dict()
                 # Append assistant response to conversation history
-                conversation_histories[username].append({"role": "assistant", "content": json.dumps(message.parsed.dict())})
+                conversation_store.append(username, {"role": "assistant", "content": json.dumps(message.parsed.dict())})
                 return json.dumps(message.parsed.dict())
-            elif message.function_call:
-                function_name = message.function_call.name
-                function_args = json.loads(message.function_call.arguments)
-
-                logger.debug(f"Function call detected: {function_name} with arguments {function_args}")
-
-                # Execute the function
-                if function_name == "query_elasticsearch":
-                    query = function_args.get("query")
-                    if not query:
-                        logger.error(f"No query provided in function call by user '{username}'.")
-                        assistant_response = AssistantResponse(
-                            podiums=[],
-                            overall_total=0.0,
-                            other_info="No query provided to search for grocery items.",
-                            proposed_solution=False
-                        )
-                    else:
-                        # Execute the function
-                        function_response = await query_elasticsearch(query)
-
-                        # Extract relevant information from the search results
-                        podiums: List[Podium] = []
-                        if "results" in function_response and isinstance(function_response["results"], list):
-                            for idx, item in enumerate(function_response["results"], start=1):
-                                title_list = item.get("Title", [])
-                                price_list = item.get("Price", [])
-                                title = title_list[0] if title_list else "No Title"
-                                price_str = price_list[0] if price_list else "$0"
-                                try:
-                                    price = float(price_str.replace('$', '').replace(',', '').strip())
-                                except ValueError:
-                                    price = 0.0
-                                podium = Podium(
-                                    podium=idx,
-                                    item_name=title,
-                                    item_price=price,
-                                    quantity=1,
-                                    total_price=price * 1
-                                )
-                                podiums.append(podium)
-                        else:
-                            logger.warning(f"No results found for query '{query}'.")
-
-                        # Construct the AssistantResponse
-                        assistant_response = AssistantResponse(
-                            podiums=podiums,
-                            overall_total=sum(p.total_price for p in podiums),
-                            other_info=None,
-                            proposed_solution=True
-                        )
-
-                else:
-                    logger.error(f"Unknown function call: {function_name} for user '{username}'.")
-                    assistant_response = AssistantResponse(
-                        podiums=[],
-                        overall_total=0.0,
-                        other_info="I'm sorry, I encountered an unexpected error.",
-                        proposed_solution=False
-                    )
-
-                # Serialize to JSON and append to conversation history
-                assistant_response_json = assistant_response.dict()
-                # Store this as the last assistant response
-                last_assistant_response = assistant_response_json
-                conversation_histories[username].append({
-                    "role": "function",
-                    "name": function_name,
-                    "content": json.dumps(assistant_response_json)
+            elif message.tool_calls:
+                tool_calls = message.tool_calls
+                # Record the calls, then feed every result back in the same turn
+                conversation_store.append(username, {
+                    "role": "assistant",
+                    "content": None,
+                    "tool_calls": [
+                        {
+                            "id": tool_call.id,
+                            "type": "function",
+                            "function": {"name": tool_call.function.name, "arguments": tool_call.function.arguments}
+                        }
+                        for tool_call in tool_calls
+                    ]
                 })
 
+                # Execute the functions
+                assistant_responses = await execute_tool_calls(username, tool_calls, on_event)
+
+                for tool_call, assistant_response in zip(tool_calls, assistant_responses):
+                    # Serialize to JSON and append to conversation history
+                    assistant_response_json = assistant_response.dict()
+                    # Store this as the last assistant response
+                    last_assistant_response = assistant_response_json
+                    conversation_store.append(username, {
+                        "role": "tool",
+                        "tool_call_id": tool_call.id,
+                        "name": tool_call.function.name,
+                        "content": json.dumps(assistant_response_json)
+                    })
+
             elif message.refusal:
                 logger.warning(f"Assistant refused to respond for user '{username}': {message.refusal}")
                 # Append refusal to conversation history
-                conversation_histories[username].append({"role": "assistant", "content": "I'm sorry, I couldn't assist with that request."})
+                conversation_store.append(username, {"role": "assistant", "content": "I'm sorry, I couldn't assist with that request."})
                 return json.dumps({
                     "podiums": [],
                     "overall_total": 0.0,
@@ -409,7 +622,7 @@ async def handle_llm_interaction(username: str, user_message: str) -> str:
                 # Handle other unexpected scenarios
                 logger.error(f"Unexpected response structure for user '{username}': {message}")
                 # Append error message to conversation history
-                conversation_histories[username].append({"role": "assistant", "content": "I'm sorry, I encountered an unexpected error. Please try again."})
+                conversation_store.append(username, {"role": "assistant", "content": "I'm sorry, I encountered an unexpected error. Please try again."})
                 return json.dumps({
                     "podiums": [],
                     "overall_total": 0.0,
@@ -433,6 +646,18 @@ async def handle_llm_interaction(username: str, user_message: str) -> str:
                 "proposed_solution": False
             })
 
+    except asyncio.CancelledError:
+        logger.info(f"LLM interaction cancelled for user '{username}'.")
+        conversation_store.discard_turn(username)
+        raise
+    except LLMBusyError as e:
+        logger.warning(f"LLM busy for user '{username}': {e}")
+        return json.dumps({
+            "podiums": [],
+            "overall_total": 0.0,
+            "other_info": "Lots of players are chatting right now. Please try again in a moment.",
+            "proposed_solution": False
+        })
     except PydanticValidationError as e:
         logger.error(f"Pydantic validation error for user '{username}': {e}")
         logger.error(f"Validation errors: {e.errors()}")
@@ -442,6 +667,14 @@ async def handle_llm_interaction(username: str, user_message: str) -> str:
             "other_info": "I'm sorry, I couldn't understand my response correctly. Please try again.",
             "proposed_solution": False
         })
+    except openai.APITimeoutError as e:
+        logger.error(f"API timeout while processing user '{username}': {e}")
+        return json.dumps({
+            "podiums": [],
+            "overall_total": 0.0,
+            "other_info": "The AI service took too long to respond. Please try again.",
+            "proposed_solution": False
+        })
     except openai.APIConnectionError as e:
         logger.error(f"API connection error while processing user '{username}': {e}")
         return json.dumps({
@@ -470,3 +703,5 @@ async def handle_llm_interaction(username: str, user_message: str) -> str:
         logger.error(f"Unexpected error for user '{username}': {e}")
         logger.error(f"Full stack trace: {traceback.format_exc()}")
         raise
+    finally:
+        conversation_store.release(username)
@@ -0,0 +1,75 @@
+# app/utils/json_stream.py
+
+import json
+from typing import List, Optional
+
+
+class PodiumStreamParser:
+    """
+    Incremental scanner over a streamed AssistantResponse JSON document.
+
+    Feed it text chunks as they arrive; it returns each element of the top-level
+    "podiums" array as soon as that element's closing brace has been seen, without
+    waiting for the rest of the document.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.pos = 0
+        # One entry per open container: [kind, key in parent, start offset, expecting key]
+        self.stack: List[list] = []
+        self.in_string = False
+        self.escaped = False
+        self.string_start = 0
+        self.last_key: Optional[str] = None
+
+    def _in_podiums_array(self) -> bool:
+        return (
+            len(self.stack) == 2
+            and self.stack[0][0] == "{"
+            and self.stack[1][0] == "["
+            and self.stack[1][1] == "podiums"
+        )
+
+    def feed(self, chunk: str) -> List[dict]:
+        """
+        Adds a chunk of the document and returns the podiums completed by it.
+        """
+        self.buffer += chunk
+        completed = []
+        while self.pos < len(self.buffer):
+            char = self.buffer[self.pos]
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+                    top = self.stack[-1] if self.stack else None
+                    if top and top[0] == "{" and top[3]:
+                        self.last_key = json.loads(self.buffer[self.string_start:self.pos + 1])
+            elif char == '"':
+                self.in_string = True
+                self.string_start = self.pos
+            elif char in "{[":
+                key = self.last_key if self.stack and self.stack[-1][0] == "{" else None
+                self.stack.append([char, key, self.pos, char == "{"])
+                self.last_key = None
+            elif char in "}]":
+                if self.stack:
+                    _, _, start, _ = self.stack.pop()
+                    if char == "}" and self._in_podiums_array():
+                        try:
+                            completed.append(json.loads(self.buffer[start:self.pos + 1]))
+                        except json.JSONDecodeError:
+                            pass
+            elif char == ":":
+                if self.stack and self.stack[-1][0] == "{":
+                    self.stack[-1][3] = False
+            elif char == ",":
+                if self.stack and self.stack[-1][0] == "{":
+                    self.stack[-1][3] = True
+                    self.last_key = None
+            self.pos += 1
+        return completed
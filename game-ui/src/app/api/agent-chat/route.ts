@@ -562,15 +562,23 @@ function extractSuggestedItemsFromAgentResponse(agentResponse: any): any[] {
               continue;
             }
             
-            // Extract item_id with fallback
+            // Extract item_id with fallback; only catalog ids are sent on as item_id
             let itemId = '';
+            let catalogItemId: string | undefined;
             if (colIndex['item_id'] !== undefined && item[colIndex['item_id']] != null) {
               itemId = item[colIndex['item_id']].toString();
+              catalogItemId = itemId;
             } else {
               // Generate stable ID from name
               itemId = `item_${name.toLowerCase().replace(/\s+/g, '_')}_${index}`;
             }
             
+            // Store the price was quoted at, when the tool reports one
+            let storeId: string | undefined;
+            if (colIndex['store_id'] !== undefined && item[colIndex['store_id']] != null) {
+              storeId = item[colIndex['store_id']].toString();
+            }
+            
             console.log(`✅ Parsed item: name="${name}", price=$${bestPrice}, id=${itemId}`);
             
             let brand = '';
@@ -605,6 +613,8 @@ function extractSuggestedItemsFromAgentResponse(agentResponse: any): any[] {
             if (!isDuplicate) {
               suggestedItems.push({
                 id: itemId,
+                item_id: catalogItemId,
+                store_id: storeId,
                 name: name,
                 brand: brand,
                 category: category,
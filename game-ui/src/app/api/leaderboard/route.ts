@@ -19,7 +19,20 @@ export async function GET(request: NextRequest) {
     if (limit) url.searchParams.set('limit', String(limit));
     if (date) url.searchParams.set('date', date);
 
-    const response = await fetch(url.toString(), { method: 'GET' });
+    // Forward conditional requests so unchanged boards come back as 304s
+    const ifNoneMatch = request.headers.get('if-none-match');
+    const response = await fetch(url.toString(), {
+      method: 'GET',
+      headers: ifNoneMatch ? { 'If-None-Match': ifNoneMatch } : undefined,
+      cache: 'no-store'
+    });
+
+    const etag = response.headers.get('etag');
+    const cacheHeaders: Record<string, string> = etag ? { ETag: etag, 'Cache-Control': 'no-cache' } : {};
+
+    if (response.status === 304) {
+      return new NextResponse(null, { status: 304, headers: cacheHeaders });
+    }
 
     if (!response.ok) {
       const text = await response.text();
@@ -30,8 +43,11 @@ export async function GET(request: NextRequest) {
       );
     }
 
-    const data = await response.json();
-    return NextResponse.json(data);
+    // The body is already serialized upstream; pass it through untouched
+    const body = await response.text();
+    return new NextResponse(body, {
+      headers: { 'Content-Type': 'application/json', ...cacheHeaders }
+    });
 
   } catch (error) {
     console.error('❌ Leaderboard error:', error);
@@ -64,12 +80,29 @@ export async function POST(request: NextRequest) {
     
     const url = new URL('/api/submit-game', LEADERBOARD_API_URL);
 
+    // Retries of the same game are replayed by the API instead of being scored twice
+    const headers: Record<string, string> = { 'Content-Type': 'application/json' };
+    const idempotencyKey = request.headers.get('idempotency-key');
+    if (idempotencyKey) headers['Idempotency-Key'] = idempotencyKey;
+    // Only the last X-Forwarded-For entry is added by the platform in front of us; earlier ones come from the browser
+    const clientIp = request.ip || request.headers.get('x-forwarded-for')?.split(',').pop()?.trim();
+    if (clientIp) headers['X-Forwarded-For'] = clientIp;
+
     const response = await fetch(url.toString(), {
       method: 'POST',
-      headers: { 'Content-Type': 'application/json' },
+      headers,
       body: JSON.stringify(apiPayload)
     });
 
+    if (response.status === 429) {
+      // Shed under load; the idempotency key makes a later retry safe
+      const retryAfter = response.headers.get('retry-after') || '1';
+      return NextResponse.json(
+        { success: false, message: 'Too many submissions right now. Please retry shortly.' },
+        { status: 429, headers: { 'Retry-After': retryAfter } }
+      );
+    }
+
     if (!response.ok) {
       const text = await response.text();
       console.error('❌ Submit game proxy error:', response.status, text);
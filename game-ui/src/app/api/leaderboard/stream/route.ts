@@ -0,0 +1,55 @@
+import { NextRequest, NextResponse } from 'next/server';
+
+const LEADERBOARD_API_URL = process.env.NEXT_PUBLIC_LEADERBOARD_API_URL;
+
+export const dynamic = 'force-dynamic';
+
+export async function GET(request: NextRequest) {
+  try {
+    if (!LEADERBOARD_API_URL) {
+      return NextResponse.json(
+        { success: false, message: 'Leaderboard API URL not configured' },
+        { status: 500 }
+      );
+    }
+
+    const { searchParams } = new URL(request.url);
+    const date = searchParams.get('date') || undefined;
+
+    const url = new URL('/api/leaderboard/stream', LEADERBOARD_API_URL);
+    if (date) url.searchParams.set('date', date);
+
+    const response = await fetch(url.toString(), {
+      method: 'GET',
+      headers: { Accept: 'text/event-stream' },
+      cache: 'no-store',
+      signal: request.signal
+    });
+
+    if (!response.ok || !response.body) {
+      const text = await response.text();
+      console.error('❌ Leaderboard stream proxy error:', response.status, text);
+      return NextResponse.json(
+        { success: false, message: 'Failed to open leaderboard stream' },
+        { status: response.status || 502 }
+      );
+    }
+
+    // Pass the event stream straight through to the browser
+    return new Response(response.body, {
+      headers: {
+        'Content-Type': 'text/event-stream',
+        'Cache-Control': 'no-cache, no-transform',
+        Connection: 'keep-alive',
+        'X-Accel-Buffering': 'no'
+      }
+    });
+
+  } catch (error) {
+    console.error('❌ Leaderboard stream error:', error);
+    return NextResponse.json(
+      { success: false, message: 'Failed to open leaderboard stream' },
+      { status: 500 }
+    );
+  }
+}
@@ -14,12 +14,27 @@ export async function POST(request: NextRequest) {
     const payload = await request.json();
 
     const url = new URL('/api/validate-code', LEADERBOARD_API_URL);
+
+    // The API rate-limits per player, so pass on who the request came from
+    const headers: Record<string, string> = { 'Content-Type': 'application/json' };
+    // Only the last X-Forwarded-For entry is added by the platform in front of us; earlier ones come from the browser
+    const clientIp = request.ip || request.headers.get('x-forwarded-for')?.split(',').pop()?.trim();
+    if (clientIp) headers['X-Forwarded-For'] = clientIp;
+
     const response = await fetch(url.toString(), {
       method: 'POST',
-      headers: { 'Content-Type': 'application/json' },
+      headers,
       body: JSON.stringify(payload)
     });
 
+    if (response.status === 429) {
+      const retryAfter = response.headers.get('retry-after') || '1';
+      return NextResponse.json(
+        { success: false, message: 'Lots of players are joining right now. Please try again in a moment.' },
+        { status: 429, headers: { 'Retry-After': retryAfter } }
+      );
+    }
+
     if (!response.ok) {
       const text = await response.text();
       console.error('❌ Validate-code proxy error:', response.status, text);
@@ -178,13 +178,25 @@ export default function GameLayout() {
         agentUsed: selectedAgent?.id
       };
       
-      const response = await fetch('/api/leaderboard', {
+      // The API sheds load with 429s; submissions are replayed per session, so retrying is safe
+      let response = await fetch('/api/leaderboard', {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
         },
         body: JSON.stringify(gameResult),
       });
+      for (let attempt = 1; response.status === 429 && attempt <= 3; attempt++) {
+        const retryAfter = Number(response.headers.get('retry-after')) || attempt;
+        await new Promise(resolve => setTimeout(resolve, retryAfter * 1000));
+        response = await fetch('/api/leaderboard', {
+          method: 'POST',
+          headers: {
+            'Content-Type': 'application/json',
+          },
+          body: JSON.stringify(gameResult),
+        });
+      }
       
       if (response.ok) {
         const result = await response.json();
@@ -528,7 +540,9 @@ export default function GameLayout() {
                             className="ml-2 px-2 py-1 text-xs"
                             onClick={() => {
                               const newItem = {
-                                id: `suggested_${Date.now()}_${Math.random().toString(36).substr(2, 9)}_${index}`,
+                                id: item.item_id || `suggested_${Date.now()}_${Math.random().toString(36).substr(2, 9)}_${index}`,
+                                item_id: item.item_id,
+                                store_id: item.store_id,
                                 name: item.name,
                                 price: item.price,
                                 quantity: item.quantity || 1, // Use agent-suggested quantity
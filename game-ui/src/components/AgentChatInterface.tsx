@@ -332,6 +332,7 @@ export function AgentChatInterface({ className = '', onSuggestedItemsChange }: A
               
               let bestPrice = 0;
               let itemId = '';
+              let storeId: string | undefined;
               let name = '';
               let brand = '';
               let category = '';
@@ -342,7 +343,7 @@ export function AgentChatInterface({ className = '', onSuggestedItemsChange }: A
                 // New search_grocery_items structure
                 const [avgPrice, minPrice, maxPrice, storesAvailable, id, itemName, brandName, cat] = item;
                 bestPrice = parseFloat(avgPrice.toString()) || 0;
-                itemId = id || `item_${index}`;
+                itemId = id || '';
                 name = itemName || `Product ${index + 1}`;
                 brand = brandName || 'Unknown Brand';
                 category = cat || 'Suggested';
@@ -352,12 +353,23 @@ export function AgentChatInterface({ className = '', onSuggestedItemsChange }: A
               } else {
                 // Detailed tool structure (fallback)
                 bestPrice = parseFloat(item[0]?.toString()) || 0;
-                itemId = item[4] || `item_${index}`;
+                itemId = item[4] || '';
                 name = item[5] || `Product ${index + 1}`;
                 brand = item[6] || 'Unknown Brand';
                 category = item[7] || 'Suggested';
               }
               
+              // Catalog ids and store ids by column name when the tool reports its columns
+              const columnNames: string[] = (tabularData.columns || []).map((c: any) => c.name);
+              const itemIdIdx = columnNames.indexOf('item_id');
+              const storeIdIdx = columnNames.indexOf('store_id');
+              if (itemIdIdx >= 0 && item[itemIdIdx] != null) {
+                itemId = item[itemIdIdx].toString();
+              }
+              if (storeIdIdx >= 0 && item[storeIdIdx] != null) {
+                storeId = item[storeIdIdx].toString();
+              }
+              
               // Skip items that are too cheap
               if (bestPrice < 1) {
                 continue;
@@ -370,7 +382,9 @@ export function AgentChatInterface({ className = '', onSuggestedItemsChange }: A
               
               if (!isDuplicate) {
                 suggestedItems.push({
-                  id: itemId,
+                  id: itemId || `item_${index}`,
+                  item_id: itemId || undefined,
+                  store_id: storeId,
                   name: name,
                   brand: brand,
                   category: category,
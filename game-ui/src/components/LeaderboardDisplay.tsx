@@ -1,6 +1,6 @@
 'use client';
 
-import { useEffect, useState } from 'react';
+import { useEffect, useRef, useState } from 'react';
 import { motion } from 'framer-motion';
 import { Trophy, Medal, Award, Clock, DollarSign, User, Building, Sparkles } from 'lucide-react';
 
@@ -30,6 +30,29 @@ const agentEmojis: Record<string, string> = {
   vegas_local: '🎰',
 };
 
+// Entries as sent by the leaderboard-api stream (snake_case)
+interface StreamEntry {
+  rank: number;
+  player_name: string;
+  company?: string | null;
+  selected_agent: string;
+  total_price: number;
+  score: number;
+  game_duration: number;
+  completed_at: string;
+}
+
+const fromStreamEntry = (item: StreamEntry): LeaderboardEntry => ({
+  rank: item.rank,
+  playerName: item.player_name,
+  company: item.company ?? undefined,
+  agentUsed: item.selected_agent,
+  totalPrice: item.total_price,
+  score: item.score,
+  timeUsed: item.game_duration,
+  completedAt: item.completed_at,
+});
+
 const agentNames: Record<string, string> = {
   budget_master: 'Budget Master',
   health_guru: 'Health Guru',
@@ -47,6 +70,7 @@ export function LeaderboardDisplay({
   const [entries, setEntries] = useState<LeaderboardEntry[]>([]);
   const [isLoading, setIsLoading] = useState(true);
   const [lastUpdated, setLastUpdated] = useState<Date | null>(null);
+  const streamEntries = useRef<StreamEntry[]>([]);
 
   const fetchLeaderboard = async () => {
     try {
@@ -140,11 +164,50 @@ export function LeaderboardDisplay({
   useEffect(() => {
     fetchLeaderboard();
     
-    if (autoRefresh) {
-      const interval = setInterval(fetchLeaderboard, 30000); // Refresh every 30 seconds
+    if (!autoRefresh) return;
+
+    let interval: ReturnType<typeof setInterval> | undefined;
+    const startPolling = () => {
+      if (!interval) interval = setInterval(fetchLeaderboard, 30000); // Refresh every 30 seconds
+    };
+
+    if (typeof EventSource === 'undefined') {
+      startPolling();
       return () => clearInterval(interval);
     }
-  }, [autoRefresh]);
+
+    // Push updates: a snapshot on connect, then diffs whenever the top entries change;
+    // after a leaderboard roll the server sends a fresh snapshot of the new board
+    const source = new EventSource('/api/leaderboard/stream');
+    const publish = () => {
+      setEntries(streamEntries.current.slice(0, limit).map(fromStreamEntry));
+      setLastUpdated(new Date());
+      setIsLoading(false);
+    };
+
+    source.addEventListener('snapshot', (event) => {
+      streamEntries.current = JSON.parse((event as MessageEvent).data).entries;
+      publish();
+    });
+    source.addEventListener('diff', (event) => {
+      const diff = JSON.parse((event as MessageEvent).data);
+      const next = streamEntries.current.slice(0, diff.size);
+      for (const change of diff.changes) {
+        next[change.rank - 1] = change.entry;
+      }
+      streamEntries.current = next;
+      publish();
+    });
+    source.onerror = () => {
+      // Fall back to polling if the stream cannot be kept open
+      if (source.readyState === EventSource.CLOSED) startPolling();
+    };
+
+    return () => {
+      source.close();
+      clearInterval(interval);
+    };
+  }, [autoRefresh, limit]);
 
   const getRankIcon = (rank: number) => {
     switch (rank) {
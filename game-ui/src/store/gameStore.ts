@@ -11,6 +11,9 @@ export interface GameItem {
   store: string;
   category: string;
   image?: string;
+  // Catalog ids the leaderboard re-prices the line with
+  item_id?: string;
+  store_id?: string;
 }
 
 export interface GameSession {
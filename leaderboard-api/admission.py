@@ -0,0 +1,158 @@
+"""
+Admission control
+Per-client and global token buckets plus a bounded concurrency limiter that sheds load with 429s
+"""
+
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict
+import asyncio
+import math
+import time
+
+
+class AdmissionRejected(Exception):
+    """A request refused before doing any work; ``retry_after`` is in seconds"""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_header(self) -> str:
+        """Retry-After value (whole seconds, at least 1)"""
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+class TokenBucket:
+    """Refills ``rate`` tokens per second up to ``burst``"""
+
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def wait(self, now: float) -> float:
+        """Refill; returns 0 when a token is available, otherwise seconds until one is"""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self):
+        """Spend one token (after ``wait`` returned 0)"""
+        self.tokens -= 1
+
+
+class AdmissionController:
+    """
+    Gate for storage-bound endpoints.
+
+    A request must get a token from its client's bucket and from the global bucket, then
+    a slot among ``max_concurrency`` running requests. Up to ``max_queue`` requests wait
+    for a slot, each for at most ``queue_timeout`` seconds; everything else is rejected
+    at once, so a burst turns into quick 429s instead of slow timeouts for everyone.
+    A rate or limit of 0 disables that check.
+    """
+
+    def __init__(
+        self,
+        per_client_rate: float = 10.0,
+        per_client_burst: float = 50.0,
+        global_rate: float = 200.0,
+        global_burst: float = 400.0,
+        max_concurrency: int = 64,
+        max_queue: int = 256,
+        queue_timeout: float = 2.0,
+        max_clients: int = 10000,
+    ):
+        self.per_client_rate = per_client_rate
+        self.per_client_burst = max(per_client_burst, 1.0)
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.max_clients = max_clients
+        self._global = TokenBucket(global_rate, max(global_burst, 1.0)) if global_rate > 0 else None
+        self._clients: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._slots = asyncio.Semaphore(max_concurrency) if max_concurrency > 0 else None
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.shed: Dict[str, int] = {"client_rate": 0, "global_rate": 0, "queue_full": 0, "queue_timeout": 0}
+
+    def _client_bucket(self, client: str) -> TokenBucket:
+        bucket = self._clients.pop(client, None)
+        if bucket is None:
+            if len(self._clients) >= self.max_clients:
+                self._clients.popitem(last=False)  # Least recently seen client
+            bucket = TokenBucket(self.per_client_rate, self.per_client_burst)
+        self._clients[client] = bucket
+        return bucket
+
+    def _reject(self, reason: str, retry_after: float):
+        self.shed[reason] += 1
+        raise AdmissionRejected(reason, retry_after)
+
+    def check_rate(self, client: str):
+        """
+        Spend one token from the client's and the global bucket, or raise AdmissionRejected.
+        Tokens are only spent when both buckets have one, so a rejection costs nothing.
+        """
+        now = time.monotonic()
+        bucket = self._client_bucket(client) if self.per_client_rate > 0 else None
+        if bucket is not None:
+            wait = bucket.wait(now)
+            if wait:
+                self._reject("client_rate", wait)
+        if self._global is not None:
+            wait = self._global.wait(now)
+            if wait:
+                self._reject("global_rate", wait)
+            self._global.take()
+        if bucket is not None:
+            bucket.take()
+
+    @asynccontextmanager
+    async def admit(self, client: str) -> AsyncIterator[None]:
+        """Hold a concurrency slot for the body of the ``async with`` block"""
+        self.check_rate(client)
+        if self._slots is None:
+            self.admitted += 1
+            yield
+            return
+
+        if self._slots.locked():
+            if self.waiting >= self.max_queue:
+                self._reject("queue_full", self.queue_timeout)
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                self._reject("queue_timeout", self.queue_timeout)
+            finally:
+                self.waiting -= 1
+        else:
+            await self._slots.acquire()
+
+        self.active += 1
+        self.admitted += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._slots.release()
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for monitoring: running and queued requests, admissions and sheds by reason"""
+        return {
+            "active": self.active,
+            "queue_depth": self.waiting,
+            "admitted": self.admitted,
+            "shed": dict(self.shed),
+            "tracked_clients": len(self._clients)
+        }
@@ -0,0 +1,230 @@
+"""
+Materialized leaderboard aggregates
+Per-board summaries (agent stats, best per agent and company, top entries, score sketch) merged into all-time views
+"""
+
+from typing import Any, Dict, List, Optional
+
+from ranking import RankedLeaderboard, rank_key
+from score_sketch import ScoreSketch
+
+# Fields kept for summarized entries; player emails never leave the board indices
+SUMMARY_ENTRY_FIELDS = (
+    "session_id", "player_name", "company", "selected_agent",
+    "total_price", "score", "game_duration", "completed_at"
+)
+
+
+def summary_entry(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """Compact copy of a leaderboard entry"""
+    return {field: entry.get(field) for field in SUMMARY_ENTRY_FIELDS}
+
+
+def company_key(company: Optional[str]) -> Optional[str]:
+    """Group company names typed in different ways ("Acme ", "acme")"""
+    if not company or not company.strip():
+        return None
+    return " ".join(company.split()).casefold()
+
+
+def _entry_key(entry: Dict[str, Any]):
+    return rank_key(entry["session_id"], entry)
+
+
+class BoardSummary:
+    """
+    Aggregates for one dated leaderboard, kept up to date as entries are added or replaced.
+
+    Replacing the best entry of an agent or company falls back to a scan of the board,
+    which only happens when a session is resubmitted with a worse result.
+    """
+
+    def __init__(self, leaderboard_index: str, top_n: int):
+        self.leaderboard_index = leaderboard_index
+        self.top_n = top_n
+        self.agents: Dict[str, Dict[str, Any]] = {}  # agent -> {"count", "total_score", "best"}
+        self.companies: Dict[str, Dict[str, Any]] = {}  # company key -> best entry
+        self.top: List[Dict[str, Any]] = []
+        self.scores = ScoreSketch()
+        self.version = 0
+        self.persisted_version = 0
+
+    @property
+    def leader(self) -> Optional[Dict[str, Any]]:
+        return self.top[0] if self.top else None
+
+    @classmethod
+    def from_board(cls, leaderboard_index: str, board: RankedLeaderboard, top_n: int) -> "BoardSummary":
+        """Build a summary with one pass over a board in rank order"""
+        summary = cls(leaderboard_index, top_n)
+        for rank, _, entry in board.iter_ranked():
+            entry = summary_entry(entry)
+            if rank <= top_n:
+                summary.top.append(entry)
+            stats = summary.agents.setdefault(entry["selected_agent"], {"count": 0, "total_score": 0.0, "best": entry})
+            stats["count"] += 1
+            stats["total_score"] += entry["score"]
+            summary.scores.add(entry["score"])
+            key = company_key(entry["company"])
+            if key is not None:
+                summary.companies.setdefault(key, entry)
+        summary.version = 1
+        return summary
+
+    def apply(self, entry: Dict[str, Any], previous: Optional[Dict[str, Any]], board: RankedLeaderboard):
+        """Fold in an entry that was just upserted into ``board``, replacing ``previous`` if any"""
+        entry = summary_entry(entry)
+
+        if previous is not None:
+            self.scores.add(previous["score"], -1)
+            stats = self.agents.get(previous["selected_agent"])
+            if stats is not None:
+                stats["count"] -= 1
+                stats["total_score"] -= previous["score"]
+                if stats["count"] <= 0:
+                    del self.agents[previous["selected_agent"]]
+                elif stats["best"]["session_id"] == previous["session_id"]:
+                    stats["best"] = self._best_on_board(board, lambda e: e["selected_agent"] == previous["selected_agent"])
+            key = company_key(previous.get("company"))
+            best = self.companies.get(key)
+            if best is not None and best["session_id"] == previous["session_id"]:
+                replacement = self._best_on_board(board, lambda e: company_key(e.get("company")) == key)
+                if replacement is None:
+                    del self.companies[key]
+                else:
+                    self.companies[key] = replacement
+
+        self.scores.add(entry["score"])
+        stats = self.agents.get(entry["selected_agent"])
+        if stats is None:
+            self.agents[entry["selected_agent"]] = {"count": 1, "total_score": entry["score"], "best": entry}
+        else:
+            stats["count"] += 1
+            stats["total_score"] += entry["score"]
+            if _entry_key(entry) < _entry_key(stats["best"]):
+                stats["best"] = entry
+
+        key = company_key(entry["company"])
+        if key is not None:
+            best = self.companies.get(key)
+            if best is None or _entry_key(entry) < _entry_key(best):
+                self.companies[key] = entry
+
+        if board.rank_of(entry["session_id"]) <= self.top_n or any(e["session_id"] == entry["session_id"] for e in self.top):
+            self.top = [summary_entry(e) for _, _, e in board.top(self.top_n)]
+        self.version += 1
+
+    @staticmethod
+    def _best_on_board(board: RankedLeaderboard, predicate) -> Optional[Dict[str, Any]]:
+        for _, _, entry in board.iter_ranked():
+            if predicate(entry):
+                return summary_entry(entry)
+        return None
+
+    def to_doc(self) -> Dict[str, Any]:
+        """Document stored in the summary index"""
+        return {
+            "leaderboard_index": self.leaderboard_index,
+            "agents": [{"agent": agent, **stats} for agent, stats in self.agents.items()],
+            "companies": list(self.companies.values()),
+            "top": self.top,
+            "scores": self.scores.to_doc()
+        }
+
+    @classmethod
+    def from_doc(cls, doc: Dict[str, Any], top_n: int) -> "BoardSummary":
+        summary = cls(doc["leaderboard_index"], top_n)
+        for stats in doc.get("agents", []):
+            stats = dict(stats)
+            summary.agents[stats.pop("agent")] = stats
+        for entry in doc.get("companies", []):
+            summary.companies[company_key(entry["company"])] = entry
+        summary.top = doc.get("top", [])[:top_n]
+        summary.scores = ScoreSketch.from_doc(doc.get("scores", {}))
+        summary.version = summary.persisted_version = 1
+        return summary
+
+
+class LeaderboardAggregates:
+    """All-time views merged from every board summary, recomputed only after a change"""
+
+    def __init__(self, top_n: int = 100):
+        self.top_n = top_n
+        self.summaries: Dict[str, BoardSummary] = {}
+        self.scores = ScoreSketch()  # every board's scores, kept in step with the summaries
+        self._merged: Optional[Dict[str, Any]] = None
+        self._merged_key: Optional[tuple] = None
+
+    def __contains__(self, leaderboard_index: str) -> bool:
+        return leaderboard_index in self.summaries
+
+    def replace(self, summary: BoardSummary):
+        """Install a summary rebuilt from a board or loaded from the summary index"""
+        previous = self.summaries.get(summary.leaderboard_index)
+        if previous is not None:
+            # Keep versions increasing so merged views and persistence notice the change
+            summary.version = previous.version + 1
+            summary.persisted_version = min(summary.persisted_version, previous.persisted_version)
+            self.scores.merge(previous.scores, -1)
+        self.scores.merge(summary.scores)
+        self.summaries[summary.leaderboard_index] = summary
+
+    def apply(self, leaderboard_index: str, entry: Dict[str, Any], previous: Optional[Dict[str, Any]], board: RankedLeaderboard):
+        """Record an entry upserted into a board"""
+        summary = self.summaries.get(leaderboard_index)
+        if summary is None:
+            self.replace(BoardSummary.from_board(leaderboard_index, board, self.top_n))
+            return
+        summary.apply(entry, previous, board)
+        if previous is not None:
+            self.scores.add(previous["score"], -1)
+        self.scores.add(entry["score"])
+
+    def dirty(self) -> List[BoardSummary]:
+        """Summaries changed since they were last persisted"""
+        return [s for s in self.summaries.values() if s.version != s.persisted_version]
+
+    def _merge(self) -> Dict[str, Any]:
+        key = tuple((index, s.version) for index, s in self.summaries.items())
+        if self._merged is not None and key == self._merged_key:
+            return self._merged
+
+        top: List[Dict[str, Any]] = []
+        agents: Dict[str, Dict[str, Any]] = {}
+        companies: Dict[str, Dict[str, Any]] = {}
+        for summary in self.summaries.values():
+            top.extend(summary.top)
+            for agent, stats in summary.agents.items():
+                merged = agents.setdefault(agent, {"agent": agent, "games": 0, "total_score": 0.0, "wins": 0, "best": stats["best"]})
+                merged["games"] += stats["count"]
+                merged["total_score"] += stats["total_score"]
+                if _entry_key(stats["best"]) < _entry_key(merged["best"]):
+                    merged["best"] = stats["best"]
+            if summary.leader is not None:
+                agents[summary.leader["selected_agent"]]["wins"] += 1
+            for key, entry in summary.companies.items():
+                if key not in companies or _entry_key(entry) < _entry_key(companies[key]):
+                    companies[key] = entry
+
+        for merged in agents.values():
+            merged["average_score"] = round(merged.pop("total_score") / merged["games"], 2) if merged["games"] else 0.0
+
+        self._merged = {
+            "top": sorted(top, key=_entry_key)[:self.top_n],
+            "agents": sorted(agents.values(), key=lambda a: (-a["wins"], -a["average_score"], a["agent"])),
+            "companies": sorted(companies.values(), key=_entry_key)
+        }
+        self._merged_key = key
+        return self._merged
+
+    def top(self, limit: int) -> List[Dict[str, Any]]:
+        """All-time best entries across every board"""
+        return self._merge()["top"][:limit]
+
+    def agent_stats(self) -> List[Dict[str, Any]]:
+        """Per-agent games, average score, boards won and best entry, most wins first"""
+        return self._merge()["agents"]
+
+    def best_by_company(self, limit: int) -> List[Dict[str, Any]]:
+        """Best entry of each company, in rank order"""
+        return self._merge()["companies"][:limit]
@@ -0,0 +1,63 @@
+"""
+Access code membership filter
+In-memory view of access codes used to reject codes known to be spent without Elasticsearch
+"""
+
+from datetime import datetime
+from typing import Any, Dict, Optional, Set
+import time
+
+from ranking import parse_datetime
+
+
+class AccessCodeFilter:
+    """
+    Redeemable codes mapped to their expiry (epoch seconds), plus codes known to be
+    used or deactivated.
+
+    Elasticsearch stays authoritative for redemption; the filter only answers
+    "is this code certainly spent?" so repeats of used or expired codes never leave the
+    process. Codes it has not seen (e.g. minted on another worker since the last refresh)
+    are always checked against storage.
+    """
+
+    def __init__(self):
+        self._codes: Dict[str, Optional[float]] = {}
+        self._spent: Set[str] = set()
+        self.loaded = False
+        self.last_refresh: Optional[datetime] = None
+
+    def __len__(self) -> int:
+        return len(self._codes)
+
+    def add(self, code: str, expires_at: Any = None):
+        """Track a redeemable code"""
+        self._codes[code] = parse_datetime(expires_at).timestamp() if expires_at is not None else None
+        self._spent.discard(code)
+
+    def spend(self, code: str):
+        """Remember a code that was redeemed or deactivated"""
+        self._codes.pop(code, None)
+        self._spent.add(code)
+
+    def discard(self, code: str):
+        """Forget a code, leaving the next attempt to storage"""
+        self._codes.pop(code, None)
+        self._spent.discard(code)
+
+    def apply(self, code: str, code_doc: Dict[str, Any]):
+        """Track a code as redeemable or spent based on its stored document"""
+        if code_doc.get("active", False) and not code_doc.get("used", False):
+            self.add(code, code_doc.get("expires_at"))
+        else:
+            self.spend(code)
+
+    def might_redeem(self, code: str) -> bool:
+        """False when the code is certainly not redeemable; unknown codes may be"""
+        if code in self._spent:
+            return False
+        expires_at = self._codes.get(code)
+        if expires_at is not None and expires_at < time.time():
+            self.spend(code)
+            return False
+        return True
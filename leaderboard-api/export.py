@@ -0,0 +1,61 @@
+"""
+Streaming exports
+Encodes Elasticsearch hits as NDJSON or CSV chunks, optionally gzip-compressed, without buffering the result set
+"""
+
+from typing import Any, AsyncIterator, Dict, List
+import csv
+import io
+import json
+import zlib
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+# Encoded output is gathered into chunks of about this size before being sent
+CHUNK_SIZE = 64 * 1024
+
+
+def _csv_value(value: Any) -> Any:
+    """Nested objects and lists (e.g. items_selected) become JSON inside one CSV cell"""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=str)
+    return "" if value is None else value
+
+
+async def encode_rows(rows: AsyncIterator[Dict[str, Any]], export_format: str, fields: List[str]) -> AsyncIterator[bytes]:
+    """
+    Encode documents as NDJSON lines or CSV rows with a ``fields`` header.
+    NDJSON keeps only ``fields`` too, so both formats carry the same projection.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if export_format == "csv" else None
+    if writer is not None:
+        writer.writerow(fields)
+
+    async for row in rows:
+        if writer is not None:
+            writer.writerow([_csv_value(row.get(field)) for field in fields])
+        else:
+            buffer.write(json.dumps({field: row.get(field) for field in fields}, default=str))
+            buffer.write("\n")
+
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+async def gzip_chunks(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Compress a byte stream into a single gzip member as it is produced"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31 = gzip container
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
@@ -3,19 +3,40 @@ External Leaderboard and Admin API Service
 Handles access codes, game sessions, scoring, and leaderboards
 """
 
-from fastapi import FastAPI, HTTPException, Depends, status
+from fastapi import FastAPI, HTTPException, Depends, Header, Query, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
-from datetime import datetime, timedelta
-from elasticsearch import AsyncElasticsearch
+from typing import List, Literal, Optional, Dict, Any, Set, Tuple
+from datetime import datetime, timedelta, timezone
+from ranking import RankedLeaderboard, parse_datetime
+from write_behind import BulkWriter
+from code_filter import AccessCodeFilter
+from streaming import LeaderboardBroadcaster
+from aggregates import BoardSummary, LeaderboardAggregates
+from paging import InvalidCursor, decode_cursor, encode_cursor
+from export import EXPORT_FORMATS, encode_rows, gzip_chunks
+from price_index import PRICE_TOLERANCE, PriceIndex
+from admission import AdmissionController, AdmissionRejected
+import metrics
+from metrics import MetricsMiddleware, timed
+from rescoring import RescoreJob, calculate_score, score_batch
+from storage import (
+    ALREADY_USED, LEADERBOARD_INDEX_PATTERN, LEADERBOARD_SUMMARY_INDEX, NOT_FOUND, REDEEMED, REJECTED,
+    ElasticsearchStorage, LeaderboardExists, LeaderboardNotFound, MeteredElasticsearch, Storage
+)
+from sqlite_storage import SQLiteStorage
 import asyncio
+import itertools
+import json
 import logging
 import uuid
 import os
 import secrets
 import string
+import time
 from contextlib import asynccontextmanager
 
 # Configure logging
@@ -26,6 +47,86 @@ logger = logging.getLogger(__name__)
 security = HTTPBearer()
 ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
 
+# Access code minting
+ACCESS_CODE_BULK_CHUNK_SIZE = int(os.getenv("ACCESS_CODE_BULK_CHUNK_SIZE", "500"))
+ACCESS_CODE_MINT_MAX_ROUNDS = 5  # Regeneration rounds for codes that collide with existing ones
+
+# In-memory access code filter
+ACCESS_CODE_FILTER_REFRESH_INTERVAL = float(os.getenv("ACCESS_CODE_FILTER_REFRESH_INTERVAL", "5"))  # seconds
+ACCESS_CODE_FILTER_OVERLAP = 60  # seconds of overlap between incremental refreshes, covering index refresh delays
+
+# Admin settings cache
+SETTINGS_CACHE_TTL = float(os.getenv("SETTINGS_CACHE_TTL", "5"))  # seconds before re-checking the settings version
+
+# Storage backend: "elasticsearch" or "sqlite" (embedded, for single-node booths and benchmarks)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "elasticsearch").lower()
+SQLITE_PATH = os.getenv("SQLITE_PATH", "leaderboard.db")
+
+# Leaderboard indices are named leaderboard_YYYYMMDD_NNN; the write alias points at the current one
+LEADERBOARD_ALIAS = os.getenv("LEADERBOARD_ALIAS", "leaderboard_current")
+LEADERBOARD_ALIAS_TTL = float(os.getenv("LEADERBOARD_ALIAS_TTL", "2"))  # seconds a resolved alias is trusted
+LEADERBOARD_SYNC_INTERVAL = float(os.getenv("LEADERBOARD_SYNC_INTERVAL", "2"))  # seconds between catch-up syncs
+LEADERBOARD_SYNC_OVERLAP = 30  # seconds of overlap between syncs, covering index refresh delays
+
+# Leaderboard streaming
+LEADERBOARD_STREAM_TOP_N = int(os.getenv("LEADERBOARD_STREAM_TOP_N", "50"))
+LEADERBOARD_STREAM_INTERVAL = float(os.getenv("LEADERBOARD_STREAM_INTERVAL", "1.0"))  # min seconds between broadcasts
+
+# Pre-serialized leaderboard responses kept per (leaderboard, limit)
+LEADERBOARD_RESPONSE_CACHE_SIZE = int(os.getenv("LEADERBOARD_RESPONSE_CACHE_SIZE", "64"))
+
+# Materialized all-time / per-agent / per-company leaderboards
+LEADERBOARD_SUMMARY_TOP_N = int(os.getenv("LEADERBOARD_SUMMARY_TOP_N", "100"))  # entries kept per board and all-time
+
+# Cursor paging
+LEADERBOARD_PAGE_MAX_SIZE = int(os.getenv("LEADERBOARD_PAGE_MAX_SIZE", "1000"))  # cap for limit and page size
+PIT_KEEP_ALIVE = os.getenv("PIT_KEEP_ALIVE", "2m")  # how long a session paging cursor stays valid between pages
+
+# Admin exports
+EXPORT_PAGE_SIZE = int(os.getenv("EXPORT_PAGE_SIZE", "1000"))  # documents fetched per point-in-time page
+SESSION_EXPORT_FIELDS = [
+    "session_id", "access_code", "player_name", "player_email", "company", "selected_agent",
+    "start_time", "end_time", "game_duration", "items_selected", "total_price", "target_price",
+    "score", "completed", "created_date", "last_updated"
+]
+LEADERBOARD_EXPORT_FIELDS = [
+    "session_id", "leaderboard_date", "player_name", "player_email", "company", "selected_agent",
+    "total_price", "score", "game_duration", "completed_at"
+]
+
+# Score distribution returned with each submission
+SCORE_HISTOGRAM_BUCKETS = 10
+
+# Server-side basket pricing
+PRICE_VERIFICATION = os.getenv("PRICE_VERIFICATION", "true").lower() == "true"
+PRICE_INDEX_REFRESH_INTERVAL = float(os.getenv("PRICE_INDEX_REFRESH_INTERVAL", "60"))  # seconds
+PRICE_INDEX_OVERLAP = 60  # seconds of overlap between incremental refreshes, covering index refresh delays
+
+# Idempotent submissions
+SUBMIT_DEDUPE_CACHE_SIZE = int(os.getenv("SUBMIT_DEDUPE_CACHE_SIZE", "10000"))  # recent results kept for replay
+
+# Admission control for validate-code and submit-game (a rate or limit of 0 disables it)
+ADMISSION_CLIENT_RATE = float(os.getenv("ADMISSION_CLIENT_RATE", "10"))  # requests per second per client
+ADMISSION_CLIENT_BURST = float(os.getenv("ADMISSION_CLIENT_BURST", "50"))
+ADMISSION_GLOBAL_RATE = float(os.getenv("ADMISSION_GLOBAL_RATE", "200"))  # requests per second per worker
+ADMISSION_GLOBAL_BURST = float(os.getenv("ADMISSION_GLOBAL_BURST", "400"))
+ADMISSION_MAX_CONCURRENCY = int(os.getenv("ADMISSION_MAX_CONCURRENCY", "64"))  # storage-bound requests running at once
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "256"))  # requests waiting for a slot
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "2"))  # seconds a request may wait for a slot
+# Proxies in front of the API that append to X-Forwarded-For (the platform load balancer)
+ADMISSION_TRUSTED_PROXY_HOPS = int(os.getenv("ADMISSION_TRUSTED_PROXY_HOPS", "1"))
+
+# Background rescoring after target_price / game_duration_minutes changes
+RESCORE_BATCH_SIZE = int(os.getenv("RESCORE_BATCH_SIZE", "500"))  # entries scored and written per bulk request
+RESCORE_BATCH_DELAY = float(os.getenv("RESCORE_BATCH_DELAY", "0.05"))  # seconds between batches, leaving room for live traffic
+RESCORE_JOBS_KEPT = 20  # finished jobs kept for progress queries
+
+# Write-behind persistence for game results
+WRITE_BEHIND_BATCH_SIZE = int(os.getenv("WRITE_BEHIND_BATCH_SIZE", "500"))
+WRITE_BEHIND_FLUSH_INTERVAL = float(os.getenv("WRITE_BEHIND_FLUSH_INTERVAL", "0.5"))  # seconds
+WRITE_BEHIND_MAX_QUEUE = int(os.getenv("WRITE_BEHIND_MAX_QUEUE", "10000"))
+WRITE_BEHIND_MAX_RETRIES = int(os.getenv("WRITE_BEHIND_MAX_RETRIES", "5"))
+
 # Pydantic Models
 class AccessCodeValidation(BaseModel):
     access_code: str
@@ -74,6 +175,21 @@ class LeaderboardEntry(BaseModel):
     game_duration: int
     completed_at: datetime
 
+class LeaderboardPage(BaseModel):
+    entries: List[LeaderboardEntry]
+    next_cursor: Optional[str] = None
+
+class SessionPage(BaseModel):
+    sessions: List[Dict[str, Any]]
+    next_cursor: Optional[str] = None
+
+class AgentStats(BaseModel):
+    agent: str
+    games: int
+    average_score: float
+    wins: int  # boards where this agent holds first place
+    best: LeaderboardEntry
+
 class AccessCodeGeneration(BaseModel):
     count: int = Field(ge=1, le=1000)
     expires_at: Optional[datetime] = None
@@ -89,194 +205,362 @@ class AdminSettings(BaseModel):
 class LeaderboardService:
     """Service for managing leaderboards and game sessions"""
     
-    def __init__(self, es_client: AsyncElasticsearch):
-        self.es = es_client
+    def __init__(self, storage: Storage):
+        self.storage = storage
         self.current_leaderboard_suffix = self._get_current_date_suffix()
+        self.boards: Dict[str, RankedLeaderboard] = {}
+        self._board_locks: Dict[str, asyncio.Lock] = {}
+        self.writer = BulkWriter(
+            storage,
+            batch_size=WRITE_BEHIND_BATCH_SIZE,
+            flush_interval=WRITE_BEHIND_FLUSH_INTERVAL,
+            max_queue=WRITE_BEHIND_MAX_QUEUE,
+            max_retries=WRITE_BEHIND_MAX_RETRIES
+        )
+        self.code_filter = AccessCodeFilter()
+        self.price_index = PriceIndex()
+        self.broadcaster = LeaderboardBroadcaster(self._stream_snapshot, interval=LEADERBOARD_STREAM_INTERVAL)
+        self.aggregates = LeaderboardAggregates(LEADERBOARD_SUMMARY_TOP_N)
+        self._settings: Optional[AdminSettings] = None
+        self._settings_version: Optional[int] = None
+        self._settings_checked_at = 0.0
+        self._settings_lock = asyncio.Lock()
+        self._background_tasks: List[asyncio.Task] = []
+        self._response_cache: Dict[Tuple[str, int], Tuple[str, int, bytes]] = {}
+        self._alias_checked_at = 0.0
+        self._alias_lock = asyncio.Lock()
+        self._board_synced_at: Dict[str, datetime] = {}
+        self._entry_counts: Dict[str, int] = {}
+        self._submit_results: Dict[str, Tuple[Optional[str], Dict[str, Any]]] = {}  # LRU: session -> (idempotency key, result)
+        self._submit_inflight: Dict[str, Tuple[Optional[str], asyncio.Future]] = {}
+        self._auto_roll_pending = False
+        self.rescore_jobs: Dict[str, RescoreJob] = {}
+        self._rescore_tasks: Dict[str, asyncio.Task] = {}
+        
+    async def start(self):
+        """Load in-memory state from storage and start background workers"""
+        await self.ensure_leaderboard_alias()
+        await self.load_summaries()
+        await self.load_leaderboards()
+        await self.load_access_codes()
+        if PRICE_VERIFICATION:
+            await self.load_prices()
+        self.writer.start()
+        self._background_tasks.append(asyncio.create_task(self._refresh_access_codes_periodically()))
+        if PRICE_VERIFICATION:
+            self._background_tasks.append(asyncio.create_task(self._refresh_prices_periodically()))
+        self._background_tasks.append(asyncio.create_task(self._sync_leaderboards_periodically()))
+        
+    async def stop(self):
+        """Stop background workers and flush pending writes"""
+        for job in self.rescore_jobs.values():
+            job.cancel()
+        await asyncio.gather(*self._rescore_tasks.values(), return_exceptions=True)
+        for task in self._background_tasks:
+            task.cancel()
+        await asyncio.gather(*self._background_tasks, return_exceptions=True)
+        self._background_tasks.clear()
+        await self.broadcaster.close()
+        await self.persist_summaries()
+        await self.writer.close()
         
     def _get_current_date_suffix(self) -> str:
-        """Get current date suffix for leaderboard index"""
-        return datetime.utcnow().strftime("%Y%m%d_%03d")  # YYYYMMDD_001
-        
-    async def create_indices(self):
-        """Create necessary Elasticsearch indices"""
-        indices = {
-            "access_codes": {
-                "mappings": {
-                    "properties": {
-                        "access_code": {"type": "keyword"},
-                        "active": {"type": "boolean"},
-                        "used": {"type": "boolean"},
-                        "used_by": {"type": "keyword"},
-                        "used_at": {"type": "date"},
-                        "expires_at": {"type": "date"},
-                        "batch_name": {"type": "keyword"},
-                        "created_at": {"type": "date"}
-                    }
-                }
-            },
-            "game_sessions": {
-                "mappings": {
-                    "properties": {
-                        "session_id": {"type": "keyword"},
-                        "access_code": {"type": "keyword"},
-                        "player_name": {"type": "text"},
-                        "player_email": {"type": "keyword"},
-                        "company": {"type": "text"},
-                        "selected_agent": {"type": "keyword"},
-                        "start_time": {"type": "date"},
-                        "end_time": {"type": "date"},
-                        "game_duration": {"type": "integer"},
-                        "items_selected": {
-                            "type": "nested",
-                            "properties": {
-                                "item_id": {"type": "keyword"},
-                                "item_name": {"type": "text"},
-                                "store_id": {"type": "keyword"},
-                                "price": {"type": "double"},
-                                "quantity": {"type": "integer"}
-                            }
-                        },
-                        "total_price": {"type": "double"},
-                        "target_price": {"type": "double"},
-                        "score": {"type": "double"},
-                        "completed": {"type": "boolean"},
-                        "created_date": {"type": "date"},
-                        "last_updated": {"type": "date"}
-                    }
-                }
-            },
-            "admin_settings": {
-                "mappings": {
-                    "properties": {
-                        "target_price": {"type": "double"},
-                        "game_duration_minutes": {"type": "integer"},
-                        "current_season": {"type": "keyword"},
-                        "leaderboard_reset_threshold": {"type": "integer"},
-                        "last_updated": {"type": "date"}
-                    }
-                }
-            }
-        }
+        """Get the first leaderboard suffix for today"""
+        return f"{datetime.utcnow().strftime('%Y%m%d')}_001"  # YYYYMMDD_001
         
-        for index_name, mapping in indices.items():
+    async def ensure_leaderboard_alias(self):
+        """Choose the current leaderboard, adopting the newest existing board on first run"""
+        try:
+            if await self.storage.get_current_leaderboard() is not None:
+                await self.get_current_suffix(force=True)
+                return
+                
+            existing = await self.storage.list_leaderboards()
+            if existing:
+                await self.storage.set_current_leaderboard(existing[-1])
+            else:
+                await self.storage.create_leaderboard(f"leaderboard_{self._get_current_date_suffix()}", current=True)
+            await self.get_current_suffix(force=True)
+            logger.info(f"Current leaderboard -> leaderboard_{self.current_leaderboard_suffix}")
+        except Exception as e:
+            logger.error(f"Error choosing the current leaderboard: {e}")
+            
+
+    @timed("get_current_suffix")
+    async def get_current_suffix(self, force: bool = False) -> str:
+        """
+        Suffix of the leaderboard the write alias points at.
+        Lookups are cached for LEADERBOARD_ALIAS_TTL so every worker follows a roll within seconds.
+        """
+        if not force and time.monotonic() - self._alias_checked_at < LEADERBOARD_ALIAS_TTL:
+            return self.current_leaderboard_suffix
+            
+        async with self._alias_lock:
+            if not force and time.monotonic() - self._alias_checked_at < LEADERBOARD_ALIAS_TTL:
+                return self.current_leaderboard_suffix
+                
             try:
-                exists = await self.es.indices.exists(index=index_name)
-                if not exists:
-                    await self.es.indices.create(index=index_name, body=mapping)
-                    logger.info(f"Created index: {index_name}")
+                leaderboard_index = await self.storage.get_current_leaderboard()
+                if leaderboard_index is not None:
+                    self.current_leaderboard_suffix = leaderboard_index[len("leaderboard_"):]
+                    self._alias_checked_at = time.monotonic()
+                    # Rolls by any worker move default stream subscribers to the new board
+                    self.broadcaster.set_current(leaderboard_index)
             except Exception as e:
-                logger.error(f"Error creating index {index_name}: {e}")
+                logger.error(f"Error resolving leaderboard alias: {e}")
                 
-    async def generate_access_codes(self, count: int, expires_at: Optional[datetime] = None, batch_name: Optional[str] = None) -> List[str]:
-        """Generate new access codes"""
+        return self.current_leaderboard_suffix
+        
+    def _generate_code(self) -> str:
+        """Generate a random 6-character access code"""
+        code = ''.join(secrets.choice(string.ascii_uppercase + string.digits) for _ in range(6))
+        
+        # Avoid confusing characters
+        return code.replace('0', '2').replace('O', 'P').replace('I', 'J').replace('1', '7')
+        
+    @timed("generate_access_codes")
+    async def generate_access_codes(self, count: int, expires_at: Optional[datetime] = None, batch_name: Optional[str] = None) -> Dict[str, Any]:
+        """Generate new access codes with chunked _bulk create ops, regenerating only codes that collide"""
+        started = time.perf_counter()
+        
         if expires_at is None:
             expires_at = datetime.utcnow() + timedelta(days=7)  # Default 7 days
             
         if batch_name is None:
             batch_name = f"batch_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}"
             
-        codes = []
-        for _ in range(count):
-            # Generate 6-character code
-            code = ''.join(secrets.choice(string.ascii_uppercase + string.digits) for _ in range(6))
-            
-            # Avoid confusing characters
-            code = code.replace('0', '2').replace('O', 'P').replace('I', 'J').replace('1', '7')
-            
-            access_code_doc = {
-                "access_code": code,
-                "active": True,
-                "used": False,
-                "used_by": None,
-                "used_at": None,
-                "expires_at": expires_at,
-                "batch_name": batch_name,
-                "created_at": datetime.utcnow()
-            }
+        codes: List[str] = []
+        seen = set()
+        conflicts = 0
+        failed = 0
+        bulk_requests = 0
+        missing = count
+        
+        for _ in range(ACCESS_CODE_MINT_MAX_ROUNDS):
+            if missing <= 0:
+                break
+                
+            # Candidates are unique within this request; collisions with stored codes come back as 409s
+            candidates = []
+            while len(candidates) < missing:
+                code = self._generate_code()
+                if code not in seen:
+                    seen.add(code)
+                    candidates.append(code)
+            missing = 0
+                    
+            created_at = datetime.utcnow()
+            for offset in range(0, len(candidates), ACCESS_CODE_BULK_CHUNK_SIZE):
+                chunk = candidates[offset:offset + ACCESS_CODE_BULK_CHUNK_SIZE]
+                operations = []
+                for code in chunk:
+                    operations.append({"create": {"_index": "access_codes", "_id": code}})
+                    operations.append({
+                        "access_code": code,
+                        "active": True,
+                        "used": False,
+                        "used_by": None,
+                        "used_at": None,
+                        "expires_at": expires_at,
+                        "batch_name": batch_name,
+                        "created_at": created_at
+                    })
+                    
+                try:
+                    response = await self.storage.bulk(operations)
+                    bulk_requests += 1
+                except Exception as e:
+                    failed += len(chunk)
+                    logger.error(f"Failed to create {len(chunk)} access codes: {e}")
+                    continue
+                    
+                for code, item in zip(chunk, response["items"]):
+                    result = item["create"]
+                    if "error" not in result:
+                        codes.append(code)
+                        self.code_filter.add(code, expires_at)
+                    elif result.get("status") == 409:
+                        conflicts += 1
+                        missing += 1
+                    else:
+                        failed += 1
+                        logger.error(f"Failed to create access code {code}: {result['error']}")
+                        
+        if codes:
+            await self.storage.refresh("access_codes")
+            
+        elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+        logger.info(f"Generated {len(codes)} access codes in batch {batch_name} ({conflicts} collisions, {elapsed_ms}ms)")
+        return {
+            "codes": codes,
+            "count": len(codes),
+            "batch_name": batch_name,
+            "requested": count,
+            "conflicts": conflicts,
+            "failed": failed,
+            "bulk_requests": bulk_requests,
+            "elapsed_ms": elapsed_ms
+        }
+        
+    async def load_access_codes(self):
+        """Load every redeemable access code into the in-memory filter"""
+        started = datetime.utcnow()
+        code_filter = AccessCodeFilter()
+        try:
+            async for code, code_doc in self.storage.scan_access_codes():
+                code_filter.apply(code, code_doc)
+        except Exception as e:
+            # Without a loaded filter every code is checked against storage
+            logger.error(f"Error loading access codes: {e}")
+            return
             
+        code_filter.loaded = True
+        code_filter.last_refresh = started
+        self.code_filter = code_filter
+        logger.info(f"Loaded {len(code_filter)} redeemable access codes")
+        
+    @timed("refresh_access_codes")
+    async def refresh_access_codes(self):
+        """Pick up codes minted or redeemed by other workers since the last refresh"""
+        if not self.code_filter.loaded:
+            await self.load_access_codes()
+            return
+            
+        started = datetime.utcnow()
+        since = self.code_filter.last_refresh - timedelta(seconds=ACCESS_CODE_FILTER_OVERLAP)
+        async for code, code_doc in self.storage.scan_access_codes(since):
+            self.code_filter.apply(code, code_doc)
+        self.code_filter.last_refresh = started
+        
+    async def _refresh_access_codes_periodically(self):
+        """Keep the access code filter current across workers"""
+        while True:
+            await asyncio.sleep(ACCESS_CODE_FILTER_REFRESH_INTERVAL)
             try:
-                await self.es.index(
-                    index="access_codes",
-                    id=code,
-                    document=access_code_doc,
-                    refresh="wait_for"
-                )
-                codes.append(code)
+                await self.refresh_access_codes()
+            except Exception as e:
+                logger.error(f"Error refreshing access codes: {e}")
                 
+    async def _scan_prices(self, price_index: PriceIndex, since: Optional[datetime] = None):
+        """Fold catalog and store inventory prices (all, or changed since ``since``) into a price index"""
+        async for item_id, item_doc in self.storage.scan_catalog(since):
+            price_index.set_item(item_id, item_doc)
+        async for inventory_doc in self.storage.scan_inventory(since):
+            price_index.set_inventory(inventory_doc)
+            
+    async def load_prices(self):
+        """Load catalog prices used to re-price submitted baskets"""
+        started = datetime.utcnow()
+        price_index = PriceIndex()
+        try:
+            await self._scan_prices(price_index)
+        except Exception as e:
+            # Without a loaded index submitted prices are trusted
+            logger.error(f"Error loading catalog prices: {e}")
+            return
+            
+        price_index.loaded = True
+        price_index.last_refresh = started
+        self.price_index = price_index
+        logger.info(f"Loaded catalog prices for {len(price_index)} items")
+        
+    @timed("refresh_prices")
+    async def refresh_prices(self):
+        """Pick up catalog and inventory price changes since the last refresh"""
+        if not self.price_index.loaded:
+            await self.load_prices()
+            return
+            
+        started = datetime.utcnow()
+        since = self.price_index.last_refresh - timedelta(seconds=PRICE_INDEX_OVERLAP)
+        await self._scan_prices(self.price_index, since)
+        self.price_index.last_refresh = started
+        
+    async def _refresh_prices_periodically(self):
+        """Keep catalog prices current"""
+        while True:
+            await asyncio.sleep(PRICE_INDEX_REFRESH_INTERVAL)
+            try:
+                await self.refresh_prices()
             except Exception as e:
-                logger.error(f"Failed to create access code {code}: {e}")
+                logger.error(f"Error refreshing catalog prices: {e}")
                 
-        logger.info(f"Generated {len(codes)} access codes in batch {batch_name}")
-        return codes
+    def _rejected_code_response(self, code_doc: Dict[str, Any]) -> AccessCodeResponse:
+        """Explain why an access code could not be redeemed"""
+        if not code_doc.get("active", False):
+            message = "Access code is not active"
+        elif code_doc.get("used", False):
+            message = "Access code has already been used"
+        else:
+            expires_at = datetime.fromisoformat(str(code_doc["expires_at"]).replace('Z', '+00:00'))
+            return AccessCodeResponse(
+                valid=False,
+                session_id="",
+                expires_at=expires_at,
+                message="Access code has expired"
+            )
+            
+        return AccessCodeResponse(
+            valid=False,
+            session_id="",
+            expires_at=datetime.utcnow(),
+            message=message
+        )
         
+    @timed("validate_access_code")
     async def validate_access_code(self, code: str, player_name: str, player_email: str, company: Optional[str] = None) -> AccessCodeResponse:
-        """Validate an access code and create game session"""
+        """
+        Redeem an access code and create its game session in one atomic storage operation,
+        so concurrent redemptions of the same code cannot both succeed.
+        """
+        # Reject codes known to be spent without touching storage; unknown codes go to storage
+        if not self.code_filter.might_redeem(code):
+            return AccessCodeResponse(
+                valid=False,
+                session_id="",
+                expires_at=datetime.utcnow(),
+                message="Invalid access code"
+            )
+            
+        session_id = str(uuid.uuid4())
+        session = GameSession(
+            session_id=session_id,
+            access_code=code,
+            player_name=player_name,
+            player_email=player_email,
+            company=company
+        )
+        
         try:
-            # Check if code exists and is valid
-            response = await self.es.get(index="access_codes", id=code)
-            code_doc = response["_source"]
+            outcome, code_doc = await self.storage.redeem_access_code(code, session.dict(), player_email, datetime.now(timezone.utc))
             
-            if not code_doc.get("active", False):
-                return AccessCodeResponse(
-                    valid=False,
-                    session_id="",
-                    expires_at=datetime.utcnow(),
-                    message="Access code is not active"
-                )
-                
-            if code_doc.get("used", False):
+            if outcome == REDEEMED:
+                self.code_filter.spend(code)
                 return AccessCodeResponse(
-                    valid=False,
-                    session_id="",
-                    expires_at=datetime.utcnow(),
-                    message="Access code has already been used"
+                    valid=True,
+                    session_id=session_id,
+                    expires_at=datetime.fromisoformat(str(code_doc["expires_at"]).replace('Z', '+00:00')),
+                    message="Access code validated successfully"
                 )
                 
-            expires_at = datetime.fromisoformat(code_doc["expires_at"].replace('Z', '+00:00'))
-            if expires_at < datetime.utcnow().replace(tzinfo=expires_at.tzinfo):
-                return AccessCodeResponse(
-                    valid=False,
-                    session_id="",
-                    expires_at=expires_at,
-                    message="Access code has expired"
-                )
+            if outcome == REJECTED:
+                self.code_filter.apply(code, code_doc or {"active": True, "used": True})
+                return self._rejected_code_response(code_doc or {"active": True, "used": True})
+            if outcome == NOT_FOUND:
+                self.code_filter.discard(code)
+                message = "Invalid access code"
+            elif outcome == ALREADY_USED:
+                # Lost a race with a concurrent redemption of the same code
+                self.code_filter.spend(code)
+                message = "Access code has already been used"
+            else:
+                message = "Error validating access code"
                 
-            # Mark code as used
-            await self.es.update(
-                index="access_codes",
-                id=code,
-                body={
-                    "doc": {
-                        "used": True,
-                        "used_by": player_email,
-                        "used_at": datetime.utcnow()
-                    }
-                },
-                refresh="wait_for"
-            )
-            
-            # Create game session
-            session_id = str(uuid.uuid4())
-            session = GameSession(
-                session_id=session_id,
-                access_code=code,
-                player_name=player_name,
-                player_email=player_email,
-                company=company
-            )
-            
-            await self.es.index(
-                index="game_sessions",
-                id=session_id,
-                document=session.dict(),
-                refresh="wait_for"
-            )
-            
             return AccessCodeResponse(
-                valid=True,
-                session_id=session_id,
-                expires_at=expires_at,
-                message="Access code validated successfully"
+                valid=False,
+                session_id="",
+                expires_at=datetime.utcnow(),
+                message=message
             )
             
         except Exception as e:
@@ -288,20 +572,106 @@ class LeaderboardService:
                 message="Error validating access code"
             )
             
-    async def submit_game_result(self, submission: GameSubmission) -> Dict[str, Any]:
-        """Submit game result and calculate score"""
+    @timed("submit_game_result")
+    async def submit_game_result(self, submission: GameSubmission, idempotency_key: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Submit game result and calculate score.
+        Retries of a submission (same session id) replay the first result instead of scoring again.
+        """
+        session_id = submission.session_id
+        cached = self._submit_results.pop(session_id, None)
+        if cached is not None:
+            self._submit_results[session_id] = cached  # Most recently used
+            self._check_idempotency_key(cached[0], idempotency_key)
+            return {**cached[1], "replayed": True}
+            
+        inflight = self._submit_inflight.get(session_id)
+        if inflight is not None:
+            # The first attempt is still being scored; share its outcome
+            self._check_idempotency_key(inflight[0], idempotency_key)
+            return {**await asyncio.shield(inflight[1]), "replayed": True}
+            
+        future = asyncio.get_running_loop().create_future()
+        self._submit_inflight[session_id] = (idempotency_key, future)
+        try:
+            result = await self._score_submission(submission, idempotency_key)
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # Mark retrieved when nobody else was waiting
+            raise
+        else:
+            future.set_result(result)
+            if len(self._submit_results) >= SUBMIT_DEDUPE_CACHE_SIZE:
+                self._submit_results.pop(next(iter(self._submit_results)))
+            self._submit_results[session_id] = (idempotency_key, result)
+            return result
+        finally:
+            del self._submit_inflight[session_id]
+            
+    def _check_idempotency_key(self, stored: Optional[str], supplied: Optional[str]):
+        """A different idempotency key for an already submitted session is a second game, not a retry"""
+        if stored is not None and supplied is not None and stored != supplied:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Game already submitted for this session")
+            
+    def _submission_result(self, leaderboard_index: str, board: RankedLeaderboard, score: float, total_price: float, target_price: float, replayed: bool = False) -> Dict[str, Any]:
+        """Response body for a scored submission"""
+        board_scores = self.aggregates.summaries[leaderboard_index].scores
+        return {
+            "score": score,
+            "total_price": total_price,
+            "target_price": target_price,
+            "rank": board.rank_of_score(score),
+            "percentile": board_scores.percentile(score),
+            "all_time_percentile": self.aggregates.scores.percentile(score),
+            "distribution": board_scores.histogram(SCORE_HISTOGRAM_BUCKETS),
+            "replayed": replayed
+        }
+        
+    @timed("score_submission")
+    async def _score_submission(self, submission: GameSubmission, idempotency_key: Optional[str] = None) -> Dict[str, Any]:
+        """Score a submission once, update the in-memory board and queue the writes"""
         try:
             # Get current session
-            session_response = await self.es.get(index="game_sessions", id=submission.session_id)
-            session_doc = session_response["_source"]
+            session_doc = await self.storage.get_session(submission.session_id)
+            if session_doc is None:
+                raise HTTPException(status_code=404, detail="Game session not found")
             
             # Get current settings
             settings = await self.get_admin_settings()
             target_price = settings.target_price
             
+            # A retry that reached another worker, or arrived after this worker forgot it.
+            # The session is marked completed by the write-behind flush; the board catches retries before that.
+            current_suffix = await self.get_current_suffix()
+            leaderboard_index = f"leaderboard_{current_suffix}"
+            board = await self._get_board(leaderboard_index)
+            if session_doc.get("completed") or submission.session_id in board:
+                # The key is stored with the session, so every worker answers a second game the same way
+                self._check_idempotency_key(session_doc.get("idempotency_key"), idempotency_key)
+                logger.info(f"Duplicate submission for session {submission.session_id} replayed")
+                if session_doc.get("completed"):
+                    target_price = session_doc["target_price"]
+                previous = board.get(submission.session_id) or session_doc
+                return self._submission_result(leaderboard_index, board, previous["score"], previous["total_price"], target_price, replayed=True)
+                
+            # Score the basket at catalog prices rather than the prices the client sent.
+            # The total is always rebuilt from the lines; lines the catalog cannot price are refused.
+            total_price = submission.total_price
+            if PRICE_VERIFICATION and self.price_index.loaded:
+                price_check = self.price_index.price_basket(submission.items_selected)
+                if price_check["unverified_items"]:
+                    logger.warning(f"Session {submission.session_id} rejected: {price_check['unverified_items']} items not in the catalog")
+                    raise HTTPException(
+                        status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                        detail=f"{price_check['unverified_items']} basket items could not be verified against the catalog"
+                    )
+                if abs(price_check["total_price"] - total_price) > PRICE_TOLERANCE:
+                    logger.warning(f"Session {submission.session_id} claimed {total_price}, catalog total is {price_check['total_price']} ({price_check['repriced_items']} items repriced)")
+                total_price = price_check["total_price"]
+            
             # Calculate score
             score = self._calculate_score(
-                submission.total_price,
+                total_price,
                 target_price,
                 submission.game_duration,
                 settings.game_duration_minutes * 60  # Convert to seconds
@@ -311,22 +681,16 @@ class LeaderboardService:
             update_doc = {
                 "selected_agent": submission.selected_agent,
                 "items_selected": submission.items_selected,
-                "total_price": submission.total_price,
+                "total_price": total_price,
                 "target_price": target_price,
                 "score": score,
                 "game_duration": submission.game_duration,
                 "end_time": datetime.utcnow(),
                 "completed": True,
+                "idempotency_key": idempotency_key,
                 "last_updated": datetime.utcnow()
             }
             
-            await self.es.update(
-                index="game_sessions",
-                id=submission.session_id,
-                body={"doc": update_doc},
-                refresh="wait_for"
-            )
-            
             # Add to current leaderboard
             leaderboard_entry = {
                 "session_id": submission.session_id,
@@ -334,144 +698,670 @@ class LeaderboardService:
                 "player_email": session_doc["player_email"],
                 "company": session_doc.get("company"),
                 "selected_agent": submission.selected_agent,
-                "total_price": submission.total_price,
+                "total_price": total_price,
                 "score": score,
                 "game_duration": submission.game_duration,
                 "completed_at": datetime.utcnow(),
-                "leaderboard_date": self.current_leaderboard_suffix
+                "leaderboard_date": current_suffix
             }
             
-            leaderboard_index = f"leaderboard_{self.current_leaderboard_suffix}"
-            await self.es.index(
-                index=leaderboard_index,
-                document=leaderboard_entry,
-                refresh="wait_for"
-            )
+            previous_rank = board.rank_of(submission.session_id)
+            previous_entry = board.get(submission.session_id)
+            board.upsert(submission.session_id, leaderboard_entry)
+            self.aggregates.apply(leaderboard_index, leaderboard_entry, previous_entry, board)
+            if board.rank_of(submission.session_id) <= LEADERBOARD_STREAM_TOP_N or (previous_rank or 0) <= LEADERBOARD_STREAM_TOP_N:
+                self.broadcaster.notify(leaderboard_index)
+            if previous_rank is None:
+                await self._record_new_entries(leaderboard_index, 1)
             
-            logger.info(f"Game result submitted for session {submission.session_id}, score: {score}")
+            # Persist the session update and leaderboard entry together in the background.
+            # The leaderboard entry is keyed by session id so bulk retries stay idempotent.
+            await self.writer.enqueue([
+                {"update": {"_index": "game_sessions", "_id": submission.session_id}},
+                {"doc": update_doc},
+                {"index": {"_index": leaderboard_index, "_id": submission.session_id}},
+                leaderboard_entry
+            ])
             
-            return {
-                "score": score,
-                "total_price": submission.total_price,
-                "target_price": target_price,
-                "rank": await self._get_current_rank(leaderboard_index, score)
-            }
+            logger.info(f"Game result accepted for session {submission.session_id}, score: {score}")
             
+            return self._submission_result(leaderboard_index, board, score, total_price, target_price)
+            
+        except HTTPException:
+            raise
         except Exception as e:
             logger.error(f"Error submitting game result: {e}")
             raise HTTPException(status_code=500, detail="Failed to submit game result")
             
     def _calculate_score(self, total_price: float, target_price: float, time_taken: int, time_limit: int) -> float:
         """Calculate game score based on price accuracy and speed"""
-        # Closeness score (0-70 points)
-        if total_price <= target_price:
-            price_accuracy = (1 - abs(target_price - total_price) / target_price) * 70
-        else:
-            price_accuracy = 0  # Over budget = 0 points
+        return calculate_score(total_price, target_price, time_taken, time_limit)
+        
+    async def load_leaderboards(self):
+        """Rebuild the in-memory ranking and entry count for the current leaderboard from storage"""
+        try:
+            leaderboard_index = f"leaderboard_{await self.get_current_suffix()}"
+            await self._get_board(leaderboard_index)
+            self._entry_counts[leaderboard_index] = await self.storage.count_leaderboard(leaderboard_index)
+        except Exception as e:
+            logger.error(f"Leaderboard will be loaded on first use: {e}")
+
+    @timed("get_board")
+    async def _get_board(self, leaderboard_index: str) -> RankedLeaderboard:
+        """
+        Get the in-memory ranking for a leaderboard index, loading it from storage on first use.
+        Raises LeaderboardNotFound for names that were never created; nothing is cached for them.
+        """
+        board = self.boards.get(leaderboard_index)
+        if board is not None:
+            return board
+        if not LEADERBOARD_INDEX_PATTERN.match(leaderboard_index):
+            raise LeaderboardNotFound(leaderboard_index)
+
+        lock = self._board_locks.setdefault(leaderboard_index, asyncio.Lock())
+        async with lock:
+            board = self.boards.get(leaderboard_index)
+            if board is not None:
+                return board
+
+            if not await self.storage.leaderboard_exists(leaderboard_index):
+                if self._board_locks.get(leaderboard_index) is lock:
+                    del self._board_locks[leaderboard_index]
+                raise LeaderboardNotFound(leaderboard_index)
+
+            started = datetime.utcnow()
+            try:
+                board = await self._scan_board(leaderboard_index)
+            except Exception as e:
+                # Leave the board unloaded so the next call retries
+                logger.error(f"Error loading leaderboard {leaderboard_index}: {e}")
+                raise
+
+            self.boards[leaderboard_index] = board
+            self._board_synced_at[leaderboard_index] = started
+            self.aggregates.replace(BoardSummary.from_board(leaderboard_index, board, LEADERBOARD_SUMMARY_TOP_N))
+            logger.info(f"Loaded {len(board)} entries for {leaderboard_index}")
+            return board
             
-        # Speed score (0-30 points)
-        if time_taken <= time_limit:
-            speed_score = (1 - time_taken / time_limit) * 30
-        else:
-            speed_score = 0  # Over time = 0 speed points
+    async def _scan_board(self, leaderboard_index: str) -> RankedLeaderboard:
+        """Read every entry of a leaderboard index into a new ranking"""
+        board = RankedLeaderboard()
+        async for doc_id, entry in self.storage.scan_leaderboard(leaderboard_index):
+            board.upsert(doc_id, entry)
+        return board
+            
+    @timed("sync_current_leaderboard")
+    async def sync_current_leaderboard(self):
+        """Merge entries written by other workers into the current in-memory board"""
+        leaderboard_index = f"leaderboard_{await self.get_current_suffix()}"
+        if leaderboard_index not in self.boards:
+            await self._get_board(leaderboard_index)
+            return
             
-        total_score = price_accuracy + speed_score
-        return round(total_score, 2)
+        board = self.boards[leaderboard_index]
+        started = datetime.utcnow()
+        since = self._board_synced_at[leaderboard_index] - timedelta(seconds=LEADERBOARD_SYNC_OVERLAP)
         
-    async def _get_current_rank(self, leaderboard_index: str, score: float) -> int:
-        """Get current rank for a score"""
+        changed = False
+        added = 0
+        async for doc_id, entry in self.storage.scan_leaderboard(leaderboard_index, since):
+            known = board.get(doc_id)
+            if known is None or parse_datetime(known["completed_at"]) != parse_datetime(entry["completed_at"]) or known["score"] != entry["score"]:
+                board.upsert(doc_id, entry)
+                self.aggregates.apply(leaderboard_index, entry, known, board)
+                changed = True
+                added += known is None
+                
+        self._board_synced_at[leaderboard_index] = started
+        if changed:
+            self.broadcaster.notify(leaderboard_index)
+        if added:
+            await self._record_new_entries(leaderboard_index, added)
+            
+    @timed("record_new_entries")
+    async def _record_new_entries(self, leaderboard_index: str, added: int):
+        """
+        Track how many entries the active leaderboard holds and roll it once it reaches
+        the configured leaderboard_reset_threshold (0 disables automatic rollover).
+        The counter is seeded with one count query per board and maintained in memory afterwards.
+        """
+        count = self._entry_counts.get(leaderboard_index)
+        if count is None:
+            # The new entries may still be queued for write-behind, so they are added on top
+            count = await self.storage.count_leaderboard(leaderboard_index)
+        count += added
+        self._entry_counts[leaderboard_index] = count
+        
+        threshold = (await self.get_admin_settings()).leaderboard_reset_threshold
+        if threshold > 0 and count >= threshold and not self._auto_roll_pending:
+            self._auto_roll_pending = True
+            self._background_tasks.append(asyncio.create_task(self._auto_roll_leaderboard(leaderboard_index, count)))
+            
+    async def _auto_roll_leaderboard(self, leaderboard_index: str, count: int):
+        """Roll a leaderboard that reached its size threshold"""
         try:
-            response = await self.es.search(
-                index=leaderboard_index,
-                body={
-                    "query": {"range": {"score": {"gt": score}}},
-                    "size": 0
-                }
-            )
-            return response["hits"]["total"]["value"] + 1
-        except:
-            return 1
+            new_suffix = await self.roll_leaderboard(if_current=leaderboard_index)
+            logger.info(f"{leaderboard_index} reached {count} entries; current leaderboard is now {new_suffix}")
+        except Exception as e:
+            logger.error(f"Automatic rollover of {leaderboard_index} failed: {e}")
+        finally:
+            self._auto_roll_pending = False
+            
+    async def _sync_leaderboards_periodically(self):
+        """Follow the leaderboard alias and pick up other workers' submissions"""
+        while True:
+            await asyncio.sleep(LEADERBOARD_SYNC_INTERVAL)
+            try:
+                await self.sync_current_leaderboard()
+                await self.persist_summaries()
+            except Exception as e:
+                logger.error(f"Error syncing leaderboard: {e}")
+                
+    async def load_summaries(self):
+        """
+        Load the persisted board summaries, then summarize any board that has none yet.
+        Boards loaded into memory later replace their persisted summary with an exact one.
+        Only boards that exist in storage are summarized; stray summary documents are skipped.
+        """
+        try:
+            leaderboards = await self.storage.list_leaderboards()
+            existing = set(leaderboards)
+            async for summary_doc in self.storage.scan_summaries():
+                if summary_doc.get("leaderboard_index") not in existing:
+                    continue
+                self.aggregates.replace(BoardSummary.from_doc(summary_doc, LEADERBOARD_SUMMARY_TOP_N))
+                
+            current_index = f"leaderboard_{await self.get_current_suffix()}"
+            for leaderboard_index in leaderboards:
+                if leaderboard_index in self.aggregates or leaderboard_index == current_index:
+                    continue
+                board = await self._scan_board(leaderboard_index)
+                self.aggregates.replace(BoardSummary.from_board(leaderboard_index, board, LEADERBOARD_SUMMARY_TOP_N))
+                logger.info(f"Summarized {len(board)} entries of {leaderboard_index}")
+        except Exception as e:
+            logger.error(f"Error loading leaderboard summaries: {e}")
+            
+    @timed("persist_summaries")
+    async def persist_summaries(self):
+        """Queue changed board summaries for the summary index (one small document per board)"""
+        for summary in self.aggregates.dirty():
+            version = summary.version
+            if summary.scores.count:  # Boards without entries (or that do not exist) are not worth a document
+                await self.writer.enqueue([
+                    {"index": {"_index": LEADERBOARD_SUMMARY_INDEX, "_id": summary.leaderboard_index}},
+                    {**summary.to_doc(), "last_updated": datetime.utcnow()}
+                ])
+            summary.persisted_version = version
             
+    def get_all_time_leaderboard(self, limit: int = 10) -> List[LeaderboardEntry]:
+        """Best entries across every leaderboard"""
+        return [self._leaderboard_entry(rank, source) for rank, source in enumerate(self.aggregates.top(limit), start=1)]
+        
+    @timed("get_score_histogram")
+    async def get_score_histogram(self, buckets: int = 10, date_suffix: Optional[str] = None, all_time: bool = False) -> Dict[str, Any]:
+        """Score distribution of a leaderboard (defaults to the current one) or of every leaderboard"""
+        if all_time:
+            scores = self.aggregates.scores
+        else:
+            if date_suffix is None:
+                date_suffix = await self.get_current_suffix()
+            leaderboard_index = f"leaderboard_{date_suffix}"
+            if leaderboard_index not in self.aggregates:
+                if not LEADERBOARD_INDEX_PATTERN.match(leaderboard_index) or not await self.storage.leaderboard_exists(leaderboard_index):
+                    raise LeaderboardNotFound(leaderboard_index)
+                await self._get_board(leaderboard_index)
+            scores = self.aggregates.summaries[leaderboard_index].scores
+            
+        return {
+            "count": scores.count,
+            "quantiles": {f"p{q}": scores.quantile(q / 100) for q in (25, 50, 75, 90, 99)},
+            "buckets": scores.histogram(buckets)
+        }
+        
+    def get_agent_stats(self) -> List[AgentStats]:
+        """Games, average score, boards won and best entry for each agent"""
+        return [
+            AgentStats(
+                agent=stats["agent"],
+                games=stats["games"],
+                average_score=stats["average_score"],
+                wins=stats["wins"],
+                best=self._leaderboard_entry(1, stats["best"])
+            )
+            for stats in self.aggregates.agent_stats()
+        ]
+        
+    def get_company_leaderboard(self, limit: int = 10) -> List[LeaderboardEntry]:
+        """Best entry of each company across every leaderboard"""
+        return [self._leaderboard_entry(rank, source) for rank, source in enumerate(self.aggregates.best_by_company(limit), start=1)]
+                
+    def _leaderboard_entry(self, rank: int, source: Dict[str, Any]) -> LeaderboardEntry:
+        """Build the public view of a stored leaderboard entry"""
+        return LeaderboardEntry(
+            rank=rank,
+            player_name=source["player_name"],
+            company=source.get("company"),
+            selected_agent=source["selected_agent"],
+            total_price=source["total_price"],
+            score=source["score"],
+            game_duration=source["game_duration"],
+            completed_at=parse_datetime(source["completed_at"])
+        )
+        
+    async def _stream_snapshot(self, leaderboard_index: str) -> List[Dict[str, Any]]:
+        """Top entries shared by every streaming subscriber of a leaderboard"""
+        board = await self._get_board(leaderboard_index)
+        return jsonable_encoder([
+            self._leaderboard_entry(rank, source)
+            for rank, _, source in board.top(LEADERBOARD_STREAM_TOP_N)
+        ])
+        
+    async def stream_leaderboard(self, date_suffix: Optional[str] = None):
+        """
+        Server-Sent Events for a leaderboard. Without a date the stream follows the current
+        leaderboard across rolls instead of staying on the board current at connect time.
+        """
+        follow_current = date_suffix is None
+        if date_suffix is None:
+            date_suffix = await self.get_current_suffix()
+        leaderboard_index = f"leaderboard_{date_suffix}"
+        # Load (or reject) the board before the response starts, so unknown boards get a 404
+        await self._get_board(leaderboard_index)
+        return self.broadcaster.events(leaderboard_index, follow_current)
+        
     async def get_leaderboard(self, limit: int = 10, date_suffix: Optional[str] = None) -> List[LeaderboardEntry]:
         """Get current leaderboard"""
+        requested = date_suffix is not None
         if date_suffix is None:
-            date_suffix = self.current_leaderboard_suffix
+            date_suffix = await self.get_current_suffix()
             
         leaderboard_index = f"leaderboard_{date_suffix}"
         
         try:
-            response = await self.es.search(
-                index=leaderboard_index,
-                body={
-                    "query": {"match_all": {}},
-                    "sort": [{"score": {"order": "desc"}}],
-                    "size": limit
-                }
-            )
+            board = await self._get_board(leaderboard_index)
+            return [self._leaderboard_entry(rank, source) for rank, _, source in board.top(limit)]
             
-            entries = []
-            for i, hit in enumerate(response["hits"]["hits"]):
-                source = hit["_source"]
-                entry = LeaderboardEntry(
-                    rank=i + 1,
-                    player_name=source["player_name"],
-                    company=source.get("company"),
-                    selected_agent=source["selected_agent"],
-                    total_price=source["total_price"],
-                    score=source["score"],
-                    game_duration=source["game_duration"],
-                    completed_at=datetime.fromisoformat(source["completed_at"].replace('Z', '+00:00'))
-                )
-                entries.append(entry)
+        except LeaderboardNotFound:
+            if requested:
+                raise
+            logger.error(f"Current leaderboard {leaderboard_index} does not exist")
+            return []
+        except Exception as e:
+            logger.error(f"Error getting leaderboard: {e}")
+            return []
+            
+    @timed("get_leaderboard_page")
+    async def get_leaderboard_page(self, size: int = 50, cursor: Optional[str] = None, date_suffix: Optional[str] = None) -> LeaderboardPage:
+        """
+        One page of a leaderboard in rank order.
+        The cursor pins the board and resumes after the last returned sort key, so pages stay
+        consistent when entries are added and each page costs the same however deep it is.
+        """
+        start = 0
+        if cursor is None:
+            if date_suffix is None:
+                date_suffix = await self.get_current_suffix()
+            leaderboard_index = f"leaderboard_{date_suffix}"
+        else:
+            try:
+                state = decode_cursor(cursor)
+                leaderboard_index, after, skip = state["board"], state["after"], state["skip"]
+                if not LEADERBOARD_INDEX_PATTERN.match(leaderboard_index) or len(after) != 3 or not isinstance(skip, int):
+                    raise InvalidCursor("Malformed cursor")
+            except (InvalidCursor, KeyError, TypeError):
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+                
+        board = await self._get_board(leaderboard_index)
+        if cursor is not None:
+            # Entries sharing the last sort key are told apart by how many were already returned
+            start = board.count_before(after) + skip
+            
+        page = list(itertools.islice(board.iter_ranked(start), size))
+        next_cursor = None
+        if page and page[-1][0] < len(board):
+            rank, doc_id, _ = page[-1]
+            after = list(board.key_of(doc_id)[:3])
+            next_cursor = encode_cursor({"board": leaderboard_index, "after": after, "skip": rank - board.count_before(after)})
+            
+        return LeaderboardPage(
+            entries=[self._leaderboard_entry(rank, source) for rank, _, source in page],
+            next_cursor=next_cursor
+        )
+        
+    @timed("get_sessions_page")
+    async def get_sessions_page(self, size: int = 100, cursor: Optional[str] = None, completed: Optional[bool] = None) -> SessionPage:
+        """One page of game sessions, newest first"""
+        try:
+            sessions, next_cursor = await self.storage.page_sessions(size, cursor, completed)
+        except InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return SessionPage(sessions=sessions, next_cursor=next_cursor)
+        
+    @timed("export")
+    async def export(
+        self,
+        dataset: str,
+        export_format: str = "ndjson",
+        fields: Optional[List[str]] = None,
+        compress: bool = False,
+        completed: Optional[bool] = None,
+        date_suffix: Optional[str] = None
+    ) -> Tuple[Any, str]:
+        """
+        Stream every game session or leaderboard entry as NDJSON or CSV chunks.
+        Documents are read from storage page by page, so memory use does not grow with the export.
+        Returns the chunk iterator and the file name.
+        """
+        if export_format not in EXPORT_FORMATS:
+            raise HTTPException(status_code=400, detail=f"Unsupported format: {export_format}")
+            
+        if dataset == "sessions":
+            allowed = SESSION_EXPORT_FIELDS
+        else:
+            allowed = LEADERBOARD_EXPORT_FIELDS
+            if date_suffix is not None:
+                leaderboards = [f"leaderboard_{date_suffix}"]
+                if not await self.storage.leaderboard_exists(leaderboards[0]):
+                    raise HTTPException(status_code=404, detail="Leaderboard not found")
+            else:
+                leaderboards = await self.storage.list_leaderboards()
+            if not leaderboards:
+                raise HTTPException(status_code=404, detail="No leaderboards to export")
                 
-            return entries
+        if fields:
+            unknown = [field for field in fields if field not in allowed]
+            if unknown:
+                raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+        else:
+            fields = allowed
+            
+        async def rows():
+            exported = 0
+            try:
+                if dataset == "sessions":
+                    documents = self.storage.iter_sessions(fields, completed)
+                else:
+                    documents = self.storage.iter_leaderboard_entries(leaderboards, fields)
+                async for document in documents:
+                    exported += 1
+                    yield document
+            except Exception as e:
+                logger.error(f"Export of {dataset} failed after {exported} documents: {e}")
+                raise
+            logger.info(f"Exported {exported} {dataset} documents as {export_format}")
+            
+        chunks = encode_rows(rows(), export_format, fields)
+        filename = f"{dataset}_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.{export_format}"
+        if compress:
+            return gzip_chunks(chunks), f"{filename}.gz"
+        return chunks, filename
+        
+    def _cache_settings(self, settings: AdminSettings, version: int):
+        """Remember settings together with the document version they were read at"""
+        self._settings = settings
+        self._settings_version = version
+        self._settings_checked_at = time.monotonic()
+        
+    @timed("get_leaderboard_body")
+    async def get_leaderboard_body(self, limit: int = 10, date_suffix: Optional[str] = None) -> Tuple[bytes, Optional[str]]:
+        """
+        Serialized leaderboard response and its ETag.
+        Bodies are cached per (leaderboard, limit) and rebuilt only when the board version changes.
+        """
+        requested = date_suffix is not None
+        if date_suffix is None:
+            date_suffix = await self.get_current_suffix()
             
+        leaderboard_index = f"leaderboard_{date_suffix}"
+        
+        try:
+            board = await self._get_board(leaderboard_index)
+        except LeaderboardNotFound:
+            if requested:
+                raise
+            logger.error(f"Current leaderboard {leaderboard_index} does not exist")
+            return b"[]", None
         except Exception as e:
             logger.error(f"Error getting leaderboard: {e}")
-            return []
+            return b"[]", None
             
+        etag = f'"{board.generation}-{board.version}-{limit}"'
+        cache_key = (leaderboard_index, limit)
+        cached = self._response_cache.get(cache_key)
+        if cached is not None and cached[0] == board.generation and cached[1] == board.version:
+            return cached[2], etag
+            
+        entries = [self._leaderboard_entry(rank, source) for rank, _, source in board.top(limit)]
+        body = json.dumps(jsonable_encoder(entries), separators=(",", ":")).encode()
+        
+        if cache_key not in self._response_cache and len(self._response_cache) >= LEADERBOARD_RESPONSE_CACHE_SIZE:
+            self._response_cache.pop(next(iter(self._response_cache)))
+        self._response_cache[cache_key] = (board.generation, board.version, body)
+        return body, etag
+        
+    @timed("get_admin_settings")
     async def get_admin_settings(self) -> AdminSettings:
-        """Get admin settings"""
-        try:
-            response = await self.es.get(index="admin_settings", id="current")
-            return AdminSettings(**response["_source"])
-        except:
-            # Return defaults if not found
-            settings = AdminSettings()
-            await self.update_admin_settings(settings)
-            return settings
+        """
+        Get admin settings from the in-process cache.
+        Once the cache is older than SETTINGS_CACHE_TTL, a metadata-only GET compares the
+        document version so changes made by other workers are picked up without a full read.
+        """
+        if self._settings is not None and time.monotonic() - self._settings_checked_at < SETTINGS_CACHE_TTL:
+            return self._settings
             
+        async with self._settings_lock:
+            if self._settings is not None and time.monotonic() - self._settings_checked_at < SETTINGS_CACHE_TTL:
+                return self._settings
+                
+            try:
+                if self._settings is not None:
+                    version = await self.storage.get_settings_version()
+                    if version is not None and version == self._settings_version:
+                        self._settings_checked_at = time.monotonic()
+                        return self._settings
+                        
+                stored = await self.storage.get_settings()
+                if stored is not None:
+                    self._cache_settings(AdminSettings(**stored[0]), stored[1])
+                    return self._settings
+                    
+                # Store defaults without overwriting settings another worker just created
+                settings = AdminSettings()
+                settings_doc = settings.dict()
+                settings_doc["last_updated"] = datetime.utcnow()
+                version = await self.storage.create_settings(settings_doc)
+                if version is not None:
+                    self._cache_settings(settings, version)
+                # Otherwise the winning document is read on the next call
+                return settings
+                
+            except Exception as e:
+                logger.error(f"Error getting admin settings: {e}")
+                return self._settings or AdminSettings()
+            
+    @timed("update_admin_settings")
     async def update_admin_settings(self, settings: AdminSettings):
-        """Update admin settings"""
+        """Update admin settings and refresh the local cache"""
         settings_doc = settings.dict()
         settings_doc["last_updated"] = datetime.utcnow()
         
-        await self.es.index(
-            index="admin_settings",
-            id="current",
-            document=settings_doc,
-            refresh="wait_for"
+        version = await self.storage.put_settings(settings_doc)
+        self._cache_settings(settings, version)
+        
+    async def start_rescore(self, date_suffix: Optional[str] = None) -> RescoreJob:
+        """
+        Start rescoring a leaderboard (defaults to the current one) under the current settings.
+        Runs in the background; one job per leaderboard at a time.
+        """
+        if date_suffix is None:
+            date_suffix = await self.get_current_suffix()
+        leaderboard_index = f"leaderboard_{date_suffix}"
+        if not await self.storage.leaderboard_exists(leaderboard_index):
+            raise HTTPException(status_code=404, detail="Leaderboard not found")
+            
+        for job in self.rescore_jobs.values():
+            if job.leaderboard_index == leaderboard_index and not job.done:
+                raise HTTPException(status_code=409, detail=f"Rescoring of {leaderboard_index} is already running ({job.job_id})")
+                
+        settings = await self.get_admin_settings()
+        job = RescoreJob(leaderboard_index, settings.target_price, settings.game_duration_minutes * 60)
+        
+        finished = [job_id for job_id, old in self.rescore_jobs.items() if old.done]
+        for job_id in finished[:max(len(finished) - RESCORE_JOBS_KEPT + 1, 0)]:
+            del self.rescore_jobs[job_id]
+        self.rescore_jobs[job.job_id] = job
+        self._rescore_tasks[job.job_id] = asyncio.create_task(self._run_rescore(job))
+        logger.info(f"Rescoring {leaderboard_index} with target price {job.target_price} and time limit {job.time_limit}s ({job.job_id})")
+        return job
+        
+    def get_rescore_job(self, job_id: str) -> RescoreJob:
+        job = self.rescore_jobs.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Rescoring job not found")
+        return job
+        
+    async def _run_rescore(self, job: RescoreJob):
+        """
+        Stream a board's entries and rescore them batch by batch, pausing between batches.
+        Results still queued for write-behind are flushed first; entries the scan cannot see yet
+        (not refreshed in storage) are taken from the in-memory board afterwards.
+        """
+        job.status = "running"
+        try:
+            board = await self._get_board(job.leaderboard_index)
+            await self.writer.flush()
+            job.total = max(await self.storage.count_leaderboard(job.leaderboard_index), len(board))
+            
+            seen: Set[str] = set()
+            batch: List[Tuple[str, Dict[str, Any]]] = []
+            async for doc_id, entry in self.storage.scan_leaderboard(job.leaderboard_index):
+                seen.add(doc_id)
+                batch.append((doc_id, entry))
+                if len(batch) < RESCORE_BATCH_SIZE:
+                    continue
+                await self._rescore_batch(job, board, batch)
+                batch = []
+                if job.cancel_requested:
+                    break
+                await asyncio.sleep(RESCORE_BATCH_DELAY)
+            else:
+                unseen = [(doc_id, entry) for _, doc_id, entry in board.iter_ranked() if doc_id not in seen]
+                job.total = max(job.total, job.processed + len(batch) + len(unseen))
+                batch.extend(unseen)
+                for start in range(0, len(batch), RESCORE_BATCH_SIZE):
+                    if start:
+                        if job.cancel_requested:
+                            break
+                        await asyncio.sleep(RESCORE_BATCH_DELAY)
+                    await self._rescore_batch(job, board, batch[start:start + RESCORE_BATCH_SIZE])
+                    
+            job.finish("cancelled" if job.cancel_requested else "completed")
+            logger.info(f"Rescoring {job.job_id} {job.status}: {job.updated} of {job.processed} entries changed, {job.failed} failed ({job.sessions_failed} game sessions)")
+        except Exception as e:
+            job.finish("failed", str(e))
+            logger.error(f"Rescoring {job.job_id} of {job.leaderboard_index} failed: {e}")
+        finally:
+            self._rescore_tasks.pop(job.job_id, None)
+            
+    async def _rescore_batch(self, job: RescoreJob, board: RankedLeaderboard, batch: List[Tuple[str, Dict[str, Any]]]):
+        """Score one batch, update the in-memory board and write changed scores in one bulk request"""
+        scores = score_batch(
+            [entry["total_price"] for _, entry in batch],
+            [entry["game_duration"] for _, entry in batch],
+            job.target_price,
+            job.time_limit
         )
+        now = datetime.utcnow()
+        operations = []
+        changed: List[Tuple[str, Optional[Dict[str, Any]], Optional[Dict[str, Any]]]] = []  # (id, previous, rescored)
+        for (doc_id, entry), score in zip(batch, scores):
+            if score == entry["score"]:
+                continue
+            # rescored_at lets other workers' syncs pick up the new score
+            operations.append({"update": {"_index": job.leaderboard_index, "_id": doc_id}})
+            operations.append({"doc": {"score": score, "rescored_at": now}})
+            operations.append({"update": {"_index": "game_sessions", "_id": doc_id}})
+            operations.append({"doc": {"score": score, "target_price": job.target_price, "last_updated": now}})
+            
+            previous = board.get(doc_id)
+            rescored = None
+            if previous is not None:
+                rescored = {**previous, "score": score, "rescored_at": now}
+                board.upsert(doc_id, rescored)
+                self.aggregates.apply(job.leaderboard_index, rescored, previous, board)
+            changed.append((doc_id, previous, rescored))
+            self._submit_results.pop(doc_id, None)  # Replays must not return the old score
+            
+        if operations:
+            # Writes queued before these updates (e.g. the entries' own submissions) must land first
+            await self.writer.flush()
+            try:
+                response = await self.storage.bulk(operations)
+            except Exception:
+                for doc_id, previous, rescored in changed:
+                    self._revert_rescore(job.leaderboard_index, board, doc_id, previous, rescored)
+                raise
+            # Two items per entry, in operation order: the leaderboard update, then the session update
+            for i, (doc_id, previous, rescored) in enumerate(changed):
+                entry_result, session_result = (next(iter(item.values())) for item in response["items"][2 * i:2 * i + 2])
+                if "error" in entry_result:
+                    # Storage keeps the old score, so the in-memory board must too
+                    job.failed += 1
+                    self._revert_rescore(job.leaderboard_index, board, doc_id, previous, rescored)
+                    logger.error(f"Rescoring {doc_id} in {job.leaderboard_index} failed: {entry_result['error']}")
+                else:
+                    job.updated += 1
+                if "error" in session_result:
+                    job.sessions_failed += 1
+                    logger.error(f"Rescoring game session {doc_id} failed: {session_result['error']}")
+            self.broadcaster.notify(job.leaderboard_index)
+        job.processed += len(batch)
         
-    async def roll_leaderboard(self) -> str:
-        """Create new leaderboard for the day"""
-        # Find next available suffix for today
+    def _revert_rescore(self, leaderboard_index: str, board: RankedLeaderboard, doc_id: str, previous: Optional[Dict[str, Any]], rescored: Optional[Dict[str, Any]]):
+        """Put back an entry whose rescored score was not written"""
+        if previous is None or board.get(doc_id) is not rescored:
+            return  # Not on the board, or replaced since (e.g. by a sync)
+        board.upsert(doc_id, previous)
+        self.aggregates.apply(leaderboard_index, previous, rescored, board)
+        
+    @timed("roll_leaderboard")
+    async def roll_leaderboard(self, if_current: Optional[str] = None) -> str:
+        """
+        Create the next leaderboard for today and atomically make it the current one.
+        With ``if_current``, only roll if that index is still the active leaderboard.
+        """
         base_date = datetime.utcnow().strftime("%Y%m%d")
-        counter = 1
+        current_index = f"leaderboard_{await self.get_current_suffix(force=True)}"
+        if if_current is not None and current_index != if_current:
+            # Another worker already rolled this leaderboard
+            return self.current_leaderboard_suffix
         
-        while True:
+        for _ in range(3):
+            # One listing picks the next free suffix for today
+            todays = await self.storage.list_leaderboards(base_date)
+            counter = int(LEADERBOARD_INDEX_PATTERN.match(todays[-1]).group(2)) + 1 if todays else 1
+            if counter > 999:  # Safety check
+                raise Exception("Too many leaderboard rolls for today")
+                
             new_suffix = f"{base_date}_{counter:03d}"
             leaderboard_index = f"leaderboard_{new_suffix}"
+            try:
+                await self.storage.create_leaderboard(leaderboard_index)
+                break
+            except LeaderboardExists:
+                # Another worker rolled at the same time; pick the next suffix
+                pass
+        else:
+            raise Exception("Could not find a free leaderboard suffix")
             
-            exists = await self.es.indices.exists(index=leaderboard_index)
-            if not exists:
-                self.current_leaderboard_suffix = new_suffix
-                logger.info(f"Rolled leaderboard to: {leaderboard_index}")
-                return new_suffix
-                
-            counter += 1
-            if counter > 999:  # Safety check
-                raise Exception("Too many leaderboard rolls for today")
+        await self.storage.set_current_leaderboard(leaderboard_index, current_index)
+        
+        self.current_leaderboard_suffix = new_suffix
+        self._alias_checked_at = time.monotonic()
+        self.broadcaster.set_current(leaderboard_index)
+        self._entry_counts[leaderboard_index] = 0
+        logger.info(f"Rolled leaderboard to: {leaderboard_index}")
+        return new_suffix
 
 
 # FastAPI App
@@ -481,23 +1371,39 @@ async def lifespan(app: FastAPI):
     es_url = os.getenv("ELASTICSEARCH_URL", "http://localhost:9200")
     es_api_key = os.getenv("ELASTICSEARCH_API_KEY", "")
     
-    global es_client, leaderboard_service
+    global storage, leaderboard_service, admission
     
-    es_client = AsyncElasticsearch(
-        hosts=[es_url],
-        api_key=es_api_key,
-        verify_certs=True
+    admission = AdmissionController(
+        per_client_rate=ADMISSION_CLIENT_RATE,
+        per_client_burst=ADMISSION_CLIENT_BURST,
+        global_rate=ADMISSION_GLOBAL_RATE,
+        global_burst=ADMISSION_GLOBAL_BURST,
+        max_concurrency=ADMISSION_MAX_CONCURRENCY,
+        max_queue=ADMISSION_MAX_QUEUE,
+        queue_timeout=ADMISSION_QUEUE_TIMEOUT
     )
     
-    leaderboard_service = LeaderboardService(es_client)
-    await leaderboard_service.create_indices()
+    if STORAGE_BACKEND == "sqlite":
+        storage = SQLiteStorage(SQLITE_PATH)
+    else:
+        es_client = MeteredElasticsearch(
+            hosts=[es_url],
+            api_key=es_api_key,
+            verify_certs=True
+        )
+        storage = ElasticsearchStorage(es_client, LEADERBOARD_ALIAS, PIT_KEEP_ALIVE, EXPORT_PAGE_SIZE)
+    
+    await storage.setup()
+    leaderboard_service = LeaderboardService(storage)
+    await leaderboard_service.start()
     
     logger.info("Leaderboard service started")
     
     yield
     
     # Shutdown
-    await es_client.close()
+    await leaderboard_service.stop()
+    await storage.close()
     logger.info("Leaderboard service stopped")
 
 app = FastAPI(
@@ -507,6 +1413,8 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+app.add_middleware(MetricsMiddleware)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -517,30 +1425,105 @@ app.add_middleware(
 )
 
 # Global variables (set in lifespan)
-es_client: AsyncElasticsearch = None
+storage: Storage = None
 leaderboard_service: LeaderboardService = None
+admission: AdmissionController = None
+
+
+def client_address(request: Request) -> str:
+    """
+    Client the admission buckets are keyed by.
+
+    Each trusted proxy appends the address it saw, so the entry ADMISSION_TRUSTED_PROXY_HOPS
+    from the right is the last one a client cannot forge. With fewer entries the request did
+    not come through the proxies and the socket address is used.
+    """
+    if ADMISSION_TRUSTED_PROXY_HOPS > 0:
+        forwarded_for = [hop.strip() for hop in request.headers.get("x-forwarded-for", "").split(",") if hop.strip()]
+        if len(forwarded_for) >= ADMISSION_TRUSTED_PROXY_HOPS:
+            return forwarded_for[-ADMISSION_TRUSTED_PROXY_HOPS]
+    return request.client.host if request.client else "unknown"
+
+
+@app.exception_handler(LeaderboardNotFound)
+async def leaderboard_not_found_handler(request: Request, exc: LeaderboardNotFound):
+    """Unknown leaderboard names (e.g. a bad ?date=) are a 404, never a new board"""
+    return JSONResponse(status_code=status.HTTP_404_NOT_FOUND, content={"detail": "Leaderboard not found"})
+
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected_handler(request: Request, exc: AdmissionRejected):
+    """Shed load with a fast 429 telling the client when to retry"""
+    return JSONResponse(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        content={"detail": "Too many requests, please retry shortly", "reason": exc.reason},
+        headers={"Retry-After": exc.retry_after_header}
+    )
 
 
 # API Endpoints
 @app.post("/api/validate-code", response_model=AccessCodeResponse)
-async def validate_access_code(validation: AccessCodeValidation):
+async def validate_access_code(validation: AccessCodeValidation, request: Request):
     """Validate an access code and create game session"""
-    return await leaderboard_service.validate_access_code(
-        validation.access_code,
-        validation.player_name,
-        validation.player_email,
-        validation.company
-    )
+    async with admission.admit(client_address(request)):
+        return await leaderboard_service.validate_access_code(
+            validation.access_code,
+            validation.player_name,
+            validation.player_email,
+            validation.company
+        )
 
 @app.post("/api/submit-game")
-async def submit_game_result(submission: GameSubmission):
-    """Submit game result and get score"""
-    return await leaderboard_service.submit_game_result(submission)
+async def submit_game_result(submission: GameSubmission, request: Request, idempotency_key: Optional[str] = Header(None)):
+    """Submit game result and get score (retries with the same session or Idempotency-Key replay the result)"""
+    async with admission.admit(client_address(request)):
+        return await leaderboard_service.submit_game_result(submission, idempotency_key)
 
 @app.get("/api/leaderboard", response_model=List[LeaderboardEntry])
-async def get_leaderboard(limit: int = 10, date: Optional[str] = None):
-    """Get leaderboard entries"""
-    return await leaderboard_service.get_leaderboard(limit, date)
+async def get_leaderboard(request: Request, limit: int = Query(10, ge=1, le=LEADERBOARD_PAGE_MAX_SIZE), date: Optional[str] = None):
+    """Get leaderboard entries (supports If-None-Match)"""
+    body, etag = await leaderboard_service.get_leaderboard_body(limit, date)
+    if etag is None:
+        return Response(content=body, media_type="application/json")
+        
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+@app.get("/api/leaderboard/page", response_model=LeaderboardPage)
+async def get_leaderboard_page(size: int = Query(50, ge=1, le=LEADERBOARD_PAGE_MAX_SIZE), cursor: Optional[str] = None, date: Optional[str] = None):
+    """Page through a leaderboard; pass next_cursor back to get the following page"""
+    return await leaderboard_service.get_leaderboard_page(size, cursor, date)
+
+@app.get("/api/leaderboard/stream")
+async def stream_leaderboard(date: Optional[str] = None):
+    """Stream leaderboard updates as Server-Sent Events (snapshot, then diffs)"""
+    return StreamingResponse(
+        await leaderboard_service.stream_leaderboard(date),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/api/leaderboard/all-time", response_model=List[LeaderboardEntry])
+async def get_all_time_leaderboard(limit: int = 10):
+    """Get the best entries across every leaderboard"""
+    return leaderboard_service.get_all_time_leaderboard(limit)
+
+@app.get("/api/leaderboard/histogram")
+async def get_score_histogram(buckets: int = Query(10, ge=1, le=100), date: Optional[str] = None, all_time: bool = False):
+    """Get the score distribution of a leaderboard, or of every leaderboard with all_time=true"""
+    return await leaderboard_service.get_score_histogram(buckets, date, all_time)
+
+@app.get("/api/leaderboard/agents", response_model=List[AgentStats])
+async def get_agent_stats():
+    """Get per-agent statistics across every leaderboard"""
+    return leaderboard_service.get_agent_stats()
+
+@app.get("/api/leaderboard/companies", response_model=List[LeaderboardEntry])
+async def get_company_leaderboard(limit: int = 10):
+    """Get the best entry of each company across every leaderboard"""
+    return leaderboard_service.get_company_leaderboard(limit)
 
 @app.get("/api/settings", response_model=AdminSettings)
 async def get_settings():
@@ -553,12 +1536,11 @@ async def generate_access_codes(generation: AccessCodeGeneration, credentials: H
     """Generate new access codes (Admin only)"""
     if not ADMIN_TOKEN or credentials.credentials != ADMIN_TOKEN:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
-    codes = await leaderboard_service.generate_access_codes(
+    return await leaderboard_service.generate_access_codes(
         generation.count, 
         generation.expires_at,
         generation.batch_name
     )
-    return {"codes": codes, "count": len(codes)}
 
 @app.post("/admin/settings")
 async def update_settings(settings: AdminSettings, credentials: HTTPAuthorizationCredentials = Depends(security)):
@@ -568,6 +1550,69 @@ async def update_settings(settings: AdminSettings, credentials: HTTPAuthorizatio
     await leaderboard_service.update_admin_settings(settings)
     return {"message": "Settings updated successfully"}
 
+@app.post("/admin/rescore", status_code=status.HTTP_202_ACCEPTED)
+async def start_rescore(date: Optional[str] = None, credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """Rescore a leaderboard (default: current) under the current settings in the background (Admin only)"""
+    if not ADMIN_TOKEN or credentials.credentials != ADMIN_TOKEN:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
+    job = await leaderboard_service.start_rescore(date)
+    return job.to_dict()
+
+@app.get("/admin/rescore/{job_id}")
+async def get_rescore_job(job_id: str, credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """Progress of a rescoring job (Admin only)"""
+    if not ADMIN_TOKEN or credentials.credentials != ADMIN_TOKEN:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
+    return leaderboard_service.get_rescore_job(job_id).to_dict()
+
+@app.post("/admin/rescore/{job_id}/cancel")
+async def cancel_rescore_job(job_id: str, credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """Stop a rescoring job after its current batch (Admin only)"""
+    if not ADMIN_TOKEN or credentials.credentials != ADMIN_TOKEN:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
+    job = leaderboard_service.get_rescore_job(job_id)
+    job.cancel()
+    return job.to_dict()
+
+@app.get("/admin/sessions", response_model=SessionPage)
+async def get_sessions(
+    size: int = Query(100, ge=1, le=LEADERBOARD_PAGE_MAX_SIZE),
+    cursor: Optional[str] = None,
+    completed: Optional[bool] = None,
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
+    """Page through game sessions, newest first (Admin only)"""
+    if not ADMIN_TOKEN or credentials.credentials != ADMIN_TOKEN:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
+    return await leaderboard_service.get_sessions_page(size, cursor, completed)
+
+@app.get("/admin/export/{dataset}")
+async def export_data(
+    dataset: Literal["sessions", "leaderboard"],
+    format: str = "ndjson",
+    fields: Optional[str] = None,
+    gzip: bool = False,
+    completed: Optional[bool] = None,
+    date: Optional[str] = None,
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
+    """Stream all game sessions or leaderboard entries as NDJSON or CSV (Admin only)"""
+    if not ADMIN_TOKEN or credentials.credentials != ADMIN_TOKEN:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
+    chunks, filename = await leaderboard_service.export(
+        dataset,
+        format,
+        [field.strip() for field in fields.split(",") if field.strip()] if fields else None,
+        gzip,
+        completed,
+        date
+    )
+    return StreamingResponse(
+        chunks,
+        media_type="application/gzip" if gzip else EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
 @app.post("/admin/roll-leaderboard")
 async def roll_leaderboard(credentials: HTTPAuthorizationCredentials = Depends(security)):
     """Create new leaderboard for the day (Admin only)"""
@@ -578,8 +1623,27 @@ async def roll_leaderboard(credentials: HTTPAuthorizationCredentials = Depends(s
 
 @app.get("/health")
 async def health_check():
-    """Health check endpoint"""
-    return {"status": "healthy", "timestamp": datetime.utcnow()}
+    """Health check endpoint (includes admission queue depth and shed counts)"""
+    return {"status": "healthy", "timestamp": datetime.utcnow(), "admission": admission.stats()}
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus text-format metrics for this worker (route, operation and Elasticsearch latencies, queues)"""
+    writer = leaderboard_service.writer
+    metrics.WRITE_BEHIND_PENDING.set(writer.pending)
+    metrics.WRITE_BEHIND_OPS.set_total(writer.flushed_ops, result="flushed")
+    metrics.WRITE_BEHIND_OPS.set_total(writer.failed_ops, result="failed")
+    
+    admission_stats = admission.stats()
+    metrics.ADMISSION_ACTIVE.set(admission_stats["active"])
+    metrics.ADMISSION_QUEUE_DEPTH.set(admission_stats["queue_depth"])
+    metrics.ADMISSION_ADMITTED.set_total(admission_stats["admitted"])
+    for reason, count in admission_stats["shed"].items():
+        metrics.ADMISSION_SHED.set_total(count, reason=reason)
+        
+    board = leaderboard_service.boards.get(f"leaderboard_{leaderboard_service.current_leaderboard_suffix}")
+    metrics.BOARD_ENTRIES.set(len(board) if board is not None else 0)
+    return Response(content=metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
 
 @app.get("/")
 async def root():
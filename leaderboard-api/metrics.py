@@ -0,0 +1,250 @@
+"""
+Metrics
+In-process counters, gauges and latency histograms rendered in the Prometheus text format
+"""
+
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+import functools
+import math
+import time
+
+# Latency buckets in seconds, from in-memory reads (sub-millisecond) to slow storage calls
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+def _format_labels(names: Tuple[str, ...], values: LabelValues, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra is not None:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric:
+    """A named family of samples, one per combination of label values"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: Dict[str, Any]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}", *self.samples()]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: Any):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def set_total(self, value: float, **labels: Any):
+        """Mirror a running total kept elsewhere (e.g. service counters read at scrape time)"""
+        self._values[self._key(labels)] = float(value)
+
+    def samples(self) -> Iterator[str]:
+        for key, value in self._values.items():
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, **labels: Any):
+        self._values[self._key(labels)] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels: Any):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: Any):
+        self.inc(-amount, **labels)
+
+    def samples(self) -> Iterator[str]:
+        for key, value in self._values.items():
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Histogram(Metric):
+    """Cumulative-bucket histogram; ``time()`` observes the seconds spent in a block"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (), buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[LabelValues, List[float]] = {}  # per-bucket counts, then +Inf count and sum
+
+    def observe(self, value: float, **labels: Any):
+        key = self._key(labels)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [0.0] * (len(self.buckets) + 2)
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    @contextmanager
+    def time(self, **labels: Any) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self) -> Iterator[str]:
+        for key, series in self._series.items():
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (math.inf,), series):
+                cumulative += count
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, key, ('le', _format_value(bound)))} {_format_value(cumulative)}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(series[-1])}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, key)} {_format_value(cumulative)}"
+
+
+class Registry:
+    """The metrics exposed by one process"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Duplicate metric: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (), buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+REGISTRY = Registry()
+
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "leaderboard_http_request_duration_seconds", "Time to response start per route", ("method", "route", "status")
+)
+HTTP_REQUESTS_IN_FLIGHT = REGISTRY.gauge("leaderboard_http_requests_in_flight", "Requests currently being handled")
+HTTP_ERRORS = REGISTRY.counter("leaderboard_http_errors_total", "Requests answered with a 5xx status or an unhandled error", ("method", "route"))
+
+OPERATION_SECONDS = REGISTRY.histogram("leaderboard_operation_duration_seconds", "LeaderboardService operation latency", ("operation",))
+OPERATIONS_IN_FLIGHT = REGISTRY.gauge("leaderboard_operations_in_flight", "LeaderboardService operations currently running", ("operation",))
+OPERATION_ERRORS = REGISTRY.counter("leaderboard_operation_errors_total", "LeaderboardService operations that raised", ("operation",))
+
+ES_REQUEST_SECONDS = REGISTRY.histogram("leaderboard_es_request_duration_seconds", "Elasticsearch client call latency", ("operation", "index"))
+ES_REQUESTS_IN_FLIGHT = REGISTRY.gauge("leaderboard_es_requests_in_flight", "Elasticsearch client calls currently running")
+ES_ERRORS = REGISTRY.counter("leaderboard_es_errors_total", "Elasticsearch client calls that failed", ("operation", "index", "status"))
+
+
+def timed(operation: str) -> Callable:
+    """Record the latency, concurrency and failures of an async service method"""
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            OPERATIONS_IN_FLIGHT.inc(operation=operation)
+            started = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            except BaseException:
+                OPERATION_ERRORS.inc(operation=operation)
+                raise
+            finally:
+                OPERATION_SECONDS.observe(time.perf_counter() - started, operation=operation)
+                OPERATIONS_IN_FLIGHT.dec(operation=operation)
+        return wrapper
+    return decorator
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware timing every HTTP request up to the start of its response,
+    so streamed responses (SSE, exports) are measured by time to first byte.
+    Requests are labeled by route template to keep label cardinality bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        state = {"status": None}
+
+        def route() -> str:
+            matched = scope.get("route")
+            return getattr(matched, "path", None) or "unmatched"
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and state["status"] is None:
+                state["status"] = message["status"]
+                HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, method=scope["method"], route=route(), status=message["status"])
+                if message["status"] >= 500:
+                    HTTP_ERRORS.inc(method=scope["method"], route=route())
+            await send(message)
+
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except BaseException:
+            if state["status"] is None:
+                HTTP_ERRORS.inc(method=scope["method"], route=route())
+            raise
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+
+# Point-in-time state and running totals, set from the service just before each scrape
+WRITE_BEHIND_PENDING = REGISTRY.gauge("leaderboard_write_behind_pending", "Write groups queued for the next bulk flush")
+WRITE_BEHIND_OPS = REGISTRY.counter("leaderboard_write_behind_ops_total", "Bulk operations flushed or dropped since startup", ("result",))
+ADMISSION_ACTIVE = REGISTRY.gauge("leaderboard_admission_active", "Admitted requests currently running")
+ADMISSION_QUEUE_DEPTH = REGISTRY.gauge("leaderboard_admission_queue_depth", "Requests waiting for an admission slot")
+ADMISSION_ADMITTED = REGISTRY.counter("leaderboard_admission_admitted_total", "Requests admitted since startup")
+ADMISSION_SHED = REGISTRY.counter("leaderboard_admission_shed_total", "Requests rejected with 429 since startup", ("reason",))
+BOARD_ENTRIES = REGISTRY.gauge("leaderboard_board_entries", "Entries on the current in-memory leaderboard")
@@ -0,0 +1,120 @@
+"""
+Cursor paging
+Opaque cursors and point-in-time + search_after paging over Elasticsearch indices
+"""
+
+from elasticsearch import AsyncElasticsearch, NotFoundError
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+import base64
+import json
+
+
+class InvalidCursor(ValueError):
+    """A cursor that cannot be decoded or whose point in time has expired"""
+
+
+def encode_cursor(state: Dict[str, Any]) -> str:
+    """Pack paging state into an opaque URL-safe token"""
+    raw = json.dumps(state, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """Unpack a token produced by encode_cursor"""
+    try:
+        state = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor("Malformed cursor") from e
+    if not isinstance(state, dict):
+        raise InvalidCursor("Malformed cursor")
+    return state
+
+
+async def search_page(
+    es: AsyncElasticsearch,
+    index: str,
+    query: Dict[str, Any],
+    sort: List[Dict[str, Any]],
+    size: int,
+    cursor: Optional[str] = None,
+    keep_alive: str = "2m",
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    One page of hits in ``sort`` order, read from a point in time opened on the first page.
+
+    Each page resumes with search_after from the previous page's last sort values, so the
+    cost per page stays flat however deep a client goes. The returned cursor is None on
+    the last page, at which point the point in time is closed.
+    """
+    if cursor is None:
+        pit_id = (await es.open_point_in_time(index=index, keep_alive=keep_alive))["id"]
+        search_after = None
+    else:
+        state = decode_cursor(cursor)
+        if "pit" not in state or "after" not in state:
+            raise InvalidCursor("Malformed cursor")
+        pit_id, search_after = state["pit"], state["after"]
+
+    try:
+        response = await es.search(
+            query=query,
+            sort=sort,
+            size=size,
+            pit={"id": pit_id, "keep_alive": keep_alive},
+            search_after=search_after,
+            track_total_hits=False,
+        )
+    except NotFoundError as e:
+        raise InvalidCursor("Cursor expired") from e
+
+    hits = response["hits"]["hits"]
+    # Elasticsearch may hand back a refreshed id for the same point in time
+    pit_id = response.get("pit_id", pit_id)
+    if len(hits) < size:
+        await close_point_in_time(es, pit_id)
+        return hits, None
+    return hits, encode_cursor({"pit": pit_id, "after": hits[-1]["sort"]})
+
+
+async def iter_point_in_time(
+    es: AsyncElasticsearch,
+    index: str,
+    query: Dict[str, Any],
+    page_size: int = 1000,
+    fields: Optional[List[str]] = None,
+    keep_alive: str = "2m",
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Yield every matching hit from a point in time, one page in memory at a time.
+    Hits come in _shard_doc order, the cheapest sort for a full pass.
+    """
+    pit_id = (await es.open_point_in_time(index=index, keep_alive=keep_alive))["id"]
+    search_after = None
+    try:
+        while True:
+            response = await es.search(
+                query=query,
+                sort=["_shard_doc"],
+                size=page_size,
+                pit={"id": pit_id, "keep_alive": keep_alive},
+                search_after=search_after,
+                source_includes=fields,
+                track_total_hits=False,
+            )
+            pit_id = response.get("pit_id", pit_id)
+            hits = response["hits"]["hits"]
+            for hit in hits:
+                yield hit
+            if len(hits) < page_size:
+                return
+            search_after = hits[-1]["sort"]
+    finally:
+        await close_point_in_time(es, pit_id)
+
+
+async def close_point_in_time(es: AsyncElasticsearch, pit_id: str):
+    """Release a point in time, ignoring ones that already expired"""
+    try:
+        await es.close_point_in_time(id=pit_id)
+    except NotFoundError:
+        pass
@@ -0,0 +1,106 @@
+"""
+Catalog price index
+In-memory prices from grocery_items and store_inventory used to re-price submitted baskets
+"""
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+import math
+
+# Claimed prices within this distance of a catalog price are accepted as that price (float / rounding noise)
+PRICE_TOLERANCE = 0.01
+
+
+def _item_id(item: Dict[str, Any]) -> Optional[str]:
+    """Catalog id of a submitted item; the game UI sends it as ``id``"""
+    item_id = item.get("item_id") or item.get("id")
+    return str(item_id) if item_id is not None else None
+
+
+def _number(value: Any, default: float) -> float:
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return default
+    return number if math.isfinite(number) else default
+
+
+class PriceIndex:
+    """
+    Base prices by item id plus current in-store prices by item and store.
+
+    A basket item is priced at its store's price when the store is known. Otherwise the
+    claimed price is kept only if it matches one of the item's catalog prices, and the
+    base price is used if it does not. Items the catalog does not know keep their claimed price
+    and are reported as unverified.
+    """
+
+    def __init__(self):
+        self._base: Dict[str, float] = {}
+        self._stores: Dict[str, Dict[str, float]] = {}  # item_id -> {store_id: price}
+        self.loaded = False
+        self.last_refresh: Optional[datetime] = None
+
+    def __len__(self) -> int:
+        return len(self._base)
+
+    def set_item(self, item_id: str, doc: Dict[str, Any]):
+        """Record a grocery_items document"""
+        price = _number(doc.get("base_price"), -1.0)
+        if price >= 0:
+            self._base[item_id] = price
+
+    def set_inventory(self, doc: Dict[str, Any]):
+        """Record a store_inventory document (the sale price applies while the item is on sale)"""
+        item_id, store_id = doc.get("item_id"), doc.get("store_id")
+        if item_id is None or store_id is None:
+            return
+        price = doc.get("sale_price") if doc.get("on_sale") and doc.get("sale_price") is not None else doc.get("current_price")
+        price = _number(price, -1.0)
+        if price >= 0:
+            self._stores.setdefault(str(item_id), {})[str(store_id)] = price
+
+    def _price(self, item_id: str, store_id: Optional[str], claimed: float) -> Optional[float]:
+        """Catalog price for one basket line, or None when the item is unknown"""
+        stores = self._stores.get(item_id)
+        if stores and store_id is not None and store_id in stores:
+            return stores[store_id]
+
+        base = self._base.get(item_id)
+        if base is None and not stores:
+            return None
+        # No store given: any price the item actually sells for is acceptable
+        for price in ([base] if base is not None else []) + (list(stores.values()) if stores else []):
+            if abs(price - claimed) <= PRICE_TOLERANCE:
+                return price
+        return base if base is not None else min(stores.values())
+
+    def price_basket(self, items: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Re-price a basket in one pass over its lines.
+        Returns the recomputed total and how many lines were verified, repriced or unknown.
+        """
+        amounts = []
+        verified = repriced = unverified = 0
+        for item in items:
+            quantity = max(int(_number(item.get("quantity"), 1)), 0)
+            claimed = _number(item.get("price", item.get("item_price")), 0.0)
+            item_id = _item_id(item)
+            store_id = item.get("store_id")
+            price = self._price(item_id, str(store_id) if store_id is not None else None, claimed) if item_id else None
+
+            if price is None:
+                unverified += 1
+                price = claimed
+            elif abs(price - claimed) > PRICE_TOLERANCE:
+                repriced += 1
+            else:
+                verified += 1
+            amounts.append(price * quantity)
+
+        return {
+            "total_price": round(math.fsum(amounts), 2),
+            "verified_items": verified,
+            "repriced_items": repriced,
+            "unverified_items": unverified
+        }
@@ -0,0 +1,191 @@
+"""
+In-memory ranked leaderboards
+Order-statistic structure answering top-N and rank-of-score without Elasticsearch
+"""
+
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import uuid
+
+# Entries are ordered by score (desc), then game_duration (asc), then completed_at (asc).
+# The document id is the final component so every key is unique.
+RankKey = Tuple[float, int, float, str]
+
+
+def parse_datetime(value: Any) -> datetime:
+    """Normalize a datetime or ISO string (as stored in Elasticsearch) to an aware UTC datetime"""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def rank_key(doc_id: str, entry: Dict[str, Any]) -> RankKey:
+    """Build the sort key for a leaderboard entry"""
+    completed_at = parse_datetime(entry["completed_at"])
+    return (-float(entry["score"]), int(entry["game_duration"]), completed_at.timestamp(), doc_id)
+
+
+class RankedLeaderboard:
+    """
+    Sorted list of sublists with a Fenwick tree over sublist lengths.
+
+    Inserts, removals and rank lookups are O(log n); top-N walks the sublists in order.
+    ``version`` increases on every change and ``generation`` identifies this instance,
+    so the pair names one exact state of the board.
+    """
+
+    LOAD = 256
+
+    def __init__(self):
+        self._lists: List[List[RankKey]] = []
+        self._maxes: List[RankKey] = []
+        self._tree: List[int] = []
+        self._keys: Dict[str, RankKey] = {}
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self.generation = uuid.uuid4().hex[:12]
+        self.version = 0
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._keys
+
+    # Fenwick tree over sublist lengths
+
+    def _rebuild_tree(self):
+        tree = [len(sublist) for sublist in self._lists]
+        for i in range(len(tree)):
+            parent = i | (i + 1)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def _tree_add(self, pos: int, delta: int):
+        tree = self._tree
+        while pos < len(tree):
+            tree[pos] += delta
+            pos |= pos + 1
+
+    def _tree_prefix(self, end: int) -> int:
+        """Number of keys stored in sublists [0, end)"""
+        total = 0
+        tree = self._tree
+        while end > 0:
+            total += tree[end - 1]
+            end &= end - 1
+        return total
+
+    # Mutation
+
+    def _insert_key(self, key: RankKey):
+        if not self._maxes:
+            self._lists.append([key])
+            self._maxes.append(key)
+            self._rebuild_tree()
+            return
+
+        pos = bisect_right(self._maxes, key)
+        if pos == len(self._maxes):
+            pos -= 1
+            self._lists[pos].append(key)
+            self._maxes[pos] = key
+        else:
+            insort(self._lists[pos], key)
+
+        sublist = self._lists[pos]
+        if len(sublist) > 2 * self.LOAD:
+            # Split oversized sublists; the tree is rebuilt since positions shift
+            self._lists.insert(pos + 1, sublist[self.LOAD:])
+            del sublist[self.LOAD:]
+            self._maxes.insert(pos, sublist[-1])
+            self._rebuild_tree()
+        else:
+            self._tree_add(pos, 1)
+
+    def _remove_key(self, key: RankKey):
+        pos = bisect_left(self._maxes, key)
+        sublist = self._lists[pos]
+        del sublist[bisect_left(sublist, key)]
+
+        if not sublist:
+            del self._lists[pos]
+            del self._maxes[pos]
+            self._rebuild_tree()
+            return
+
+        self._maxes[pos] = sublist[-1]
+        self._tree_add(pos, -1)
+
+    def upsert(self, doc_id: str, entry: Dict[str, Any]):
+        """Insert an entry, replacing any previous entry with the same document id"""
+        if doc_id in self._keys:
+            self._remove_key(self._keys[doc_id])
+        key = rank_key(doc_id, entry)
+        self._keys[doc_id] = key
+        self._entries[doc_id] = entry
+        self._insert_key(key)
+        self.version += 1
+
+    def get(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        """Stored entry for a document id"""
+        return self._entries.get(doc_id)
+
+    def remove(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        """Remove an entry by document id, returning it if present"""
+        key = self._keys.pop(doc_id, None)
+        if key is None:
+            return None
+        self._remove_key(key)
+        self.version += 1
+        return self._entries.pop(doc_id)
+
+    # Queries
+
+    def _position(self, key: RankKey) -> int:
+        """Number of stored keys ordered strictly before ``key``"""
+        pos = bisect_left(self._maxes, key)
+        if pos == len(self._maxes):
+            return len(self)
+        return self._tree_prefix(pos) + bisect_left(self._lists[pos], key)
+
+    def rank_of_score(self, score: float) -> int:
+        """Rank a score would hold: 1 + number of entries with a strictly higher score"""
+        return self._position((-float(score),)) + 1
+
+    def count_before(self, key: Tuple) -> int:
+        """Number of entries ordered strictly before a full or partial rank key"""
+        return self._position(tuple(key))
+
+    def key_of(self, doc_id: str) -> Optional[RankKey]:
+        """Sort key of a stored entry"""
+        return self._keys.get(doc_id)
+
+    def rank_of(self, doc_id: str) -> Optional[int]:
+        """Exact 1-based rank of a stored entry"""
+        key = self._keys.get(doc_id)
+        if key is None:
+            return None
+        return self._position(key) + 1
+
+    def iter_ranked(self, start: int = 0) -> Iterator[Tuple[int, str, Dict[str, Any]]]:
+        """Yield (rank, doc_id, entry) in rank order, beginning at the 0-based offset ``start``"""
+        rank = 0
+        for sublist in self._lists:
+            if rank + len(sublist) > start:
+                for i in range(max(start - rank, 0), len(sublist)):
+                    doc_id = sublist[i][3]
+                    yield rank + i + 1, doc_id, self._entries[doc_id]
+            rank += len(sublist)
+
+    def top(self, limit: int) -> List[Tuple[int, str, Dict[str, Any]]]:
+        """First ``limit`` entries in rank order"""
+        result = []
+        for item in self.iter_ranked():
+            if len(result) >= limit:
+                break
+            result.append(item)
+        return result
@@ -0,0 +1,98 @@
+"""
+Rescoring
+The scoring formula, applied one result at a time or to whole batches, and background rescoring jobs
+"""
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+import time
+import uuid
+
+
+def calculate_score(total_price: float, target_price: float, time_taken: int, time_limit: int) -> float:
+    """Calculate game score based on price accuracy and speed"""
+    # Closeness score (0-70 points)
+    if total_price <= target_price:
+        price_accuracy = (1 - abs(target_price - total_price) / target_price) * 70
+    else:
+        price_accuracy = 0  # Over budget = 0 points
+
+    # Speed score (0-30 points)
+    if time_taken <= time_limit:
+        speed_score = (1 - time_taken / time_limit) * 30
+    else:
+        speed_score = 0  # Over time = 0 speed points
+
+    total_score = price_accuracy + speed_score
+    return round(total_score, 2)
+
+
+def score_batch(total_prices: Sequence[float], durations: Sequence[int], target_price: float, time_limit: int) -> List[float]:
+    """
+    Scores for a batch of results under one set of rules, calling calculate_score for
+    each result so a rescored entry matches a fresh submission exactly.
+    """
+    return [
+        calculate_score(float(total_price), target_price, int(duration), time_limit)
+        for total_price, duration in zip(total_prices, durations)
+    ]
+
+
+class RescoreJob:
+    """Progress and control of one leaderboard rescoring run"""
+
+    def __init__(self, leaderboard_index: str, target_price: float, time_limit: int):
+        self.job_id = uuid.uuid4().hex
+        self.leaderboard_index = leaderboard_index
+        self.target_price = target_price
+        self.time_limit = time_limit
+        self.status = "pending"  # pending, running, completed, cancelled, failed
+        self.total = 0
+        self.processed = 0
+        self.updated = 0
+        self.failed = 0  # leaderboard entries whose new score was not written
+        self.sessions_failed = 0  # game sessions whose new score was not written
+        self.error: Optional[str] = None
+        self.created_at = datetime.utcnow()
+        self.finished_at: Optional[datetime] = None
+        self.cancel_requested = False
+        self._started = time.monotonic()
+        self._finished: Optional[float] = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("completed", "cancelled", "failed")
+
+    def cancel(self):
+        """Stop after the batch in progress; entries already written keep their new scores"""
+        self.cancel_requested = True
+
+    def finish(self, status: str, error: Optional[str] = None):
+        self.status = status
+        self.error = error
+        self.finished_at = datetime.utcnow()
+        self._finished = time.monotonic()
+
+    def to_dict(self) -> Dict[str, Any]:
+        # A finished job's rate is fixed at its finish time
+        elapsed = (self._finished if self._finished is not None else time.monotonic()) - self._started
+        rate = self.processed / elapsed if elapsed > 0 else 0.0
+        remaining = max(self.total - self.processed, 0)
+        return {
+            "job_id": self.job_id,
+            "leaderboard_index": self.leaderboard_index,
+            "target_price": self.target_price,
+            "time_limit": self.time_limit,
+            "status": self.status,
+            "total": self.total,
+            "processed": self.processed,
+            "updated": self.updated,
+            "failed": self.failed,
+            "sessions_failed": self.sessions_failed,
+            "progress": round(self.processed / self.total, 4) if self.total else (1.0 if self.done else 0.0),
+            "entries_per_second": round(rate, 1),
+            "eta_seconds": round(remaining / rate, 1) if rate and not self.done else None,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at
+        }
@@ -0,0 +1,124 @@
+"""
+Score distribution sketch
+Mergeable fixed-resolution histogram answering percentile, quantile and bucket queries in O(log n)
+"""
+
+from typing import Any, Dict, List
+
+# Scores are rounded to two decimals and bounded by the scoring formula
+SCORE_MIN = 0.0
+SCORE_MAX = 100.0
+SCORE_RESOLUTION = 0.01
+
+
+class ScoreSketch:
+    """
+    Counts per 0.01 score bin with a Fenwick tree over the bins.
+
+    Because scores are bounded and already rounded to the bin width, the sketch is exact;
+    sketches merge by adding counts, so per-board sketches combine into a global one.
+    The tree is a dict holding only non-zero nodes, so a small board costs a few entries
+    rather than one slot per bin.
+    """
+
+    BINS = int(round((SCORE_MAX - SCORE_MIN) / SCORE_RESOLUTION)) + 1
+
+    def __init__(self):
+        self._tree: Dict[int, int] = {}
+        self.count = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    @classmethod
+    def _bin(cls, score: float) -> int:
+        position = int(round((float(score) - SCORE_MIN) / SCORE_RESOLUTION))
+        return min(max(position, 0), cls.BINS - 1)
+
+    def _add_bin(self, position: int, delta: int):
+        tree = self._tree
+        while position < self.BINS:
+            value = tree.get(position, 0) + delta
+            if value:
+                tree[position] = value
+            else:
+                tree.pop(position, None)
+            position |= position + 1
+        self.count += delta
+
+    def _prefix(self, end: int) -> int:
+        """Number of scores in bins [0, end)"""
+        total = 0
+        tree = self._tree
+        while end > 0:
+            total += tree.get(end - 1, 0)
+            end &= end - 1
+        return total
+
+    def add(self, score: float, delta: int = 1):
+        """Record a score (a negative delta removes it)"""
+        self._add_bin(self._bin(score), delta)
+
+    def merge(self, other: "ScoreSketch", sign: int = 1):
+        """Add (or with ``sign=-1`` subtract) another sketch's counts"""
+        for position, count in other.bins().items():
+            self._add_bin(position, sign * count)
+
+    def bins(self) -> Dict[int, int]:
+        """Non-empty bins as {bin: count}"""
+        # Undo the Fenwick accumulation in one backwards pass over the stored nodes
+        counts = dict(self._tree)
+        for position in sorted(self._tree, reverse=True):
+            parent = position | (position + 1)
+            if parent < self.BINS:
+                counts[parent] = counts.get(parent, 0) - self._tree[position]
+        return {position: count for position, count in sorted(counts.items()) if count}
+
+    def count_below(self, score: float) -> int:
+        """Number of recorded scores strictly lower than ``score``"""
+        return self._prefix(self._bin(score))
+
+    def percentile(self, score: float) -> float:
+        """Share of the other recorded scores that ``score`` beats, as a percentage (0 with no others)"""
+        if self.count <= 1:
+            return 0.0
+        return round(100.0 * self.count_below(score) / (self.count - 1), 1)
+
+    def quantile(self, q: float) -> float:
+        """Score at quantile ``q`` (0..1)"""
+        if not self.count:
+            return 0.0
+        target = min(max(int(q * self.count), 0), self.count - 1)
+        # Fenwick descent for the first bin whose prefix count exceeds target
+        position = 0
+        step = 1 << (self.BINS.bit_length())
+        while step:
+            following = position + step
+            if following <= self.BINS and self._tree.get(following - 1, 0) <= target:
+                position = following
+                target -= self._tree.get(following - 1, 0)
+            step >>= 1
+        return round(SCORE_MIN + position * SCORE_RESOLUTION, 2)
+
+    def histogram(self, buckets: int = 10) -> List[Dict[str, Any]]:
+        """Counts in ``buckets`` equal-width score ranges; the last range includes SCORE_MAX"""
+        width = (SCORE_MAX - SCORE_MIN) / buckets
+        result = []
+        previous = 0
+        for i in range(buckets):
+            upper = SCORE_MIN + (i + 1) * width
+            total = self.count if i == buckets - 1 else self._prefix(self._bin(upper))
+            result.append({"min": round(SCORE_MIN + i * width, 2), "max": round(upper, 2), "count": total - previous})
+            previous = total
+        return result
+
+    def to_doc(self) -> Dict[str, int]:
+        """Sparse form stored in Elasticsearch ({score: count})"""
+        return {f"{SCORE_MIN + position * SCORE_RESOLUTION:.2f}": count for position, count in self.bins().items()}
+
+    @classmethod
+    def from_doc(cls, doc: Dict[str, int]) -> "ScoreSketch":
+        sketch = cls()
+        for score, count in doc.items():
+            sketch.add(float(score), count)
+        return sketch
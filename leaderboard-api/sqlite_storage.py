@@ -0,0 +1,444 @@
+"""
+Embedded storage
+SQLite (WAL mode) implementation of the storage interface for single-node deployments and benchmarks
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+import asyncio
+import json
+import logging
+import sqlite3
+import uuid
+
+from paging import InvalidCursor, decode_cursor, encode_cursor
+from ranking import parse_datetime
+from storage import (
+    FAILED, LEADERBOARD_INDEX_PATTERN, LEADERBOARD_SUMMARY_INDEX, NOT_FOUND, REDEEMED, REJECTED,
+    LeaderboardExists, Storage
+)
+
+logger = logging.getLogger(__name__)
+
+# Rows read per query when scanning; other statements get a turn between pages
+SCAN_PAGE_SIZE = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS access_codes (
+    id TEXT PRIMARY KEY,
+    active INTEGER NOT NULL DEFAULT 0,
+    used INTEGER NOT NULL DEFAULT 0,
+    created_ts REAL,
+    used_ts REAL,
+    doc TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS access_codes_redeemable ON access_codes (active, used);
+CREATE INDEX IF NOT EXISTS access_codes_created ON access_codes (created_ts);
+CREATE INDEX IF NOT EXISTS access_codes_used ON access_codes (used_ts);
+
+CREATE TABLE IF NOT EXISTS game_sessions (
+    id TEXT PRIMARY KEY,
+    completed INTEGER NOT NULL DEFAULT 0,
+    created_ts REAL,
+    doc TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS game_sessions_newest ON game_sessions (created_ts DESC, id);
+
+CREATE TABLE IF NOT EXISTS leaderboards (
+    name TEXT PRIMARY KEY,
+    is_current INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS leaderboard_entries (
+    board TEXT NOT NULL,
+    id TEXT NOT NULL,
+    score REAL,
+    game_duration INTEGER,
+    completed_ts REAL,
+    rescored_ts REAL,
+    doc TEXT NOT NULL,
+    PRIMARY KEY (board, id)
+);
+CREATE INDEX IF NOT EXISTS leaderboard_entries_rank ON leaderboard_entries (board, score DESC, game_duration, completed_ts);
+CREATE INDEX IF NOT EXISTS leaderboard_entries_completed ON leaderboard_entries (board, completed_ts);
+CREATE INDEX IF NOT EXISTS leaderboard_entries_rescored ON leaderboard_entries (board, rescored_ts);
+
+CREATE TABLE IF NOT EXISTS leaderboard_summary (
+    id TEXT PRIMARY KEY,
+    doc TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS admin_settings (
+    id TEXT PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 1,
+    doc TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS grocery_items (
+    id TEXT PRIMARY KEY,
+    updated_ts REAL,
+    doc TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS grocery_items_updated ON grocery_items (updated_ts);
+
+CREATE TABLE IF NOT EXISTS store_inventory (
+    id TEXT PRIMARY KEY,
+    updated_ts REAL,
+    doc TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS store_inventory_updated ON store_inventory (updated_ts);
+"""
+
+
+def _ts(value: Any) -> Optional[float]:
+    """Epoch seconds of a stored datetime or ISO string, for range filters"""
+    if value is None:
+        return None
+    try:
+        return parse_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def _json_default(value: Any) -> Any:
+    # Dates are written as ISO strings, as the Elasticsearch client serializes them
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def _dumps(doc: Dict[str, Any]) -> str:
+    return json.dumps(doc, default=_json_default, separators=(",", ":"))
+
+
+def _project(doc: Dict[str, Any], fields: List[str]) -> Dict[str, Any]:
+    """Keep only ``fields``, like Elasticsearch _source filtering"""
+    return {field: doc[field] for field in fields if field in doc}
+
+
+# Columns derived from each collection's documents, used for filters and ordering
+COLUMNS = {
+    "access_codes": lambda doc: {
+        "active": bool(doc.get("active")),
+        "used": bool(doc.get("used")),
+        "created_ts": _ts(doc.get("created_at")),
+        "used_ts": _ts(doc.get("used_at"))
+    },
+    "game_sessions": lambda doc: {
+        "completed": bool(doc.get("completed")),
+        "created_ts": _ts(doc.get("created_date"))
+    },
+    LEADERBOARD_SUMMARY_INDEX: lambda doc: {},
+    "admin_settings": lambda doc: {},
+    "grocery_items": lambda doc: {"updated_ts": _ts(doc.get("last_updated"))},
+    "store_inventory": lambda doc: {"updated_ts": _ts(doc.get("last_updated"))},
+}
+
+
+class SQLiteStorage(Storage):
+    """
+    Storage in one SQLite file in WAL mode, so readers never block the writer.
+
+    Every collection is a table of JSON documents keyed by id, plus the columns its
+    queries filter on. Statements run on one dedicated thread, so disk I/O and lock waits
+    never stall the event loop and transactions never interleave; scans read in pages so
+    no statement stays open across an await. Several workers may share the file; writers
+    wait for each other up to ``busy_timeout``.
+    """
+
+    def __init__(self, path: str, busy_timeout: float = 5.0):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self._db: Optional[sqlite3.Connection] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    async def _call(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Run ``func`` on the SQLite thread"""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    def _fetchone(self, sql: str, params: Tuple[Any, ...] = ()) -> Optional[Tuple[Any, ...]]:
+        return self._db.execute(sql, params).fetchone()
+
+    def _fetchall(self, sql: str, params: Tuple[Any, ...] = ()) -> List[Tuple[Any, ...]]:
+        return self._db.execute(sql, params).fetchall()
+
+    def _open(self):
+        self._db = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+
+    async def setup(self):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite")
+        await self._call(self._open)
+        logger.info(f"Opened SQLite storage at {self.path}")
+
+    async def close(self):
+        if self._db is not None:
+            await self._call(self._db.close)
+            self._db = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def _table(self, collection: str) -> Tuple[str, Optional[str]]:
+        """Table and leaderboard name for a collection (leaderboards share one table)"""
+        if LEADERBOARD_INDEX_PATTERN.match(collection):
+            return "leaderboard_entries", collection
+        if collection in COLUMNS:
+            return collection, None
+        raise KeyError(collection)
+
+    def _get(self, table: str, board: Optional[str], doc_id: str) -> Optional[Dict[str, Any]]:
+        if board is None:
+            row = self._db.execute(f"SELECT doc FROM {table} WHERE id = ?", (doc_id,)).fetchone()
+        else:
+            row = self._db.execute("SELECT doc FROM leaderboard_entries WHERE board = ? AND id = ?", (board, doc_id)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _put(self, table: str, board: Optional[str], doc_id: str, doc: Dict[str, Any]):
+        """Insert or replace a document, keeping its rowid so concurrent scans do not skip it"""
+        if board is not None:
+            self._db.execute("INSERT OR IGNORE INTO leaderboards (name) VALUES (?)", (board,))
+            self._db.execute(
+                "INSERT INTO leaderboard_entries (board, id, score, game_duration, completed_ts, rescored_ts, doc) VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (board, id) DO UPDATE SET score = excluded.score, game_duration = excluded.game_duration, "
+                "completed_ts = excluded.completed_ts, rescored_ts = excluded.rescored_ts, doc = excluded.doc",
+                (board, doc_id, doc.get("score"), doc.get("game_duration"), _ts(doc.get("completed_at")), _ts(doc.get("rescored_at")), _dumps(doc))
+            )
+            return
+
+        columns = {"id": doc_id, **COLUMNS[table](doc), "doc": _dumps(doc)}
+        names = ", ".join(columns)
+        updates = ", ".join(f"{name} = excluded.{name}" for name in columns if name != "id")
+        self._db.execute(
+            f"INSERT INTO {table} ({names}) VALUES ({', '.join('?' * len(columns))}) ON CONFLICT (id) DO UPDATE SET {updates}",
+            list(columns.values())
+        )
+
+    async def bulk(self, operations: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Apply index, create and update (partial doc) actions in one transaction"""
+        return await self._call(self._bulk, operations)
+
+    def _bulk(self, operations: List[Dict[str, Any]]) -> Dict[str, Any]:
+        items = []
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            for i in range(0, len(operations), 2):
+                action, meta = next(iter(operations[i].items()))
+                source = operations[i + 1]
+                doc_id = str(meta.get("_id") or uuid.uuid4().hex)
+                result = {"_index": meta["_index"], "_id": doc_id}
+                items.append({action: result})
+
+                try:
+                    table, board = self._table(meta["_index"])
+                except KeyError:
+                    result.update(status=404, error={"type": "index_not_found_exception", "reason": f"no such index [{meta['_index']}]"})
+                    continue
+
+                existing = self._get(table, board, doc_id) if action in ("create", "update") else None
+                if action == "create" and existing is not None:
+                    result.update(status=409, error={"type": "version_conflict_engine_exception", "reason": "document already exists"})
+                elif action == "update":
+                    if existing is None:
+                        result.update(status=404, error={"type": "document_missing_exception", "reason": "document missing"})
+                        continue
+                    existing.update(source.get("doc", {}))
+                    self._put(table, board, doc_id, existing)
+                    result.update(status=200, result="updated")
+                else:
+                    self._put(table, board, doc_id, source)
+                    result.update(status=201, result="created")
+            self._db.execute("COMMIT")
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+        return {"took": 0, "errors": any("error" in next(iter(item.values())) for item in items), "items": items}
+
+    async def _scan(self, table: str, columns: str, where: str = "1", params: Tuple[Any, ...] = ()) -> AsyncIterator[Tuple[Any, ...]]:
+        """Rows matching ``where`` in rowid order, one page per query"""
+        last = 0
+        while True:
+            rows = await self._call(
+                self._fetchall,
+                f"SELECT rowid, {columns} FROM {table} WHERE ({where}) AND rowid > ? ORDER BY rowid LIMIT ?",
+                (*params, last, SCAN_PAGE_SIZE)
+            )
+            for row in rows:
+                yield row[1:]
+            if len(rows) < SCAN_PAGE_SIZE:
+                return
+            last = rows[-1][0]
+
+    # Access codes
+
+    async def scan_access_codes(self, since: Optional[datetime] = None) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        if since is None:
+            where, params = "active = 1 AND used = 0", ()
+        else:
+            where, params = "created_ts >= ? OR used_ts >= ?", (_ts(since), _ts(since))
+        async for code, doc in self._scan("access_codes", "id, doc", where, params):
+            yield code, json.loads(doc)
+
+    async def redeem_access_code(self, code: str, session_doc: Dict[str, Any], used_by: str, now: datetime) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """The checks, the redemption and the session insert run in one write transaction"""
+        return await self._call(self._redeem_access_code, code, session_doc, used_by, now)
+
+    def _redeem_access_code(self, code: str, session_doc: Dict[str, Any], used_by: str, now: datetime) -> Tuple[str, Optional[Dict[str, Any]]]:
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            code_doc = self._get("access_codes", None, code)
+            if code_doc is None:
+                self._db.execute("ROLLBACK")
+                return NOT_FOUND, None
+
+            expires_at = code_doc.get("expires_at")
+            if not code_doc.get("active") or code_doc.get("used") or (expires_at is not None and parse_datetime(expires_at) < now):
+                self._db.execute("ROLLBACK")
+                return REJECTED, code_doc
+
+            if self._get("game_sessions", None, session_doc["session_id"]) is not None:
+                self._db.execute("ROLLBACK")
+                logger.error(f"Error creating session for access code {code}: session {session_doc['session_id']} exists")
+                return FAILED, None
+
+            code_doc.update(used=True, used_by=used_by, used_at=now.isoformat())
+            self._put("access_codes", None, code, code_doc)
+            self._put("game_sessions", None, session_doc["session_id"], session_doc)
+            self._db.execute("COMMIT")
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+        return REDEEMED, code_doc
+
+    # Game sessions
+
+    async def get_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+        return await self._call(self._get, "game_sessions", None, session_id)
+
+    def _completed_filter(self, completed: Optional[bool]) -> Tuple[str, Tuple[Any, ...]]:
+        return ("1", ()) if completed is None else ("completed = ?", (completed,))
+
+    async def page_sessions(self, size: int, cursor: Optional[str], completed: Optional[bool]) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Keyset pages on (created_ts desc, id); the cursor holds the last row's key"""
+        where, params = self._completed_filter(completed)
+        if cursor is not None:
+            after = decode_cursor(cursor).get("after")
+            if not isinstance(after, list) or len(after) != 2:
+                raise InvalidCursor("Malformed cursor")
+            where += " AND (created_ts < ? OR (created_ts = ? AND id > ?))"
+            params += (after[0], after[0], after[1])
+
+        rows = await self._call(
+            self._fetchall,
+            f"SELECT created_ts, id, doc FROM game_sessions WHERE {where} ORDER BY created_ts DESC, id LIMIT ?",
+            (*params, size)
+        )
+        sessions = [json.loads(doc) for _, _, doc in rows]
+        if len(rows) < size:
+            return sessions, None
+        return sessions, encode_cursor({"after": [rows[-1][0], rows[-1][1]]})
+
+    async def iter_sessions(self, fields: List[str], completed: Optional[bool]) -> AsyncIterator[Dict[str, Any]]:
+        where, params = self._completed_filter(completed)
+        async for (doc,) in self._scan("game_sessions", "doc", where, params):
+            yield _project(json.loads(doc), fields)
+
+    # Leaderboards
+
+    async def list_leaderboards(self, date: Optional[str] = None) -> List[str]:
+        pattern = f"leaderboard_{date}_%" if date else "leaderboard_%"
+        rows = await self._call(self._fetchall, "SELECT name FROM leaderboards WHERE name LIKE ? ORDER BY name", (pattern,))
+        return [name for (name,) in rows if LEADERBOARD_INDEX_PATTERN.match(name)]
+
+    async def create_leaderboard(self, name: str, current: bool = False):
+        try:
+            await self._call(self._fetchone, "INSERT INTO leaderboards (name) VALUES (?)", (name,))
+        except sqlite3.IntegrityError as e:
+            raise LeaderboardExists(name) from e
+        if current:
+            await self.set_current_leaderboard(name)
+
+    async def get_current_leaderboard(self) -> Optional[str]:
+        row = await self._call(self._fetchone, "SELECT name FROM leaderboards WHERE is_current = 1")
+        return row[0] if row else None
+
+    async def set_current_leaderboard(self, name: str, previous: Optional[str] = None):
+        await self._call(self._set_current_leaderboard, name)
+
+    def _set_current_leaderboard(self, name: str):
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            self._db.execute("UPDATE leaderboards SET is_current = 0 WHERE is_current = 1")
+            self._db.execute(
+                "INSERT INTO leaderboards (name, is_current) VALUES (?, 1) ON CONFLICT (name) DO UPDATE SET is_current = 1",
+                (name,)
+            )
+            self._db.execute("COMMIT")
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+
+    async def leaderboard_exists(self, name: str) -> bool:
+        return await self._call(self._fetchone, "SELECT 1 FROM leaderboards WHERE name = ?", (name,)) is not None
+
+    async def count_leaderboard(self, name: str) -> int:
+        return (await self._call(self._fetchone, "SELECT COUNT(*) FROM leaderboard_entries WHERE board = ?", (name,)))[0]
+
+    async def scan_leaderboard(self, name: str, since: Optional[datetime] = None) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        if since is None:
+            where, params = "board = ?", (name,)
+        else:
+            where, params = "board = ? AND (completed_ts >= ? OR rescored_ts >= ?)", (name, _ts(since), _ts(since))
+        async for doc_id, doc in self._scan("leaderboard_entries", "id, doc", where, params):
+            yield doc_id, json.loads(doc)
+
+    async def iter_leaderboard_entries(self, names: List[str], fields: List[str]) -> AsyncIterator[Dict[str, Any]]:
+        where = f"board IN ({', '.join('?' * len(names))})"
+        async for (doc,) in self._scan("leaderboard_entries", "doc", where, tuple(names)):
+            yield _project(json.loads(doc), fields)
+
+    async def scan_summaries(self) -> AsyncIterator[Dict[str, Any]]:
+        async for (doc,) in self._scan(LEADERBOARD_SUMMARY_INDEX, "doc"):
+            yield json.loads(doc)
+
+    # Catalog
+
+    async def scan_catalog(self, since: Optional[datetime] = None) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        where, params = ("1", ()) if since is None else ("updated_ts >= ?", (_ts(since),))
+        async for item_id, doc in self._scan("grocery_items", "id, doc", where, params):
+            doc = json.loads(doc)
+            yield str(doc.get("item_id") or item_id), doc
+
+    async def scan_inventory(self, since: Optional[datetime] = None) -> AsyncIterator[Dict[str, Any]]:
+        where, params = ("1", ()) if since is None else ("updated_ts >= ?", (_ts(since),))
+        async for (doc,) in self._scan("store_inventory", "doc", where, params):
+            yield json.loads(doc)
+
+    # Admin settings
+
+    async def get_settings_version(self) -> Optional[int]:
+        row = await self._call(self._fetchone, "SELECT version FROM admin_settings WHERE id = 'current'")
+        return row[0] if row else None
+
+    async def get_settings(self) -> Optional[Tuple[Dict[str, Any], int]]:
+        row = await self._call(self._fetchone, "SELECT doc, version FROM admin_settings WHERE id = 'current'")
+        return (json.loads(row[0]), row[1]) if row else None
+
+    async def create_settings(self, settings_doc: Dict[str, Any]) -> Optional[int]:
+        try:
+            await self._call(self._fetchone, "INSERT INTO admin_settings (id, version, doc) VALUES ('current', 1, ?)", (_dumps(settings_doc),))
+        except sqlite3.IntegrityError:
+            return None
+        return 1
+
+    async def put_settings(self, settings_doc: Dict[str, Any]) -> int:
+        row = await self._call(
+            self._fetchone,
+            "INSERT INTO admin_settings (id, version, doc) VALUES ('current', 1, ?) "
+            "ON CONFLICT (id) DO UPDATE SET version = version + 1, doc = excluded.doc RETURNING version",
+            (_dumps(settings_doc),)
+        )
+        return row[0]
@@ -0,0 +1,589 @@
+"""
+Storage backends
+Interface for everything LeaderboardService persists, and its Elasticsearch implementation
+"""
+
+from abc import ABC, abstractmethod
+from datetime import datetime
+from elasticsearch import ApiError, AsyncElasticsearch, BadRequestError, ConflictError, NotFoundError
+from elasticsearch.helpers import async_scan
+from typing import Any, AsyncIterator, Dict, List, Mapping, Optional, Tuple
+import logging
+import re
+import time
+
+from metrics import ES_ERRORS, ES_REQUEST_SECONDS, ES_REQUESTS_IN_FLIGHT
+from paging import iter_point_in_time, search_page
+
+logger = logging.getLogger(__name__)
+
+LEADERBOARD_INDEX_PATTERN = re.compile(r"^leaderboard_(\d{8})_(\d{3})$")
+# The same names as a Lucene regexp on _index (implicitly anchored)
+LEADERBOARD_INDEX_REGEXP = "leaderboard_[0-9]{8}_[0-9]{3}"
+LEADERBOARD_SUMMARY_INDEX = "leaderboard_summary"
+
+# Outcomes of redeem_access_code
+REDEEMED = "redeemed"
+REJECTED = "rejected"  # inactive, used or expired; the code document is returned
+NOT_FOUND = "not_found"
+ALREADY_USED = "already_used"  # lost a race with a concurrent redemption
+FAILED = "failed"
+
+
+class LeaderboardExists(Exception):
+    """A leaderboard with this name was already created (usually by another worker)"""
+
+
+class LeaderboardNotFound(Exception):
+    """No leaderboard with this name was created"""
+
+
+class Storage(ABC):
+    """
+    Persistence used by LeaderboardService.
+
+    Collections keep their Elasticsearch names (``access_codes``, ``game_sessions``,
+    ``leaderboard_YYYYMMDD_NNN``, ``leaderboard_summary``, ``admin_settings``) and writes
+    are expressed as ``_bulk`` action/source pairs, so the write-behind queue and code
+    minting work the same on every backend.
+    """
+
+    @abstractmethod
+    async def setup(self):
+        """Create the collections the service needs"""
+
+    @abstractmethod
+    async def close(self):
+        """Release connections"""
+
+    @abstractmethod
+    async def bulk(self, operations: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Apply index/create/update action pairs; the response has the shape of an Elasticsearch _bulk response"""
+
+    async def refresh(self, collection: str):
+        """Make recent writes to a collection visible to searches"""
+
+    # Access codes
+
+    @abstractmethod
+    def scan_access_codes(self, since: Optional[datetime] = None) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """Redeemable codes, or every code created or redeemed since ``since``"""
+
+    @abstractmethod
+    async def redeem_access_code(self, code: str, session_doc: Dict[str, Any], used_by: str, now: datetime) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """
+        Atomically mark a code used and create its game session.
+        Returns the outcome (REDEEMED, REJECTED, NOT_FOUND, ALREADY_USED or FAILED) and the code document when known.
+        """
+
+    # Game sessions
+
+    @abstractmethod
+    async def get_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """A game session, or None when it does not exist"""
+
+    @abstractmethod
+    async def page_sessions(self, size: int, cursor: Optional[str], completed: Optional[bool]) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """One page of sessions, newest first, and the cursor for the next page (raises InvalidCursor)"""
+
+    @abstractmethod
+    def iter_sessions(self, fields: List[str], completed: Optional[bool]) -> AsyncIterator[Dict[str, Any]]:
+        """Every session, projected to ``fields``, without holding them all in memory"""
+
+    # Leaderboards
+
+    @abstractmethod
+    async def list_leaderboards(self, date: Optional[str] = None) -> List[str]:
+        """Names of existing leaderboards (optionally for one YYYYMMDD date), oldest first"""
+
+    @abstractmethod
+    async def create_leaderboard(self, name: str, current: bool = False):
+        """Create a leaderboard, optionally making it current; raises LeaderboardExists"""
+
+    @abstractmethod
+    async def get_current_leaderboard(self) -> Optional[str]:
+        """Leaderboard receiving new entries, or None before one is chosen"""
+
+    @abstractmethod
+    async def set_current_leaderboard(self, name: str, previous: Optional[str] = None):
+        """Atomically make ``name`` the current leaderboard in place of ``previous``"""
+
+    @abstractmethod
+    async def leaderboard_exists(self, name: str) -> bool:
+        """Whether a leaderboard was created"""
+
+    @abstractmethod
+    async def count_leaderboard(self, name: str) -> int:
+        """Number of entries stored on a leaderboard"""
+
+    @abstractmethod
+    def scan_leaderboard(self, name: str, since: Optional[datetime] = None) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """Entries of a leaderboard as (id, entry), optionally only those completed or rescored since ``since``"""
+
+    @abstractmethod
+    def iter_leaderboard_entries(self, names: List[str], fields: List[str]) -> AsyncIterator[Dict[str, Any]]:
+        """Every entry of the given leaderboards, projected to ``fields``"""
+
+    @abstractmethod
+    def scan_summaries(self) -> AsyncIterator[Dict[str, Any]]:
+        """Persisted leaderboard summaries"""
+
+    # Catalog
+
+    @abstractmethod
+    def scan_catalog(self, since: Optional[datetime] = None) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """Grocery items as (catalog item_id, {"base_price": ...}), optionally only those updated since ``since``"""
+
+    @abstractmethod
+    def scan_inventory(self, since: Optional[datetime] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Store inventory prices, optionally only those updated since ``since``; empty when there is no inventory"""
+
+    # Admin settings
+
+    @abstractmethod
+    async def get_settings_version(self) -> Optional[int]:
+        """Version of the stored settings without reading them"""
+
+    @abstractmethod
+    async def get_settings(self) -> Optional[Tuple[Dict[str, Any], int]]:
+        """Stored settings and their version"""
+
+    @abstractmethod
+    async def create_settings(self, settings_doc: Dict[str, Any]) -> Optional[int]:
+        """Store settings unless some already exist; returns the new version or None"""
+
+    @abstractmethod
+    async def put_settings(self, settings_doc: Dict[str, Any]) -> int:
+        """Replace the stored settings, returning the new version"""
+
+
+# Redeems an access code atomically: checks active, used and expiry server-side,
+# and turns the update into a noop when the code cannot be redeemed
+REDEEM_ACCESS_CODE_SCRIPT = """
+if (ctx._source.active != true || ctx._source.used == true) {
+  ctx.op = 'noop';
+  return;
+}
+def expires = ctx._source.expires_at;
+if (expires != null) {
+  long expiresMillis;
+  if (expires instanceof Number) {
+    expiresMillis = expires.longValue();
+  } else {
+    String value = expires.toString();
+    if (value.endsWith('Z') || value.lastIndexOf('+') > 10 || value.lastIndexOf('-') > 10) {
+      expiresMillis = ZonedDateTime.parse(value).toInstant().toEpochMilli();
+    } else {
+      expiresMillis = LocalDateTime.parse(value).atZone(ZoneOffset.UTC).toInstant().toEpochMilli();
+    }
+  }
+  if (expiresMillis < params.now) {
+    ctx.op = 'noop';
+    return;
+  }
+}
+ctx._source.used = true;
+ctx._source.used_by = params.used_by;
+ctx._source.used_at = params.used_at;
+"""
+
+LEADERBOARD_MAPPINGS = {
+    "properties": {
+        "session_id": {"type": "keyword"},
+        "player_name": {"type": "text", "fields": {"keyword": {"type": "keyword"}}},
+        "player_email": {"type": "keyword"},
+        "company": {"type": "text", "fields": {"keyword": {"type": "keyword"}}},
+        "selected_agent": {"type": "keyword"},
+        "total_price": {"type": "double"},
+        "score": {"type": "double"},
+        "game_duration": {"type": "integer"},
+        "completed_at": {"type": "date"},
+        "rescored_at": {"type": "date"},
+        "leaderboard_date": {"type": "keyword"}
+    }
+}
+
+INDEX_MAPPINGS = {
+    "access_codes": {
+        "mappings": {
+            "properties": {
+                "access_code": {"type": "keyword"},
+                "active": {"type": "boolean"},
+                "used": {"type": "boolean"},
+                "used_by": {"type": "keyword"},
+                "used_at": {"type": "date"},
+                "expires_at": {"type": "date"},
+                "batch_name": {"type": "keyword"},
+                "created_at": {"type": "date"}
+            }
+        }
+    },
+    "game_sessions": {
+        "mappings": {
+            "properties": {
+                "session_id": {"type": "keyword"},
+                "access_code": {"type": "keyword"},
+                "player_name": {"type": "text"},
+                "player_email": {"type": "keyword"},
+                "company": {"type": "text"},
+                "selected_agent": {"type": "keyword"},
+                "start_time": {"type": "date"},
+                "end_time": {"type": "date"},
+                "game_duration": {"type": "integer"},
+                "items_selected": {
+                    "type": "nested",
+                    "properties": {
+                        "item_id": {"type": "keyword"},
+                        "item_name": {"type": "text"},
+                        "store_id": {"type": "keyword"},
+                        "price": {"type": "double"},
+                        "quantity": {"type": "integer"}
+                    }
+                },
+                "total_price": {"type": "double"},
+                "target_price": {"type": "double"},
+                "score": {"type": "double"},
+                "completed": {"type": "boolean"},
+                "idempotency_key": {"type": "keyword", "index": False},
+                "created_date": {"type": "date"},
+                "last_updated": {"type": "date"}
+            }
+        }
+    },
+    "admin_settings": {
+        "mappings": {
+            "properties": {
+                "target_price": {"type": "double"},
+                "game_duration_minutes": {"type": "integer"},
+                "current_season": {"type": "keyword"},
+                "leaderboard_reset_threshold": {"type": "integer"},
+                "last_updated": {"type": "date"}
+            }
+        }
+    },
+    LEADERBOARD_SUMMARY_INDEX: {
+        "mappings": {
+            "properties": {
+                "leaderboard_index": {"type": "keyword"},
+                "agents": {"type": "object", "enabled": False},
+                "companies": {"type": "object", "enabled": False},
+                "top": {"type": "object", "enabled": False},
+                "scores": {"type": "object", "enabled": False},
+                "last_updated": {"type": "date"}
+            }
+        }
+    }
+}
+
+
+def _index_label(path_parts: Optional[Mapping[str, Any]]) -> str:
+    """Metric label for the indices of a call; dated leaderboards collapse into one value"""
+    index = (path_parts or {}).get("index")
+    if not index:
+        return "_none"
+    names = index if isinstance(index, (list, tuple)) else str(index).split(",")
+    return ",".join(sorted({"leaderboard_*" if LEADERBOARD_INDEX_PATTERN.match(name) else name for name in names}))
+
+
+class MeteredElasticsearch(AsyncElasticsearch):
+    """AsyncElasticsearch that records the latency and failures of every API call, by operation and index"""
+
+    async def perform_request(
+        self,
+        method: str,
+        path: str,
+        *,
+        params: Optional[Mapping[str, Any]] = None,
+        headers: Optional[Mapping[str, str]] = None,
+        body: Optional[Any] = None,
+        endpoint_id: Optional[str] = None,
+        path_parts: Optional[Mapping[str, Any]] = None,
+    ):
+        operation = endpoint_id or method
+        index = _index_label(path_parts)
+        ES_REQUESTS_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            return await super().perform_request(
+                method, path, params=params, headers=headers, body=body, endpoint_id=endpoint_id, path_parts=path_parts
+            )
+        except ApiError as e:
+            ES_ERRORS.inc(operation=operation, index=index, status=e.status_code)
+            raise
+        except Exception:
+            ES_ERRORS.inc(operation=operation, index=index, status="transport")
+            raise
+        finally:
+            ES_REQUEST_SECONDS.observe(time.perf_counter() - started, operation=operation, index=index)
+            ES_REQUESTS_IN_FLIGHT.dec()
+
+
+class ElasticsearchStorage(Storage):
+    """
+    Storage on an Elasticsearch cluster.
+    Each leaderboard is a dated index; the current one is the write index of ``leaderboard_alias``.
+    """
+
+    def __init__(self, es_client: AsyncElasticsearch, leaderboard_alias: str = "leaderboard_current", pit_keep_alive: str = "2m", export_page_size: int = 1000):
+        self.es = es_client
+        self.leaderboard_alias = leaderboard_alias
+        self.pit_keep_alive = pit_keep_alive
+        self.export_page_size = export_page_size
+
+    async def setup(self):
+        for index_name, mapping in INDEX_MAPPINGS.items():
+            try:
+                exists = await self.es.indices.exists(index=index_name)
+                if not exists:
+                    await self.es.indices.create(index=index_name, body=mapping)
+                    logger.info(f"Created index: {index_name}")
+            except Exception as e:
+                logger.error(f"Error creating index {index_name}: {e}")
+
+    async def close(self):
+        await self.es.close()
+
+    async def bulk(self, operations: List[Dict[str, Any]]) -> Dict[str, Any]:
+        return await self.es.bulk(operations=operations)
+
+    async def refresh(self, collection: str):
+        await self.es.indices.refresh(index=collection)
+
+    # Access codes
+
+    async def scan_access_codes(self, since: Optional[datetime] = None) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        if since is None:
+            query = {"bool": {"filter": [{"term": {"active": True}}, {"term": {"used": False}}]}}
+        else:
+            query = {
+                "bool": {
+                    "should": [
+                        {"range": {"created_at": {"gte": since}}},
+                        {"range": {"used_at": {"gte": since}}}
+                    ],
+                    "minimum_should_match": 1
+                }
+            }
+        async for hit in async_scan(self.es, index="access_codes", query={"query": query}):
+            yield hit["_id"], hit["_source"]
+
+    async def redeem_access_code(self, code: str, session_doc: Dict[str, Any], used_by: str, now: datetime) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """
+        The scripted update and the session create go out in a single _bulk request;
+        the script checks active, used and expiry server-side.
+        """
+        session_id = session_doc["session_id"]
+        response = await self.es.bulk(operations=[
+            {"update": {"_index": "access_codes", "_id": code}},
+            {
+                "script": {
+                    "source": REDEEM_ACCESS_CODE_SCRIPT,
+                    "lang": "painless",
+                    "params": {
+                        "now": int(now.timestamp() * 1000),
+                        "used_by": used_by,
+                        "used_at": now.isoformat()
+                    }
+                },
+                "_source": True
+            },
+            {"create": {"_index": "game_sessions", "_id": session_id}},
+            session_doc
+        ])
+        redeem_result = response["items"][0]["update"]
+        session_result = response["items"][1]["create"]
+
+        if redeem_result.get("result") == "updated" and "error" not in session_result:
+            return REDEEMED, redeem_result["get"]["_source"]
+
+        if redeem_result.get("result") == "updated":
+            # The code was redeemed but the session could not be created; release the code again
+            logger.error(f"Error creating session for access code {code}: {session_result.get('error')}")
+            await self._release_access_code(code)
+            return FAILED, None
+
+        # The session was written alongside a failed redemption; remove it
+        if "error" not in session_result:
+            await self._discard_session(session_id)
+
+        if redeem_result.get("result") == "noop":
+            return REJECTED, redeem_result.get("get", {}).get("_source")
+        if redeem_result.get("status") == 404:
+            return NOT_FOUND, None
+        if redeem_result.get("status") == 409:
+            return ALREADY_USED, None
+        logger.error(f"Error redeeming access code {code}: {redeem_result.get('error')}")
+        return FAILED, None
+
+    async def _release_access_code(self, code: str):
+        """Undo a redemption whose game session could not be created"""
+        try:
+            await self.es.update(
+                index="access_codes",
+                id=code,
+                doc={"used": False, "used_by": None, "used_at": None}
+            )
+        except Exception as e:
+            logger.error(f"Failed to release access code {code}: {e}")
+
+    async def _discard_session(self, session_id: str):
+        """Delete a session created for a redemption that did not go through"""
+        try:
+            await self.es.delete(index="game_sessions", id=session_id)
+        except NotFoundError:
+            pass
+        except Exception as e:
+            logger.error(f"Failed to discard session {session_id}: {e}")
+
+    # Game sessions
+
+    async def get_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            response = await self.es.get(index="game_sessions", id=session_id)
+        except NotFoundError:
+            return None
+        return response["_source"]
+
+    def _sessions_query(self, completed: Optional[bool]) -> Dict[str, Any]:
+        return {"match_all": {}} if completed is None else {"term": {"completed": completed}}
+
+    async def page_sessions(self, size: int, cursor: Optional[str], completed: Optional[bool]) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Pages are read from a point in time with search_after on (created_date, session_id)"""
+        hits, next_cursor = await search_page(
+            self.es,
+            "game_sessions",
+            self._sessions_query(completed),
+            sort=[{"created_date": "desc"}, {"session_id": "asc"}],
+            size=size,
+            cursor=cursor,
+            keep_alive=self.pit_keep_alive
+        )
+        return [hit["_source"] for hit in hits], next_cursor
+
+    async def iter_sessions(self, fields: List[str], completed: Optional[bool]) -> AsyncIterator[Dict[str, Any]]:
+        async for hit in iter_point_in_time(self.es, "game_sessions", self._sessions_query(completed), page_size=self.export_page_size, fields=fields, keep_alive=self.pit_keep_alive):
+            yield hit["_source"]
+
+    # Leaderboards
+
+    async def list_leaderboards(self, date: Optional[str] = None) -> List[str]:
+        pattern = f"leaderboard_{date}_*" if date else "leaderboard_*"
+        rows = await self.es.cat.indices(index=pattern, h="index", format="json")
+        return sorted(row["index"] for row in rows if LEADERBOARD_INDEX_PATTERN.match(row["index"]))
+
+    async def create_leaderboard(self, name: str, current: bool = False):
+        body: Dict[str, Any] = {"mappings": LEADERBOARD_MAPPINGS}
+        if current:
+            body["aliases"] = {self.leaderboard_alias: {"is_write_index": True}}
+        try:
+            await self.es.indices.create(index=name, body=body)
+        except BadRequestError as e:
+            if e.error == "resource_already_exists_exception":
+                raise LeaderboardExists(name) from e
+            raise
+
+    async def get_current_leaderboard(self) -> Optional[str]:
+        try:
+            response = await self.es.indices.get_alias(name=self.leaderboard_alias)
+        except NotFoundError:
+            return None
+
+        for index, info in response.items():
+            if info["aliases"][self.leaderboard_alias].get("is_write_index", len(response) == 1):
+                return index
+        return None
+
+    async def set_current_leaderboard(self, name: str, previous: Optional[str] = None):
+        actions = [{"add": {"index": name, "alias": self.leaderboard_alias, "is_write_index": True}}]
+        if previous is not None and previous != name:
+            actions.insert(0, {"remove": {"index": previous, "alias": self.leaderboard_alias, "must_exist": False}})
+        await self.es.indices.update_aliases(actions=actions)
+
+    async def leaderboard_exists(self, name: str) -> bool:
+        return bool(await self.es.indices.exists(index=name))
+
+    async def count_leaderboard(self, name: str) -> int:
+        try:
+            return (await self.es.count(index=name))["count"]
+        except NotFoundError:
+            return 0
+
+    async def scan_leaderboard(self, name: str, since: Optional[datetime] = None) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        if since is None:
+            query = {"match_all": {}}
+        else:
+            query = {
+                "bool": {
+                    "should": [{"range": {"completed_at": {"gte": since}}}, {"range": {"rescored_at": {"gte": since}}}],
+                    "minimum_should_match": 1
+                }
+            }
+        try:
+            async for hit in async_scan(self.es, index=name, query={"query": query}):
+                yield hit["_id"], hit["_source"]
+        except NotFoundError:
+            pass  # Board has no entries yet
+
+    async def iter_leaderboard_entries(self, names: List[str], fields: List[str]) -> AsyncIterator[Dict[str, Any]]:
+        if len(names) == 1:
+            index, query = names[0], {"match_all": {}}
+        else:
+            # Listing every board in the URL overflows the HTTP line after enough rolls,
+            # so open the PIT on the wildcard and select the boards in the query instead
+            index = "leaderboard_*"
+            query = {"bool": {"filter": [
+                {"regexp": {"_index": LEADERBOARD_INDEX_REGEXP}},
+                {"terms": {"_index": names}}
+            ]}}
+        async for hit in iter_point_in_time(self.es, index, query, page_size=self.export_page_size, fields=fields, keep_alive=self.pit_keep_alive):
+            yield hit["_source"]
+
+    async def scan_summaries(self) -> AsyncIterator[Dict[str, Any]]:
+        async for hit in async_scan(self.es, index=LEADERBOARD_SUMMARY_INDEX, query={"query": {"match_all": {}}}):
+            yield hit["_source"]
+
+    # Catalog
+
+    def _updated_since(self, since: Optional[datetime]) -> Dict[str, Any]:
+        return {"match_all": {}} if since is None else {"range": {"last_updated": {"gte": since}}}
+
+    async def scan_catalog(self, since: Optional[datetime] = None) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        query = {"query": self._updated_since(since), "_source": ["item_id", "store_id", "base_price"]}
+        async for hit in async_scan(self.es, index="grocery_items", query=query):
+            # Baskets reference the catalog item_id field; the document id is only a fallback
+            yield str(hit["_source"].get("item_id") or hit["_id"]), hit["_source"]
+
+    async def scan_inventory(self, since: Optional[datetime] = None) -> AsyncIterator[Dict[str, Any]]:
+        query = {"query": self._updated_since(since), "_source": ["item_id", "store_id", "current_price", "sale_price", "on_sale"]}
+        try:
+            async for hit in async_scan(self.es, index="store_inventory", query=query):
+                yield hit["_source"]
+        except NotFoundError:
+            pass  # Store prices are optional
+
+    # Admin settings
+
+    async def get_settings_version(self) -> Optional[int]:
+        try:
+            return (await self.es.get(index="admin_settings", id="current", source=False))["_version"]
+        except NotFoundError:
+            return None
+
+    async def get_settings(self) -> Optional[Tuple[Dict[str, Any], int]]:
+        try:
+            response = await self.es.get(index="admin_settings", id="current")
+        except NotFoundError:
+            return None
+        return response["_source"], response["_version"]
+
+    async def create_settings(self, settings_doc: Dict[str, Any]) -> Optional[int]:
+        try:
+            response = await self.es.index(index="admin_settings", id="current", document=settings_doc, op_type="create")
+        except ConflictError:
+            return None
+        return response["_version"]
+
+    async def put_settings(self, settings_doc: Dict[str, Any]) -> int:
+        # Settings are always read by id (real-time), so no refresh is needed
+        response = await self.es.index(index="admin_settings", id="current", document=settings_doc)
+        return response["_version"]
@@ -0,0 +1,206 @@
+"""
+Leaderboard streaming
+Shares one top-N snapshot per leaderboard and pushes coalesced diffs to Server-Sent Events subscribers
+"""
+
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set
+import asyncio
+import json
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+SnapshotFn = Callable[[str], Awaitable[List[Dict[str, Any]]]]
+
+
+def format_event(event: str, data: Dict[str, Any]) -> str:
+    """Encode one Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+class LeaderboardStream:
+    """Top-N snapshot for one leaderboard and the queues of everyone watching it"""
+
+    def __init__(self, leaderboard_index: str, entries: List[Dict[str, Any]]):
+        self.leaderboard_index = leaderboard_index
+        self.entries = entries
+        self.version = 0
+        self.subscribers: Set[asyncio.Queue] = set()
+        self.pending: Optional[asyncio.Task] = None
+        self.last_broadcast = 0.0
+        self._snapshot_message: Optional[str] = None
+
+    def snapshot_message(self) -> str:
+        """Full snapshot event, encoded once per version and shared by all new subscribers"""
+        if self._snapshot_message is None:
+            self._snapshot_message = format_event("snapshot", {
+                "leaderboard": self.leaderboard_index,
+                "version": self.version,
+                "entries": self.entries
+            })
+        return self._snapshot_message
+
+    def apply(self, entries: List[Dict[str, Any]]) -> Optional[str]:
+        """Replace the snapshot, returning the encoded diff event (None when nothing changed)"""
+        changes = [
+            {"rank": rank, "entry": entry}
+            for rank, entry in enumerate(entries, start=1)
+            if rank > len(self.entries) or self.entries[rank - 1] != entry
+        ]
+        if not changes and len(entries) == len(self.entries):
+            return None
+
+        self.entries = entries
+        self.version += 1
+        self._snapshot_message = None
+        return format_event("diff", {
+            "leaderboard": self.leaderboard_index,
+            "version": self.version,
+            "size": len(entries),
+            "changes": changes
+        })
+
+
+class LeaderboardBroadcaster:
+    """
+    Fan-out of leaderboard changes to streaming clients.
+
+    Submissions call ``notify``; bursts are coalesced so each leaderboard broadcasts
+    at most once per ``interval`` seconds, and every message is encoded once no matter
+    how many clients are connected.
+    """
+
+    def __init__(self, snapshot_fn: SnapshotFn, interval: float = 1.0, keepalive: float = 15.0, queue_size: int = 32):
+        self.snapshot_fn = snapshot_fn
+        self.interval = interval
+        self.keepalive = keepalive
+        self.queue_size = queue_size
+        self._streams: Dict[str, LeaderboardStream] = {}
+        self._lock = asyncio.Lock()
+        self.current: Optional[str] = None
+        self._followers: Set[asyncio.Queue] = set()
+
+    @property
+    def subscriber_count(self) -> int:
+        return sum(len(stream.subscribers) for stream in self._streams.values())
+
+    async def _get_stream(self, leaderboard_index: str) -> LeaderboardStream:
+        stream = self._streams.get(leaderboard_index)
+        if stream is not None:
+            return stream
+
+        async with self._lock:
+            stream = self._streams.get(leaderboard_index)
+            if stream is None:
+                stream = LeaderboardStream(leaderboard_index, await self.snapshot_fn(leaderboard_index))
+                self._streams[leaderboard_index] = stream
+            return stream
+
+    def set_current(self, leaderboard_index: str):
+        """The write alias moved: wake subscribers following the current leaderboard so they switch"""
+        if leaderboard_index == self.current:
+            return
+        self.current = leaderboard_index
+        for queue in list(self._followers):
+            try:
+                queue.put_nowait(None)
+            except asyncio.QueueFull:
+                pass  # The subscriber has messages waiting and checks the current board on its next one
+
+    def notify(self, leaderboard_index: str):
+        """Schedule a broadcast for a leaderboard whose top N may have changed"""
+        stream = self._streams.get(leaderboard_index)
+        if stream is None or not stream.subscribers or stream.pending is not None:
+            return
+        stream.pending = asyncio.create_task(self._broadcast(stream))
+
+    async def _broadcast(self, stream: LeaderboardStream):
+        try:
+            delay = stream.last_broadcast + self.interval - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            # Clear the pending marker before reading the snapshot so later submits schedule another pass
+            stream.pending = None
+            stream.last_broadcast = time.monotonic()
+            message = stream.apply(await self.snapshot_fn(stream.leaderboard_index))
+            if message is None:
+                return
+
+            for queue in list(stream.subscribers):
+                try:
+                    queue.put_nowait(message)
+                except asyncio.QueueFull:
+                    # Slow client: drop its backlog and resynchronize with a full snapshot
+                    while not queue.empty():
+                        queue.get_nowait()
+                    queue.put_nowait(stream.snapshot_message())
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            stream.pending = None
+            logger.error(f"Error broadcasting {stream.leaderboard_index}: {e}")
+
+    async def _subscribe(self, leaderboard_index: str, queue: asyncio.Queue) -> LeaderboardStream:
+        while True:
+            stream = await self._get_stream(leaderboard_index)
+            if not stream.subscribers:
+                # Nobody was watching, so submissions did not update the snapshot
+                stream.apply(await self.snapshot_fn(leaderboard_index))
+            # The stream may have been dropped while the snapshot was read
+            if self._streams.get(leaderboard_index) is stream:
+                stream.subscribers.add(queue)
+                return stream
+
+    def _unsubscribe(self, stream: LeaderboardStream, queue: asyncio.Queue):
+        """Remove a subscriber, dropping the board's stream once nobody watches it (e.g. after a roll)"""
+        stream.subscribers.discard(queue)
+        if stream.subscribers or self._streams.get(stream.leaderboard_index) is not stream:
+            return
+        del self._streams[stream.leaderboard_index]
+        if stream.pending is not None:
+            stream.pending.cancel()
+            stream.pending = None
+
+    async def events(self, leaderboard_index: str, follow_current: bool = False) -> AsyncIterator[str]:
+        """
+        Server-Sent Events for one subscriber: a snapshot followed by diffs and keepalives.
+        With ``follow_current`` the subscriber moves to each new current leaderboard after a
+        roll, receiving a ``rolled`` event and a snapshot of the new board.
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        stream = await self._subscribe(leaderboard_index, queue)
+        if follow_current:
+            if self.current is None:
+                self.current = leaderboard_index
+            self._followers.add(queue)
+        try:
+            yield stream.snapshot_message()
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), self.keepalive)
+                except asyncio.TimeoutError:
+                    message = ": keepalive\n\n"
+
+                if follow_current and self.current is not None and self.current != stream.leaderboard_index:
+                    previous = stream.leaderboard_index
+                    self._unsubscribe(stream, queue)
+                    while not queue.empty():
+                        queue.get_nowait()  # Diffs of the old board
+                    stream = await self._subscribe(self.current, queue)
+                    yield format_event("rolled", {"previous": previous, "leaderboard": stream.leaderboard_index})
+                    yield stream.snapshot_message()
+                    continue
+                if message is not None:
+                    yield message
+        finally:
+            self._unsubscribe(stream, queue)
+            self._followers.discard(queue)
+
+    async def close(self):
+        """Cancel scheduled broadcasts"""
+        tasks = [stream.pending for stream in self._streams.values() if stream.pending is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
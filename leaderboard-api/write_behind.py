@@ -0,0 +1,166 @@
+"""
+Write-behind persistence
+Queues storage writes and flushes them as _bulk batches on size or time triggers
+"""
+
+from typing import List, Dict, Any, Optional
+import asyncio
+import logging
+
+from storage import Storage
+
+logger = logging.getLogger(__name__)
+
+# Bulk item statuses worth retrying (throttling and transient server errors)
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+_STOP = object()
+
+
+class BulkWriter:
+    """Bounded write-behind queue flushed with the storage backend's bulk API (Elasticsearch _bulk shape)"""
+
+    def __init__(
+        self,
+        storage: Storage,
+        batch_size: int = 500,
+        flush_interval: float = 0.5,
+        max_queue: int = 10000,
+        max_retries: int = 5,
+        retry_backoff: float = 0.5,
+    ):
+        self.storage = storage
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._task: Optional[asyncio.Task] = None
+        self.flushed_ops = 0
+        self.failed_ops = 0
+
+    @property
+    def pending(self) -> int:
+        """Number of queued write groups not yet flushed"""
+        return self._queue.qsize()
+
+    def start(self):
+        """Start the background flush loop"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def enqueue(self, operations: List[Dict[str, Any]]):
+        """
+        Queue a group of bulk lines (action/source pairs) that must be flushed together.
+        Waits for room when the queue is full, applying backpressure to callers.
+        """
+        if self._task is None:
+            raise RuntimeError("BulkWriter is not running")
+        await self._queue.put(operations)
+
+    async def flush(self):
+        """Wait until every write group queued before this call has been sent to storage"""
+        if self._task is None:
+            return
+        barrier = asyncio.get_running_loop().create_future()
+        await self._queue.put(barrier)
+        await barrier
+
+    async def close(self):
+        """Flush everything still queued and stop the background loop"""
+        if self._task is None:
+            return
+        await self._queue.put(_STOP)
+        await self._task
+        self._task = None
+        logger.info(f"Write-behind queue drained ({self.flushed_ops} ops flushed, {self.failed_ops} failed)")
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+
+        while not stopping:
+            item = await self._queue.get()
+            if item is _STOP:
+                break
+
+            operations: List[Dict[str, Any]] = []
+            barrier = None
+            deadline = loop.time() + self.flush_interval
+            while True:
+                if isinstance(item, asyncio.Future):
+                    # flush() waits for everything queued before it: send the batch now
+                    barrier = item
+                    break
+                operations.extend(item)
+                # Each op is an action line followed by a source line
+                timeout = deadline - loop.time()
+                if len(operations) // 2 >= self.batch_size or timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+
+            try:
+                if operations:
+                    await self._flush(operations)
+            except Exception as e:
+                logger.error(f"Unexpected error flushing write-behind batch: {e}")
+            if barrier is not None and not barrier.done():
+                barrier.set_result(None)
+
+        # Drain anything enqueued while stopping
+        operations = []
+        barriers = []
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if isinstance(item, asyncio.Future):
+                barriers.append(item)
+            elif item is not _STOP:
+                operations.extend(item)
+        if operations:
+            await self._flush(operations)
+        for barrier in barriers:
+            if not barrier.done():
+                barrier.set_result(None)
+
+    async def _flush(self, operations: List[Dict[str, Any]]):
+        """Send a batch with _bulk, retrying failed items with exponential backoff"""
+        attempt = 0
+        while operations:
+            try:
+                response = await self.storage.bulk(operations)
+            except Exception as e:
+                retry = operations
+                logger.warning(f"Bulk request failed ({len(operations) // 2} ops): {e}")
+            else:
+                retry = []
+                rejected = 0
+                if response.get("errors"):
+                    for i, item in enumerate(response["items"]):
+                        result = next(iter(item.values()))
+                        if "error" not in result:
+                            continue
+                        if result.get("status") in RETRYABLE_STATUSES:
+                            retry.extend(operations[2 * i:2 * i + 2])
+                        else:
+                            rejected += 1
+                            logger.error(f"Bulk item rejected for {result.get('_index')}/{result.get('_id')}: {result['error']}")
+                self.failed_ops += rejected
+                self.flushed_ops += (len(operations) - len(retry)) // 2 - rejected
+
+            if not retry:
+                return
+
+            attempt += 1
+            if attempt > self.max_retries:
+                self.failed_ops += len(retry) // 2
+                logger.error(f"Dropping {len(retry) // 2} bulk ops after {self.max_retries} retries")
+                return
+
+            await asyncio.sleep(self.retry_backoff * (2 ** (attempt - 1)))
+            operations = retry